@@ -1,151 +1,374 @@
+import logging
+import numpy as np
 import pandas as pd
-import spacy
-import os
-import numpy as np 
-import traceback 
+import threading
+import time
+from collections import namedtuple
+
+from data_processing import recommend_destination, RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL
+from caching import LRUCache
+from destination_index import DestinationIndex
+from ranking import DestinationRanker, context_features, context_places
+from gazetteer import Gazetteer
+from location_index import LocationIndex, describe_location, DEFAULT_DESCRIPTION
+from spatial_index import SpatialIndex
+from embedding_index import EmbeddingIndex, DEFAULT_EMBEDDING_INDEX_DIR, SEMANTIC_MIN_SIMILARITY
+from metrics import stage
+from intent_detection import (detect_intent_spacy, parse_entities, freeze_entities, entities_size,
+                              ENTITY_CACHE_SIZE, ENTITY_CACHE_MAX_BYTES, CONTEXT_LIST_KEYS, CONTEXT_VALUE_KEYS,
+                              CONTEXT_VOCABULARIES, MAPPINGS_VERSION)
+from nlp_executor import NlpExecutor, NlpQueueFull, NlpTimeout
+from nlp_pipeline import load_nlp, get_nlp_profile, FULL_MODEL_NAME
+from search_index import SearchIndex
+from itinerary import plan_itinerary, DEFAULT_DAY_HOURS, DEFAULT_VISIT_MINUTES, DEFAULT_TRAVEL_KMH
+from dataset import load_dataset, load_search_index, data_version, DEFAULT_SNAPSHOT_DIR
+
+logger = logging.getLogger(__name__)
+
+# --- Batch processing defaults (nlp.pipe) ---
+DEFAULT_PIPE_BATCH_SIZE = 64
+DEFAULT_PIPE_PROCESSES = 1
+
+# --- Semantic search ---
+SEMANTIC_RESULTS = 3 # Destinations suggested from the embedding index when ranking finds nothing fitting
+
+
+def new_context(initial=None):
+    """
+    Creates a fresh conversation context.
+
+    Args:
+        initial (dict, optional): Existing context (e.g. sent by a client) to copy values from.
+            Unknown keys are ignored and lists are copied, so the result is safe to mutate.
+
+    Returns:
+        dict: The conversation context.
+    """
+    context = {key: [] for key in CONTEXT_LIST_KEYS}
+    context.update({key: None for key in CONTEXT_VALUE_KEYS})
+    if initial:
+        for key in CONTEXT_LIST_KEYS:
+            values = initial.get(key)
+            context[key] = list(values) if isinstance(values, (list, tuple)) else []
+        for key in CONTEXT_VALUE_KEYS:
+            context[key] = initial.get(key)
+    return context
+
+
+# Context field -> {lowercased value: value} for validating contexts sent by clients
+_CONTEXT_LOOKUP = {
+    field: {value.lower(): value for value in values} for field, values in CONTEXT_VOCABULARIES.items()
+}
+
+
+def validate_context(initial):
+    """
+    Creates a conversation context from one sent by a client (e.g. to /chat/batch).
+
+    Only values of the context vocabularies are kept (matched case-insensitively), so a client
+    cannot push arbitrary strings into ranking; unknown values are dropped.
+
+    Args:
+        initial (dict or None): The context sent by the client.
+
+    Returns:
+        dict: The conversation context.
+
+    Raises:
+        ValueError: If the context or one of its fields has the wrong type.
+    """
+    context = new_context()
+    if initial is None:
+        return context
+    if not isinstance(initial, dict):
+        raise ValueError("context must be an object")
+    for key in CONTEXT_VALUE_KEYS:
+        value = initial.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"context '{key}' must be a string")
+        context[key] = _CONTEXT_LOOKUP[key].get(value.lower())
+    for key in CONTEXT_LIST_KEYS:
+        values = initial.get(key)
+        if values is None:
+            continue
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"context '{key}' must be a list of strings")
+        known = (_CONTEXT_LOOKUP[key].get(value.lower()) for value in values)
+        context[key] = list(dict.fromkeys(value for value in known if value is not None))
+    return context
+
+
+# --- Loaded data ---
+# Everything derived from the CSV files, swapped as one immutable unit on reload. Request code
+# reads Chatbot.data once and keeps using that object, so it never mixes old and new data.
+TravelData = namedtuple('TravelData', [
+    'df', 'pois', 'destination_index', 'ranker', 'gazetteer', 'location_index', 'poi_spatial_index', 'destination_spatial_index',
+    'search_index', 'embedding_index', 'version', 'source', 'loaded_at', 'load_seconds', 'load_stages'
+])
+
+
+def load_travel_data(locations_csv_path, pois_csv_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR, embedding_dir=DEFAULT_EMBEDDING_INDEX_DIR):
+    """
+    Loads location and POI data (binary snapshot when it is fresh, CSV files otherwise) and
+    builds the indexes used for recommendations and location details. The embedding index for
+    semantic search is only used if it was built from the same data version.
+
+    Returns:
+        TravelData: The loaded data. Its df is empty if the locations could not be loaded.
+    """
+    start = time.perf_counter()
+    stages = {} # Seconds per loading step, in order
+
+    def step(name, build, *args):
+        step_start = time.perf_counter()
+        result = build(*args)
+        stages[name] = round(time.perf_counter() - step_start, 4)
+        return result
+
+    version = data_version(locations_csv_path, pois_csv_path) # Taken before reading, so later edits are noticed
+    df, pois, source = step('dataset', load_dataset, locations_csv_path, pois_csv_path, snapshot_dir)
+    if df.empty:
+        logger.warning("DataFrame is empty after loading attempt.")
+    destination_index = step('destination_index', DestinationIndex, df)
+    search_index = step('search_index', load_search_index, snapshot_dir) if source == 'snapshot' else None
+    if search_index is None:
+        search_index = step('search_index', SearchIndex.build, df, pois)
+    data = TravelData(
+        df=df,
+        pois=pois,
+        destination_index=destination_index,
+        ranker=step('ranker', DestinationRanker, destination_index),
+        gazetteer=step('gazetteer', Gazetteer, destination_index),
+        location_index=step('location_index', LocationIndex, df, pois, version),
+        poi_spatial_index=step('poi_spatial_index', SpatialIndex.for_pois, pois),
+        destination_spatial_index=step('destination_spatial_index', SpatialIndex.for_destinations, df),
+        search_index=search_index,
+        embedding_index=step('embedding_index', EmbeddingIndex.load, embedding_dir, version) if embedding_dir else None,
+        version=version,
+        source=source,
+        loaded_at=time.time(),
+        load_seconds=time.perf_counter() - start,
+        load_stages=stages,
+    )
+    logger.info("Data loading complete from %s in %.2fs: %d locations, %d POIs, %d indexed IDs (version %s).",
+                source, data.load_seconds, len(df), len(pois), len(data.location_index.by_id), version)
+    return data
 
-from data_processing import recommend_destination
-from intent_detection import detect_intent_spacy
-from mappings import type_mapping, budget_mapping
 
 class Chatbot:
-    def __init__(self, locations_path="destinations.csv", pois_path="points_of_interest.csv"):
+    def __init__(self, locations_path="destinations.csv", pois_path="points_of_interest.csv", nlp_profile=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
         """
         Initializes the Chatbot by loading NLP model (optional) and destination data.
         Args:
             locations_path (str): Path to the destinations CSV file.
             pois_path (str): Path to the points_of_interest CSV file.
+            nlp_profile (str, optional): spaCy pipeline profile ('lookup', 'lemmatizer', 'full' or 'stub').
+                Defaults to the NLP_PROFILE environment variable, then 'lookup'.
+            snapshot_dir (str, optional): Binary data snapshot used instead of the CSVs while it is fresh.
         """
-        print("Initializing Chatbot...")
+        logger.info("Initializing Chatbot...")
         self.nlp = None 
+        self.nlp_profile = get_nlp_profile(nlp_profile)
         try:
-            self.nlp = spacy.load("en_core_web_lg")
-            print("spaCy model 'en_core_web_lg' loaded.")
-        except OSError:
-            print("WARNING: spaCy model 'en_core_web_lg' not found. NLP features disabled.")
-            print("To enable NLP, run: python -m spacy download en_core_web_lg")
+            self.nlp = load_nlp(self.nlp_profile)
+            logger.info("spaCy pipeline loaded (profile '%s', components: %s).", self.nlp_profile, self.nlp.pipe_names)
+        except OSError as e:
+            logger.warning("spaCy pipeline for profile '%s' could not be loaded: %s. NLP features disabled.", self.nlp_profile, e)
+            if self.nlp_profile == 'lookup':
+                logger.warning("To enable NLP, run: pip install spacy-lookups-data")
+            else:
+                logger.warning("To enable NLP, run: python -m spacy download %s", FULL_MODEL_NAME)
+
+        self.data = None
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._watcher_thread = None
+        self._watcher_stop = threading.Event()
+        self.nlp_executor = None # Optional process pool for parsing (see start_nlp_executor)
+        self.reload_status = {
+            'in_progress': False,
+            'count': 0,
+            'last_started': None,
+            'last_finished': None,
+            'last_seconds': None,
+            'last_result': None,
+            'last_error': None,
+        }
+        # Ranking shortlists per canonical context; cleared whenever new data is swapped in
+        self.recommendation_cache = (
+            LRUCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL) if RECOMMENDATION_CACHE_SIZE > 0 else None
+        )
+        # Entities per normalized message text, shared by all sessions. Keyed on the mappings
+        # version too; mappings only change with a restart, which also empties this cache
+        self.entity_cache = (
+            LRUCache(ENTITY_CACHE_SIZE, max_bytes=ENTITY_CACHE_MAX_BYTES, sizeof=entities_size)
+            if ENTITY_CACHE_SIZE > 0 else None
+        )
+        self.load_data(locations_path, pois_path, snapshot_dir) 
+
+    def load_data(self, locations_csv_path, pois_csv_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+        """
+        Loads location and POI data into self.data (see load_travel_data) and remembers the
+        paths for later reloads.
+        """
+        self.data_paths = (locations_csv_path, pois_csv_path, snapshot_dir)
+        self.data = load_travel_data(*self.data_paths)
 
-        self.df = pd.DataFrame() 
-        self.load_data(locations_path, pois_path) 
+    # --- Shortcuts to the current data ---
+    @property
+    def df(self):
+        return self.data.df
 
-    def load_data(self, locations_csv_path, pois_csv_path):
-        """
-        Loads and preprocesses location and POI data. Stores the combined DataFrame in self.df.
-        Expects a 'Description' column in the locations CSV.
-        Optionally reads 'POIDescription' from the POIs CSV.
+    @property
+    def pois(self):
+        return self.data.pois
+
+    @property
+    def destination_index(self):
+        return self.data.destination_index
+
+    @property
+    def location_index(self):
+        return self.data.location_index
+
+    # --- Hot reload ---
+    def reload_data(self, wait=False):
         """
-        try:
-            # --- File Existence Checks ---
-            locations_exist = os.path.exists(locations_csv_path)
-            pois_exist = os.path.exists(pois_csv_path)
-
-            if not locations_exist:
-                print(f"--- CRITICAL ERROR: Locations file not found at '{locations_csv_path}'. Cannot load data. ---")
-                self.df = pd.DataFrame()
-                return
-
-            # --- Load Locations ---
-            locations_df = pd.read_csv(locations_csv_path)
-            print(f"Loading locations: {len(locations_df)} rows from {locations_csv_path}")
-
-            # --- Check Required Location Columns (Including Description) ---
-            required_loc_cols = ['LocationID', 'LocationName', 'Type', 'Budget', 'Travel Style', 'Country', 'Best Time to Visit', 'Latitude', 'Longitude', 'Description']
-            missing_loc_cols = [col for col in required_loc_cols if col not in locations_df.columns]
-            if missing_loc_cols:
-                 print(f"--- CRITICAL ERROR: Missing required columns in locations CSV: {missing_loc_cols}. Cannot load data. ---")
-                 self.df = pd.DataFrame()
-                 return
-
-            # --- Preprocess Locations ---
-            if 'Type' in locations_df.columns:
-                 locations_df['Type'] = locations_df['Type'].replace(type_mapping, regex=False)
-            if 'Budget' in locations_df.columns:
-                 locations_df['Budget'] = locations_df['Budget'].replace(budget_mapping, regex=False)
-            locations_df['Description'] = locations_df['Description'].fillna("No description available for this location.")
-            locations_df['Description'] = locations_df['Description'].astype(str) # Ensure string type
-
-            # --- Handle POIs ---
-            if not pois_exist:
-                print(f"--- WARNING: POIs file not found at '{pois_csv_path}'. Adding empty POI list to locations. ---")
-                locations_df['points_of_interest'] = [[] for _ in range(len(locations_df))]
-                self.df = locations_df 
-            else:
-                # --- Load and Process POIs ---
-                pois_df = pd.read_csv(pois_csv_path)
-                print(f"Loading POIs: {len(pois_df)} rows from {pois_csv_path}")
-
-                # --- Check Required POI Columns ---
-                required_poi_cols = ['ParentLocationID', 'POIName', 'POIType', 'POILat', 'POILng']
-                optional_poi_cols = ['POIDescription']
-                base_poi_cols = required_poi_cols 
-                cols_to_load = base_poi_cols[:] 
-                has_poi_desc = False
-                if 'POIDescription' in pois_df.columns:
-                    cols_to_load.append('POIDescription')
-                    has_poi_desc = True
-                    print("Found optional 'POIDescription' column in POIs CSV.")
-                else:
-                    print("Optional 'POIDescription' column not found in POIs CSV. Descriptions will be empty.")
-
-
-                missing_poi_cols = [col for col in base_poi_cols if col not in pois_df.columns]
-                if missing_poi_cols:
-                    print(f"--- WARNING: Missing required columns in POIs CSV: {missing_poi_cols}. POIs may not load correctly. ---")
-                    locations_df['points_of_interest'] = [[] for _ in range(len(locations_df))]
-                    self.df = locations_df 
-                else:
-                    # --- Prepare POIs ---
-                    pois_subset_df = pois_df[['ParentLocationID'] + [col for col in cols_to_load if col != 'ParentLocationID']].copy()
-
-                    # Rename columns for consistency
-                    poi_rename_map = {'POIName': 'name', 'POIType': 'type', 'POILat': 'lat', 'POILng': 'lng'}
-                    if has_poi_desc:
-                        poi_rename_map['POIDescription'] = 'description'
-                    pois_subset_df = pois_subset_df.rename(columns=poi_rename_map)
-
-                    # Fill NaN/missing POI descriptions if column exists
-                    if has_poi_desc:
-                        pois_subset_df['description'] = pois_subset_df['description'].fillna("") # Use empty string for missing POI desc
-                        pois_subset_df['description'] = pois_subset_df['description'].astype(str)
-
-                    # Define columns to include in the final POI dict
-                    final_poi_dict_cols = ['name', 'type', 'lat', 'lng']
-                    if has_poi_desc:
-                        final_poi_dict_cols.append('description')
-
-                    # Group POIs and aggregate into lists of dicts
-                    grouped_pois = pois_subset_df.groupby('ParentLocationID')
-                    poi_lists = grouped_pois.apply(
-                        lambda group: group[final_poi_dict_cols].to_dict('records')
-                    ).rename('points_of_interest') 
-
-                    # Merge POIs with locations
-                    combined_df = pd.merge(
-                        locations_df,
-                        poi_lists,
-                        left_on='LocationID',
-                        right_index=True,
-                        how='left'
-                    )
-                    # Fill missing POI lists with empty lists
-                    combined_df['points_of_interest'] = combined_df['points_of_interest'].apply(lambda x: x if isinstance(x, list) else [])
-                    self.df = combined_df # Assign the final merged DataFrame
-
-            print(f"Data loading complete. DataFrame shape: {self.df.shape}")
-            if not self.df.empty:
-                 print("\nSample of loaded data (first 2 rows):")
-                 print(self.df.head(2).to_string()) 
-            else:
-                 print("DataFrame is empty after loading attempt.")
+        Rebuilds the data layer from the files in a background thread and swaps it in atomically.
+        Requests already running keep the data object they started with. If the new data cannot
+        be loaded (or is empty) the current data stays in place.
 
+        Args:
+            wait (bool): Block until the reload has finished.
 
-        except FileNotFoundError as e:
-            print(f"--- FILE ERROR during data loading: {e} ---")
-            self.df = pd.DataFrame()
+        Returns:
+            bool: False if a reload was already running (no new one is started).
+        """
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self.reload_status['in_progress'] = True
+            self._reload_thread = threading.Thread(target=self._reload, name="data-reload", daemon=True)
+            self._reload_thread.start()
+            thread = self._reload_thread
+        if wait:
+            thread.join()
+        return True
+
+    def _reload(self):
+        status = self.reload_status
+        status['last_started'] = time.time()
+        start = time.perf_counter()
+        try:
+            data = load_travel_data(*self.data_paths)
+            if data.df.empty:
+                raise ValueError("reloaded location data is empty")
+            self.data = data # Atomic swap
+            if self.recommendation_cache is not None:
+                self.recommendation_cache.clear()
+            status['last_result'] = 'ok'
+            status['last_error'] = None
+            logger.info("Data reloaded (version %s).", data.version)
         except Exception as e:
-            print(f"--- UNEXPECTED ERROR during data loading: {e} ---")
-            traceback.print_exc()
-            self.df = pd.DataFrame()
+            status['last_result'] = 'error'
+            status['last_error'] = str(e)
+            logger.exception("Error during data reload, keeping current data: %s", e)
+        finally:
+            status['count'] += 1
+            status['last_seconds'] = round(time.perf_counter() - start, 4)
+            status['last_finished'] = time.time()
+            status['in_progress'] = False
+
+    def data_changed(self):
+        """True if the source files differ from the ones the current data was loaded from."""
+        return data_version(*self.data_paths[:2]) != self.data.version
+
+    def start_data_watcher(self, interval):
+        """
+        Polls the source files every `interval` seconds and reloads the data when they change.
+        Does nothing if the watcher is already running or interval <= 0.
+        """
+        if interval <= 0 or (self._watcher_thread is not None and self._watcher_thread.is_alive()):
+            return
+
+        stop = self._watcher_stop = threading.Event()
+
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    if self.data_changed():
+                        logger.info("Data files changed, reloading...")
+                        self.reload_data(wait=True)
+                except Exception as e:
+                    logger.exception("Error in data watcher: %s", e)
+
+        self._watcher_thread = threading.Thread(target=watch, name="data-watcher", daemon=True)
+        self._watcher_thread.start()
+        logger.info("Watching data files for changes every %ss.", interval)
+
+    def stop_data_watcher(self):
+        """Stops the file watcher (if running) and waits for it to exit."""
+        self._watcher_stop.set()
+        if self._watcher_thread is not None and self._watcher_thread.is_alive():
+            self._watcher_thread.join()
+        self._watcher_thread = None
+
+    # --- NLP worker processes ---
+    def start_nlp_executor(self, processes, wait=False, **options):
+        """
+        Parses chat messages in worker processes instead of the request thread (see NlpExecutor).
+        The pool itself starts on the first message in the process that handles it, or now with
+        wait=True.
+
+        Args:
+            processes (int): Worker processes; 0 keeps parsing in the request thread.
+            wait (bool, optional): Start the workers now and wait until their pipelines are loaded.
+            **options: batch_window_ms, max_batch, queue_depth and timeout_ms for NlpExecutor.
+        """
+        if processes <= 0 or self.nlp is None:
+            return
+        if self.nlp_executor is None:
+            self.nlp_executor = NlpExecutor(self.nlp_profile, processes, nlp=self.nlp, **options)
+        if wait:
+            self.nlp_executor.start(wait=True)
+
+    def stop_nlp_executor(self):
+        """Stops the NLP worker processes (messages are parsed in the request thread again)."""
+        executor, self.nlp_executor = self.nlp_executor, None
+        if executor is not None:
+            executor.stop()
+
+    def data_status(self):
+        """
+        Returns:
+            dict: Version, source, timing and row counts of the current data plus the reload status.
+        """
+        data = self.data
+        return {
+            'version': data.version,
+            'source': data.source,
+            'loaded_at': data.loaded_at,
+            'load_seconds': round(data.load_seconds, 4),
+            'load_stages': dict(data.load_stages),
+            'locations': len(data.df),
+            'pois': len(data.pois),
+            'changed_on_disk': self.data_changed(),
+            'watching': self._watcher_thread is not None and self._watcher_thread.is_alive(),
+            'nlp_executor': self.nlp_executor.stats() if self.nlp_executor is not None else None,
+            'reload': dict(self.reload_status),
+        }
+
+    def cache_stats(self):
+        """
+        Returns:
+            dict: Counters of the caches, keyed by cache name (None for a disabled cache).
+        """
+        return {
+            'recommendations': self.recommendation_cache.stats() if self.recommendation_cache is not None else None,
+            'entities': self.entity_cache.stats() if self.entity_cache is not None else None,
+        }
 
     def get_location_data_by_name(self, name):
         """
@@ -157,23 +380,35 @@ class Chatbot:
         Returns:
             pd.Series or None: The data series for the location, or None if not found.
         """
-        if self.df.empty:
-            print("DataFrame is empty, cannot search for location.")
+        data = self.data
+        if data.df.empty:
+            logger.warning("DataFrame is empty, cannot search for location.")
             return None
         if not name or not isinstance(name, str):
-             print("Invalid location name provided for search.")
+             logger.debug("Invalid location name provided for search.")
              return None
-        try:
-            location_data = self.df.loc[self.df['LocationName'].str.lower() == name.lower()]
-            if not location_data.empty:
-                return location_data.iloc[0]
-            else:
-                print(f"Location '{name}' not found in DataFrame.")
-                return None
-        except Exception as e:
-            print(f"Error searching for location '{name}': {e}")
-            traceback.print_exc()
+        entry = data.location_index.find_by_name(name)
+        if entry is None:
+            logger.debug("Location '%s' not found in DataFrame.", name)
             return None
+        return data.df.iloc[entry.row]
+
+    def get_location_details(self, location_id=None, name=None):
+        """
+        Looks up the prebuilt /location_details entry of a location, by ID or by name.
+
+        Args:
+            location_id (int or str, optional): The LocationID. Takes precedence over name.
+            name (str, optional): The location name (case-insensitive).
+
+        Returns:
+            LocationEntry or None: Entry whose `body` is the ready JSON response (`encoded`: precompressed
+                variants), or None if not found.
+        """
+        location_index = self.data.location_index
+        if location_id is not None:
+            return location_index.find_by_id(location_id)
+        return location_index.find_by_name(name)
 
     def get_description(self, location_data):
         """
@@ -185,24 +420,204 @@ class Chatbot:
         Returns:
             str: The description string, or a default message if not found/valid.
         """
-        default_desc = "Sorry, I couldn't find a description for this location."
         if location_data is None or not isinstance(location_data, pd.Series):
-            return default_desc
-
-        # Use .get with a default value, robust against missing column
-        description = location_data.get('Description', default_desc)
-
-        # Check for actual NaN values using pandas function, or empty/whitespace strings
-        if pd.isna(description) or not isinstance(description, str) or not description.strip():
-            # Fallback if description is missing/invalid in the data
-            name = location_data.get('LocationName', 'This location')
-            country = location_data.get('Country', '')
-            loc_type = location_data.get('Type', '')
-            return f"Information for {name}{f' in {country}' if country else ''}{f' ({loc_type})' if loc_type else ''} is available, but a detailed description is missing."
+            return DEFAULT_DESCRIPTION
+        return describe_location(location_data)
+
+    # --- Spatial queries ---
+    def _poi_records(self, data, rows, distances=None):
+        parent_ids = data.pois.parent_ids(rows)
+        records = []
+        for position, row in enumerate(rows):
+            record = data.pois.record(row)
+            record['location_id'] = int(parent_ids[position])
+            if distances is not None:
+                record['distance_km'] = round(float(distances[position]), 3)
+            records.append(record)
+        return records
+
+    def nearby_pois(self, lat, lng, k, types=None, max_km=None, offset=0):
+        """
+        The POIs nearest to a coordinate.
+
+        Args:
+            lat (float): Latitude (degrees).
+            lng (float): Longitude (degrees).
+            k (int): Number of results.
+            types (list, optional): POI types to include (case-insensitive); None = all.
+            max_km (float, optional): Only POIs within this distance.
+            offset (int, optional): Results to skip (paging).
+
+        Returns:
+            list: POI dicts (as in /location_details, plus location_id and distance_km), closest first.
+        """
+        data = self.data
+        index = data.poi_spatial_index
+        rows, distances = index.nearest(lat, lng, k, index.category_codes(types), max_km, offset)
+        return self._poi_records(data, rows, distances)
+
+    def pois_in_viewport(self, south, west, north, east, types=None, limit=None, offset=0):
+        """
+        The POIs inside a map viewport, closest to its centre first.
+
+        Args:
+            south, west, north, east (float): Viewport edges (degrees); west > east crosses the antimeridian.
+            types (list, optional): POI types to include (case-insensitive); None = all.
+            limit (int, optional): Maximum number of results; None = all.
+            offset (int, optional): Results to skip (paging).
+
+        Returns:
+            tuple: (POI dicts with location_id, total number of POIs in the viewport).
+        """
+        data = self.data
+        index = data.poi_spatial_index
+        rows, total = index.within(south, west, north, east, index.category_codes(types), offset, limit)
+        return self._poi_records(data, rows), total
+
+    def nearby_destinations(self, lat, lng, k, types=None, max_km=None, offset=0):
+        """
+        The destinations nearest to a coordinate.
+
+        Returns:
+            list: Recommendation-style destination dicts plus distance_km, closest first.
+        """
+        data = self.data
+        index = data.destination_spatial_index
+        rows, distances = index.nearest(lat, lng, k, index.category_codes(types), max_km, offset)
+        return [
+            {**data.destination_index.records[row], 'distance_km': round(float(distance), 3)}
+            for row, distance in zip(rows, distances)
+        ]
+
+    # --- Itineraries ---
+    def plan_itinerary(self, location_id, poi_indexes=None, start=None, days=None, day_hours=DEFAULT_DAY_HOURS,
+                       visit_minutes=DEFAULT_VISIT_MINUTES, travel_kmh=DEFAULT_TRAVEL_KMH, max_pois=None):
+        """
+        Visiting order of a destination's POIs, split into days (see itinerary.plan_itinerary).
+
+        Args:
+            location_id (int): The destination.
+            poi_indexes (list, optional): Positions of the POIs to visit in the destination's POI
+                list (as returned by /location_details); None = all.
+            start (tuple, optional): (lat, lng) of the accommodation every day starts from.
+            days (int, optional): Number of days; None = as many as day_hours needs.
+            day_hours (float, optional): Time available per day.
+            visit_minutes (float, optional): Time spent at each POI.
+            travel_kmh (float, optional): Average travel speed between POIs.
+            max_pois (int, optional): Largest number of POIs to plan for.
+
+        Returns:
+            dict or None: {'location_id', 'distance_km', 'days': [{'day', 'distance_km', 'hours',
+                'stops': [POI dict + 'index' + 'leg_km']}]}; None if the location is unknown.
+
+        Raises:
+            ValueError: If a POI index is out of range or there are more than max_pois POIs.
+        """
+        data = self.data
+        entry = data.location_index.find_by_id(location_id)
+        if entry is None:
+            return None
+        first, end = data.pois.row_range(entry.location_id)
+        if poi_indexes is None:
+            indexes = np.arange(end - first)
         else:
-            # Return the description directly from the CSV
-            return description.strip() 
+            # Checked as Python ints: values past int64 must not reach np.asarray
+            if any(index < 0 or index >= end - first for index in poi_indexes):
+                raise ValueError(f"POI indexes must be between 0 and {end - first - 1}.")
+            indexes = np.unique(np.asarray(poi_indexes, dtype=np.int64)) # Order of the request does not matter
+        if max_pois is not None and len(indexes) > max_pois:
+            raise ValueError(f"At most {max_pois} POIs per itinerary (this location has {end - first}); choose them with 'pois'.")
+        rows = first + indexes
+        plan = plan_itinerary(data.pois.lat[rows], data.pois.lng[rows], start, days, day_hours, visit_minutes, travel_kmh)
+
+        order, leg_km = plan['order'], plan['leg_km']
+        bounds = plan['day_starts'] + [len(order)]
+        plan_days = []
+        for day, (day_start, day_end) in enumerate(zip(bounds[:-1], bounds[1:]), 1):
+            stops = []
+            for position in range(day_start, day_end):
+                stop = data.pois.record(int(rows[order[position]]))
+                stop['index'] = int(indexes[order[position]])
+                stop['leg_km'] = round(float(leg_km[position]), 3)
+                stops.append(stop)
+            # The first leg of a day is travel from the accommodation (0 without a start point)
+            day_km = float(leg_km[day_start:day_end].sum())
+            hours = len(stops) * visit_minutes / 60 + (day_km / travel_kmh if travel_kmh > 0 else 0)
+            plan_days.append({'day': day, 'distance_km': round(day_km, 3), 'hours': round(hours, 2), 'stops': stops})
+        return {
+            'location_id': int(entry.location_id),
+            'distance_km': round(float(leg_km.sum()), 3),
+            'days': plan_days,
+        }
+
+    # --- Full-text search ---
+    def search(self, query, k, offset=0, kinds=None, poi_types=None, countries=None, prefix=True):
+        """
+        Full-text search over destinations and POIs, ranked by BM25 (see SearchIndex.search).
+
+        Args:
+            query (str): Free text; the last word also matches as a prefix unless prefix=False.
+            k (int): Number of results.
+            offset (int, optional): Results to skip (paging).
+            kinds (list, optional): 'destination' and / or 'poi'; None = both.
+            poi_types (list, optional): Only POIs of these types.
+            countries (list, optional): Only results in these countries.
+            prefix (bool, optional): Prefix matching of the last word.
+
+        Returns:
+            tuple: (results, total) - dicts with 'kind' ('destination' or 'poi') and 'score' plus the
+                destination fields (as in recommendations) or the POI fields with location_id.
+        """
+        data = self.data
+        index = data.search_index
+        docs, scores, total = index.search(query, k, offset, kinds, poi_types, countries, prefix)
+        poi_rows = [int(doc) - index.n_destinations for doc in docs if doc >= index.n_destinations]
+        pois = iter(self._poi_records(data, np.array(poi_rows, dtype=np.int64)))
+        results = []
+        for doc, score in zip(docs, scores):
+            if doc < index.n_destinations:
+                result = {'kind': 'destination', **data.destination_index.records[doc]}
+            else:
+                result = {'kind': 'poi', **next(pois)}
+            result['score'] = round(float(score), 4)
+            results.append(result)
+        return results, total
+
+    # --- Semantic search ---
+    def similar_destinations(self, texts, k, min_similarity=SEMANTIC_MIN_SIMILARITY, data=None):
+        """
+        The destinations whose descriptions, attractions or POIs are most similar to each text
+        (embedding index; one matrix multiply for the whole batch).
 
+        Args:
+            texts (list): Free-text queries.
+            k (int): Results per text.
+            min_similarity (float, optional): Minimum cosine similarity.
+            data (TravelData, optional): Data version to use; defaults to the current one.
+
+        Returns:
+            list: Per text, recommendation-style destination dicts plus 'similarity' and
+                'similar_to' (description, attractions or the name of the POI), best first.
+                Empty lists when no embedding index is loaded.
+        """
+        data = data or self.data
+        if data.embedding_index is None:
+            return [[] for _ in texts]
+        with stage('semantic_search'):
+            matches = data.embedding_index.search(texts, k, min_similarity)
+        results = []
+        for text_matches in matches:
+            destinations = []
+            for location_id, similarity, kind, poi_row in text_matches:
+                entry = data.location_index.find_by_id(location_id)
+                if entry is None:
+                    continue
+                destination = dict(data.destination_index.records[entry.row])
+                destination['similarity'] = round(similarity, 3)
+                destination['similar_to'] = data.pois.name[poi_row] if kind == 'poi' else kind
+                destinations.append(destination)
+            results.append(destinations)
+        return results
 
     # --- process_message handles general chat, intent detection, recommendations ---
     def process_message(self, user_input, context):
@@ -221,31 +636,155 @@ class Chatbot:
         """
         # Ensure spaCy model is loaded before using it
         if self.nlp is None:
-             print("ERROR: spaCy model not loaded, cannot process message using NLP.")
+             logger.error("spaCy model not loaded, cannot process message using NLP.")
              # Provide a fallback response or handle differently
              return "Sorry, I'm having trouble understanding language right now. Can you be more specific?", []
 
-        response_lines = [] 
         user_input_processed = user_input.strip().lower() 
 
         if not user_input_processed:
-            response_lines.append("Hmm, I didn't quite catch that. Can you rephrase?")
-            return "\n".join(response_lines), []
+            return "Hmm, I didn't quite catch that. Can you rephrase?", []
 
-        try:
-            detect_intent_spacy(user_input_processed, context, self.nlp)
-            print(f"Context after intent detection: {context}") # Log context changes
+        return self._respond(user_input_processed, context)
 
-            if self.df.empty:
-                print("ERROR: DataFrame is empty, cannot provide recommendations.")
+    def process_messages(self, batch, batch_size=DEFAULT_PIPE_BATCH_SIZE, n_process=DEFAULT_PIPE_PROCESSES):
+        """
+        Processes many messages at once. All messages are tokenized together with nlp.pipe,
+        then handled one by one in input order, so each result (and context update) is the same
+        as calling process_message serially.
+
+        Args:
+            batch (list): (user_input, context) pairs. Contexts are updated in place.
+            batch_size (int): Number of texts spaCy buffers per batch.
+            n_process (int): Number of processes spaCy uses for tokenization.
+
+        Returns:
+            list: (response_text, locations_list) tuples in input order.
+        """
+        if self.nlp is None:
+            return [self.process_message(user_input, context) for user_input, context in batch]
+
+        processed = [(user_input.strip().lower(), context) for user_input, context in batch]
+        # Only messages missing from the entity cache are parsed
+        cached = [self._cached_entities(text) if text else None for text, _ in processed]
+        docs = self.nlp.pipe(
+            (text for (text, _), entities in zip(processed, cached) if text and entities is None),
+            batch_size=batch_size,
+            n_process=n_process
+        )
+
+        results = []
+        for (text, context), entities in zip(processed, cached):
+            if not text:
+                results.append(self.process_message(text, context)) # Same reply as for an empty message
+            elif entities is not None:
+                results.append(self._respond(text, context, entities=entities))
+            else:
+                results.append(self._respond(text, context, doc=next(docs)))
+        return results
+
+    def _entity_cache_key(self, text):
+        return (MAPPINGS_VERSION, text)
+
+    def _cached_entities(self, text):
+        """Entities of a normalized message from the entity cache, or None."""
+        if self.entity_cache is None:
+            return None
+        return self.entity_cache.get(self._entity_cache_key(text))
+
+    def _message_entities(self, text, doc=None):
+        """
+        Entities of one normalized message: from the entity cache, the NLP executor or parsed
+        in this thread, in that order. New results are cached.
+
+        Args:
+            text (str): The normalized message text.
+            doc (spacy.tokens.Doc, optional): Already tokenized message (from nlp.pipe).
+
+        Returns:
+            dict: Entities (see intent_detection.extract_entities); read-only, possibly shared.
+        """
+        entities = self._cached_entities(text) if doc is None else None
+        if entities is not None:
+            return entities
+        executor = self.nlp_executor
+        if doc is None and executor is not None:
+            try:
+                with stage('nlp_offload'):
+                    entities = executor.extract(text)
+            except NlpQueueFull:
+                logger.debug("NLP workers are saturated, parsing in the request thread.")
+            except NlpTimeout as e:
+                logger.warning("NLP worker too slow (%s), parsing in the request thread.", e)
+            except Exception as e:
+                logger.error("NLP worker failed (%s), parsing in the request thread.", e)
+        if entities is None:
+            entities = parse_entities(text, self.nlp, doc)
+        entities = freeze_entities(entities)
+        if self.entity_cache is not None:
+            self.entity_cache.put(self._entity_cache_key(text), entities)
+        return entities
+
+    def _respond(self, user_input_processed, context, doc=None, entities=None):
+        """
+        Runs intent detection and recommendations for one normalized (stripped, lowercased) message.
+
+        Args:
+            user_input_processed (str): The normalized message text.
+            context (dict): The conversation context, updated in place.
+            doc (spacy.tokens.Doc, optional): Already tokenized message (from nlp.pipe).
+            entities (dict, optional): Already extracted entities of the message (from the entity cache).
+
+        Returns:
+            tuple: (response_text, locations_list)
+        """
+        response_lines = [] 
+
+        try:
+            data = self.data # One consistent data version for the whole message
+            if entities is None:
+                entities = self._message_entities(user_input_processed, doc)
+            detect_intent_spacy(user_input_processed, context, self.nlp, entities=entities, gazetteer=data.gazetteer)
+            if logger.isEnabledFor(logging.DEBUG):
+                # Sampled, the context dump is the noisiest line at DEBUG level
+                logger.debug("Context after intent detection", extra={'context': new_context(context), 'sample': True})
+
+            if data.df.empty:
+                logger.error("DataFrame is empty, cannot provide recommendations.")
                 return "Sorry, I don't have any destination data available right now.", []
 
-            # Assuming recommend_destination returns a list of dicts or an error string/None
-            recommendations = recommend_destination(context, self.df)
+            # recommend_destination returns a ranked list of dicts or a clarifying question string
+            recommendations = recommend_destination(context, data.ranker, cache=self.recommendation_cache)
 
             locations_for_buttons = [] # Data for frontend buttons
 
+            similar = []
             if isinstance(recommendations, list):
+                # Ranked best first; full matches satisfy every preference in the context
+                full_matches = [recommendation for recommendation in recommendations if recommendation['full_match']]
+                if not any(context_places(context)) and (not full_matches or not context_features(context)):
+                    # Nothing fits the recognized preferences (or none were recognized): try the
+                    # free text against the destination descriptions instead. Not with a country
+                    # or language constraint, which the semantic search does not know about
+                    similar = self.similar_destinations([user_input_processed], SEMANTIC_RESULTS, data=data)[0]
+
+            if similar:
+                response_lines.append('From your description, these destinations sound closest:')
+                for destination in similar:
+                    desc_line = f"- {destination.get('name', 'Unknown')} in {destination.get('country', '?')}"
+                    if destination['similar_to'] not in ('description', 'attractions'):
+                        desc_line += f" (see {destination['similar_to']})"
+                    response_lines.append(desc_line)
+                    locations_for_buttons.append({
+                        'name': destination.get('name'),
+                        'lat': destination.get('latitude'),
+                        'lng': destination.get('longitude'),
+                        'id': destination.get('id')
+                    })
+                if not context.get('type'):
+                    response_lines.append('What type of destination are you looking for? (e.g., city, beach, mountain, island)')
+
+            elif isinstance(recommendations, list):
                 if not recommendations:
                     # No destinations match the criteria
                      response_lines.append('No destination from my list matches your preferences.')
@@ -254,7 +793,26 @@ class Chatbot:
                      else:
                           response_lines.append("Could you tell me more about the type, budget, or style you're looking for?")
 
-                elif len(recommendations) > 3: # Threshold for asking clarifying questions
+                elif not full_matches:
+                    # Nothing matches every preference: offer the closest matches and what they match
+                    response_lines.append('No destination from my list matches all of your preferences. These come closest:')
+                    for recommendation in recommendations:
+                        desc_line = f"- {recommendation.get('name', 'Unknown')} in {recommendation.get('country', '?')}"
+                        if recommendation['matched']:
+                            desc_line += f" (matches {', '.join(feature.split(': ', 1)[1] for feature in recommendation['matched'])})"
+                        response_lines.append(desc_line)
+                        locations_for_buttons.append({
+                            'name': recommendation.get('name'),
+                            'lat': recommendation.get('latitude'),
+                            'lng': recommendation.get('longitude'),
+                            'id': recommendation.get('id')
+                        })
+                    if context.get('type') and context.get('budget') and context.get('style'):
+                        response_lines.append("Maybe try adjusting the type, budget, or style?")
+                    else:
+                        response_lines.append("Could you tell me more about the type, budget, or style you're looking for?")
+
+                elif len(full_matches) > 3: # Threshold for asking clarifying questions
                     # Ask clarifying questions if criteria seem missing
                     if not context.get('type'):
                         response_lines.append('What type of destination are you looking for? (e.g., city, beach, mountain, island)')
@@ -266,7 +824,7 @@ class Chatbot:
                         # Criteria seem set, but still many results - offer top ones
                         response_lines.append(f"Found quite a few options! Here are some top suggestions for a {context.get('budget','any budget').lower()} {context.get('type','any type').lower()} trip matching your style:")
                         display_limit = 5 # Show top 5
-                        for i, recommendation in enumerate(recommendations[:display_limit]):
+                        for i, recommendation in enumerate(full_matches[:display_limit]):
                             # Add data for buttons
                             locations_for_buttons.append({
                                 'name': recommendation.get('name'),
@@ -274,12 +832,12 @@ class Chatbot:
                                 'lng': recommendation.get('longitude'),
                                 'id': recommendation.get('id') # Pass ID if available
                             })
-                        if len(recommendations) > display_limit:
-                             response_lines.append(f"(Showing {display_limit} of {len(recommendations)} matches)")
+                        if len(full_matches) > display_limit:
+                             response_lines.append(f"(Showing {display_limit} of {len(full_matches)} matches)")
 
                 else: # 1-3 recommendations
                     response_lines.append(f"Based on your preferences, here are a few ideas:")
-                    for i, recommendation in enumerate(recommendations):
+                    for i, recommendation in enumerate(full_matches):
                          desc_line = f"- {recommendation.get('name', 'Unknown')} in {recommendation.get('country', '?')}"
                          details = []
                          if recommendation.get('type'): details.append(recommendation.get('type'))
@@ -302,8 +860,7 @@ class Chatbot:
             return final_response_text, locations_for_buttons
 
         except Exception as e:
-             print(f"--- ERROR in process_message: {e} ---")
-             traceback.print_exc()
+             logger.exception("Error in process_message: %s", e)
              # Return a generic error message and empty locations
              return "Sorry, something went wrong while processing your request.", []
 
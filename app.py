@@ -1,21 +1,32 @@
+import hashlib
+import hmac
+import logging
 import os
-from flask import Flask, render_template, request, jsonify, session
-from ai_logic import Chatbot 
+import time
+from flask import Flask, render_template, request, jsonify, session, g
+from flask.sessions import SecureCookieSessionInterface
+from log_config import setup_logging
+from metrics import REGISTRY, REQUESTS_TOTAL, REQUEST_ERRORS_TOTAL, REQUEST_SECONDS, RequestProfiler, stage
+from ai_logic import Chatbot, new_context, validate_context
+from itinerary import DEFAULT_DAY_HOURS, DEFAULT_VISIT_MINUTES, DEFAULT_TRAVEL_KMH
+from context_store import create_context_store, new_context_id
 from datetime import timedelta
-import traceback 
+
+# --- Logging (LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE) ---
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # --- Instantiate Chatbot Globally ---
 # This loads the data once when the Flask app starts.
 try:
-    print("Attempting to initialize Chatbot globally...")
+    logger.info("Attempting to initialize Chatbot globally...")
     chatbot = Chatbot() # Instantiates and loads data via __init__
     if chatbot.df.empty:
-        print("--- CRITICAL WARNING: Chatbot initialized globally BUT DataFrame is empty. Check CSV paths/content and logs in ai_logic.py. ---")
+        logger.critical("Chatbot initialized globally BUT DataFrame is empty. Check CSV paths/content and the data loading logs.")
     else:
-         print("--- Chatbot initialized globally with data successfully. ---")
+         logger.info("Chatbot initialized globally with data successfully.")
 except Exception as e:
-    print(f"--- CRITICAL ERROR: Failed to initialize Chatbot globally: {e} ---")
-    print(traceback.format_exc())
+    logger.critical("Failed to initialize Chatbot globally: %s", e, exc_info=True)
     chatbot = None
 
 
@@ -24,12 +35,295 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'a-very-secret-key-for-dev')
 app.permanent_session_lifetime = timedelta(minutes=30)
 
+# --- Data reload settings ---
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') # Required for the /admin endpoints; unset = all of them disabled (403)
+DATA_WATCH_INTERVAL = float(os.environ.get('DATA_WATCH_INTERVAL', 0)) # Seconds between file checks, 0 = off
+
+# --- NLP worker processes (parsing outside the request threads, micro-batched) ---
+NLP_EXECUTOR_PROCESSES = int(os.environ.get('NLP_EXECUTOR_PROCESSES', 0)) # 0 = parse in the request thread
+NLP_EXECUTOR_BATCH_WINDOW_MS = float(os.environ.get('NLP_EXECUTOR_BATCH_WINDOW_MS', 0))
+NLP_EXECUTOR_MAX_BATCH = int(os.environ.get('NLP_EXECUTOR_MAX_BATCH', 32))
+NLP_EXECUTOR_QUEUE_DEPTH = int(os.environ.get('NLP_EXECUTOR_QUEUE_DEPTH', 256))
+NLP_EXECUTOR_TIMEOUT_MS = float(os.environ.get('NLP_EXECUTOR_TIMEOUT_MS', 2000)) # 0 = wait forever
+
+if chatbot is not None:
+    chatbot.start_data_watcher(DATA_WATCH_INTERVAL)
+    # The worker processes start with the first message (in serve.py: per worker, after the fork)
+    chatbot.start_nlp_executor(NLP_EXECUTOR_PROCESSES, batch_window_ms=NLP_EXECUTOR_BATCH_WINDOW_MS,
+                               max_batch=NLP_EXECUTOR_MAX_BATCH, queue_depth=NLP_EXECUTOR_QUEUE_DEPTH,
+                               timeout_ms=NLP_EXECUTOR_TIMEOUT_MS)
+
+# --- Batch chat settings ---
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', 1000))
+CHAT_BATCH_SIZE = int(os.environ.get('CHAT_BATCH_SIZE', 64)) # nlp.pipe batch size
+CHAT_BATCH_PROCESSES = int(os.environ.get('CHAT_BATCH_PROCESSES', 1)) # nlp.pipe worker processes
+
 # Ensure the instance folder exists
 try:
     os.makedirs(app.instance_path)
 except OSError:
     pass
 
+# --- Conversation context storage ---
+# memory / sqlite: the session cookie only holds a context ID; cookie: whole context in the cookie
+CONTEXT_STORE = os.environ.get('CONTEXT_STORE', 'memory')
+CONTEXT_STORE_PATH = os.environ.get('CONTEXT_STORE_PATH', os.path.join(app.instance_path, 'contexts.sqlite3'))
+context_store = create_context_store(
+    CONTEXT_STORE, ttl=app.permanent_session_lifetime.total_seconds(), path=CONTEXT_STORE_PATH
+)
+
+
+def load_context():
+    """Returns the conversation context of the current session (a new one if there is none)."""
+    if context_store is None:
+        return session.get('context', new_context())
+    context_id = session.get('context_id')
+    context = context_store.load(context_id) if context_id else None
+    return context if context is not None else new_context()
+
+
+def save_context(context):
+    """Stores the conversation context of the current session."""
+    if context_store is None:
+        session['context'] = context
+        return
+    context_id = session.get('context_id')
+    if not context_id:
+        context_id = session['context_id'] = new_context_id()
+    session.pop('context', None) # Context from a cookie written before the store was enabled
+    context_store.save(context_id, context)
+
+
+# --- Metrics and profiling ---
+# PROFILE_SAMPLE_RATE > 0 profiles that fraction of requests; an admin can force a single
+# request with the header X-Profile: 1 (needs X-Admin-Token)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile') # cprofile | tracemalloc
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+request_profiler = RequestProfiler(PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_DIR)
+
+
+class TimedSessionInterface(SecureCookieSessionInterface):
+    """Signed cookie sessions, with cookie parsing / serialization timed as stages."""
+
+    def open_session(self, app, request):
+        with stage('session_cookie_load'):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if response.cache_control.public:
+            return # Publicly cacheable responses (location details, static files) must not set cookies
+        with stage('session_cookie_save'):
+            return super().save_session(app, session, response)
+
+
+app.session_interface = TimedSessionInterface()
+
+
+def request_route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.profile_token = None
+    forced = request.headers.get('X-Profile') == '1' and admin_authorized()
+    if request_profiler.should_profile(forced):
+        g.profile_token = request_profiler.start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = request_route()
+    start = g.pop('request_start', None)
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route)
+    REQUESTS_TOTAL.inc(route, request.method, str(response.status_code))
+    if response.status_code >= 500:
+        REQUEST_ERRORS_TOTAL.inc(route)
+    token = g.pop('profile_token', None)
+    if token is not None:
+        path = request_profiler.stop(token, f"{request.method}-{route}")
+        logger.info("Request profile written to %s", path)
+    return response
+
+
+def collect_app_metrics():
+    """Scrape-time gauges: cache hit rates, context store counters and data-load timings."""
+    families = []
+    if chatbot is not None:
+        live = {name: stats for name, stats in chatbot.cache_stats().items() if stats}
+        families += [
+            ('chatbot_cache_hits_total', 'counter', "Cache hits.", [({'cache': name}, stats['hits']) for name, stats in live.items()]),
+            ('chatbot_cache_misses_total', 'counter', "Cache misses.", [({'cache': name}, stats['misses']) for name, stats in live.items()]),
+            ('chatbot_cache_hit_ratio', 'gauge', "Cache hits / lookups.", [({'cache': name}, stats['hit_rate']) for name, stats in live.items()]),
+            ('chatbot_cache_entries', 'gauge', "Entries in the cache.", [({'cache': name}, stats['size']) for name, stats in live.items()]),
+            ('chatbot_cache_evictions_total', 'counter', "Entries evicted by the size or memory bound.", [({'cache': name}, stats['evictions']) for name, stats in live.items()]),
+            ('chatbot_cache_bytes', 'gauge', "Estimated bytes held by memory-bounded caches.", [({'cache': name}, stats['bytes']) for name, stats in live.items() if stats['max_bytes']]),
+        ]
+        data = chatbot.data
+        reload_status = chatbot.reload_status
+        families += [
+            ('chatbot_data_info', 'gauge', "Loaded data version and source.", [({'version': data.version, 'source': data.source}, 1)]),
+            ('chatbot_data_load_seconds', 'gauge', "Duration of the last successful data load.", [({}, round(data.load_seconds, 6))]),
+            ('chatbot_data_load_stage_seconds', 'gauge', "Duration of each step of the last successful data load.",
+             [({'stage': name}, seconds) for name, seconds in data.load_stages.items()]),
+            ('chatbot_data_loaded_timestamp_seconds', 'gauge', "Unix time of the last successful data load.", [({}, data.loaded_at)]),
+            ('chatbot_data_rows', 'gauge', "Rows in the loaded data.", [({'table': 'locations'}, len(data.df)), ({'table': 'pois'}, len(data.pois))]),
+            ('chatbot_data_reloads_total', 'counter', "Finished data reloads.", [({}, reload_status['count'])]),
+            ('chatbot_data_last_reload_seconds', 'gauge', "Duration of the last data reload attempt.", [({}, reload_status['last_seconds'])]),
+        ]
+    if context_store is not None:
+        store = context_store.stats()
+        families += [
+            ('context_store_loads_total', 'counter', "Context loads.", [({'backend': store['backend']}, store['loads'])]),
+            ('context_store_load_misses_total', 'counter', "Context loads without a stored context.", [({'backend': store['backend']}, store['load_misses'])]),
+            ('context_store_saves_total', 'counter', "Context saves.", [({'backend': store['backend']}, store['saves'])]),
+            ('context_store_contexts', 'gauge', "Stored contexts.", [({'backend': store['backend']}, store['contexts'])]),
+            ('context_store_avg_bytes_saved', 'gauge', "Average bytes saved per stored context vs. JSON.", [({'backend': store['backend']}, store['avg_bytes_saved'])]),
+        ]
+    families.append(('request_profiles_written_total', 'counter', "Request profiles written.", [({'mode': request_profiler.mode}, request_profiler.dumps)]))
+    return families
+
+
+REGISTRY.register_collector(collect_app_metrics)
+
+# --- HTTP caching ---
+# GET /location_details/<id> is cacheable for LOCATION_DETAILS_MAX_AGE seconds and revalidated
+# with ETags derived from the data version. Static URLs carry ?v=<content hash>; requests with
+# the current hash are cached for a year, others are revalidated on every use.
+LOCATION_DETAILS_MAX_AGE = int(os.environ.get('LOCATION_DETAILS_MAX_AGE', 300))
+STATIC_MAX_AGE = 365 * 24 * 3600
+LOCATION_CODINGS = ('br', 'gzip') # Preferred first
+
+_static_hashes = {} # filename -> (mtime, hash)
+
+
+def static_file_hash(filename):
+    """Short content hash of a file in the static folder, recomputed when its mtime changes."""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as static_file:
+            cached = _static_hashes[filename] = (mtime, hashlib.sha1(static_file.read()).hexdigest()[:10])
+    return cached[1]
+
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """url_for('static', filename=...) -> /static/<filename>?v=<content hash>."""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = static_file_hash(values['filename'])
+        if version:
+            values['v'] = version
+
+
+@app.after_request
+def cache_versioned_static(response):
+    if request.endpoint == 'static' and response.status_code == 200:
+        version = request.args.get('v')
+        if version and version == static_file_hash(request.view_args['filename']):
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+    return response
+
+
+def negotiate_coding(entry):
+    """Best precompressed coding of the entry accepted by the client, or None for identity."""
+    for coding in LOCATION_CODINGS:
+        if coding in entry.encoded and request.accept_encodings.quality(coding) > 0:
+            return coding
+    return None
+
+
+def location_details_response(entry):
+    """Cacheable /location_details/<id> response: 304 on a matching If-None-Match."""
+    coding = negotiate_coding(entry)
+    etag = entry.etag if coding is None else f"{entry.etag}-{coding}"
+    # Any representation of the same data version is still valid for the client
+    known = [entry.etag] + [f"{entry.etag}-{other}" for other in entry.encoded]
+    if any(request.if_none_match.contains_weak(tag) for tag in known):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.body if coding is None else entry.encoded[coding], mimetype='application/json')
+        if coding is not None:
+            response.headers['Content-Encoding'] = coding
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = LOCATION_DETAILS_MAX_AGE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+# --- Spatial query settings ---
+SPATIAL_MAX_RESULTS = int(os.environ.get('SPATIAL_MAX_RESULTS', 500)) # Largest k / limit per request
+SPATIAL_DEFAULT_RESULTS = 50
+_REQUIRED = object()
+
+
+def query_number(name, cast=float, default=_REQUIRED, minimum=None, maximum=None):
+    """
+    Reads a numeric query parameter.
+
+    Raises:
+        ValueError: If the parameter is missing (and has no default), not a number or out of range.
+    """
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        if default is _REQUIRED:
+            raise ValueError(f"Missing '{name}' parameter.")
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' parameter: {raw!r}.") from None
+    if value != value or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        if maximum is None:
+            raise ValueError(f"'{name}' must be at least {minimum}.")
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}.")
+    return value
+
+
+def query_list(name):
+    """Values of ?name=a,b (or repeated name=); None when not given."""
+    values = [value.strip() for raw in request.args.getlist(name) for value in raw.split(',') if value.strip()]
+    return values or None
+
+
+def query_types():
+    """Type filter from ?types=a,b (or repeated types=); None when not given."""
+    return query_list('types')
+
+
+def nearby_query():
+    """Common parameters of the nearby endpoints: lat, lng, k, offset, max_km, types."""
+    return {
+        'lat': query_number('lat', minimum=-90, maximum=90),
+        'lng': query_number('lng', minimum=-180, maximum=180),
+        'k': query_number('k', int, SPATIAL_DEFAULT_RESULTS, 1, SPATIAL_MAX_RESULTS),
+        'offset': query_number('offset', int, 0, 0),
+        'max_km': query_number('max_km', default=None, minimum=0),
+        'types': query_types(),
+    }
+
+
+# --- Full-text search settings ---
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 100)) # Largest k per request
+SEARCH_DEFAULT_RESULTS = 20
+
+
+# --- Itinerary settings ---
+ITINERARY_MAX_POIS = int(os.environ.get('ITINERARY_MAX_POIS', 500)) # Largest number of POIs per route
+ITINERARY_MAX_DAYS = 60
+
+
 # --- Routes ---
 
 @app.route('/')
@@ -42,10 +336,10 @@ def chat():
     """Handles general chat messages using the Chatbot's process_message."""
     # Check if the global chatbot instance failed to initialize
     if chatbot is None:
-        print("Error in /chat: Global chatbot instance is None.")
+        logger.error("Error in /chat: Global chatbot instance is None.")
         return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
     if chatbot.df.empty:
-        print("Error in /chat: Global chatbot DataFrame is empty.")
+        logger.error("Error in /chat: Global chatbot DataFrame is empty.")
         return jsonify({"error": "Chatbot data is currently unavailable."}), 503
 
     try:
@@ -55,14 +349,9 @@ def chat():
 
         session.permanent = True 
 
-        # Retrieve context from session or initialize if not present
-        context = session.get('context', {
-            'suitable_for': [], 
-            'style': [],
-            'intents': [],
-            'type': None,
-            'budget': None
-        })
+        # Retrieve context from the store or initialize if not present
+        with stage('context_load'):
+            context = load_context()
 
        
         ai_response_text, locations_list = chatbot.process_message(user_message, context)
@@ -72,85 +361,325 @@ def chat():
             "locations": locations_list  # List of dicts for buttons
         }
 
-        # Store the potentially updated context back into the session
-        session['context'] = context
+        # Store the potentially updated context
+        with stage('context_save'):
+            save_context(context)
 
-        return jsonify(response_data)
+        with stage('serialize_json'):
+            return jsonify(response_data)
 
     except Exception as e:
-        print(f"Error in /chat endpoint: {e}\n{traceback.format_exc()}")
+        logger.exception("Error in /chat endpoint: %s", e)
         return jsonify({"error": "An internal error occurred during chat processing."}), 500
 
 
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Handles many chat messages in one request (replay / evaluation jobs).
+    Expects {"items": [{"message": str, "context": dict (optional)}, ...]} and returns
+    {"results": [{"response", "locations", "context"}, ...]} in the same order.
+    The Flask session is not used; every item carries its own context.
+    """
+    if chatbot is None:
+        logger.error("Error in /chat/batch: Global chatbot instance is None.")
+        return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
+    if chatbot.df.empty:
+        logger.error("Error in /chat/batch: Global chatbot DataFrame is empty.")
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Missing 'items' list in request."}), 400
+        if len(items) > CHAT_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"Too many items in batch (max {CHAT_BATCH_MAX_ITEMS})."}), 413
+
+        batch = []
+        for position, item in enumerate(items):
+            message = item.get('message') if isinstance(item, dict) else None
+            if not isinstance(message, str) or not message:
+                return jsonify({"error": f"Item {position} has no 'message'."}), 400
+            try:
+                item_context = validate_context(item.get('context'))
+            except ValueError as e:
+                return jsonify({"error": f"Item {position} has an invalid 'context': {e}."}), 400
+            batch.append((message, item_context))
+
+        results = chatbot.process_messages(batch, batch_size=CHAT_BATCH_SIZE, n_process=CHAT_BATCH_PROCESSES)
+
+        return jsonify({
+            "results": [
+                {"response": response_text, "locations": locations_list, "context": context}
+                for (response_text, locations_list), (_, context) in zip(results, batch)
+            ]
+        })
+
+    except Exception as e:
+        logger.exception("Error in /chat/batch endpoint: %s", e)
+        return jsonify({"error": "An internal error occurred during batch chat processing."}), 500
+
+
 @app.route('/location_details', methods=['POST'])
 def location_details():
-    """Handles requests for details about a specific location."""
+    """
+    Handles requests for details about a specific location.
+    Expects {"location_id": int} or {"location_name": str}; the ID is preferred.
+    """
     # Check if the global chatbot instance failed to initialize or has no data
     if chatbot is None:
-        print("Error in /location_details: Global chatbot instance is None.")
+        logger.error("Error in /location_details: Global chatbot instance is None.")
         return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
     if chatbot.df.empty:
-        print("Error in /location_details: Global chatbot DataFrame is empty.")
+        logger.error("Error in /location_details: Global chatbot DataFrame is empty.")
         return jsonify({"error": "Chatbot data is currently unavailable."}), 503
 
     try:
         data = request.get_json()
+        location_id = data.get('location_id')
         location_name = data.get('location_name')
 
-        if not location_name:
-            return jsonify({"error": "Missing 'location_name' in request."}), 400
+        if location_id is None and not location_name:
+            return jsonify({"error": "Missing 'location_id' or 'location_name' in request."}), 400
 
-        print(f"Received request for details: {location_name}")
+        location_label = location_name if location_id is None else f"ID {location_id}"
+        logger.debug("Received request for details: %s", location_label)
 
-        # Find location data using the chatbot's method
-        location_data = chatbot.get_location_data_by_name(location_name) # Method from ai_logic.py
+        # Prebuilt entry (description + POIs already serialized) from the location index
+        entry = chatbot.get_location_details(location_id=location_id, name=location_name)
 
-        if location_data is None:
-            print(f"Location not found via get_location_data_by_name: {location_name}")
+        if entry is None:
+            logger.info("Location not found via get_location_details: %s", location_label)
             # Provide a more specific error message if location not found
-            return jsonify({"error": f"Details not found for location '{location_name}'. It might not be in my database."}), 404
-
-        # Get description using the chatbot's method
-        description = chatbot.get_description(location_data) # Method from ai_logic.py
-
-        # Get POIs (stored as a list of dicts in the DataFrame row)
-        pois = location_data.get('points_of_interest', [])
-        # Basic validation that POIs are a list
-        if not isinstance(pois, list):
-             print(f"Warning: POIs for {location_name} were not a list. Resetting to empty.")
-             pois = []
+            return jsonify({"error": f"Details not found for location '{location_name or location_label}'. It might not be in my database."}), 404
 
-        response_payload = {
-            "description": description,
-            "points_of_interest": pois
-        }
-      
-        return jsonify(response_payload)
+        return app.response_class(entry.body, mimetype='application/json')
 
     except Exception as e:
         location_name_for_error = request.json.get('location_name', 'Unknown Location') if request.is_json else 'Unknown Location'
-        print(f"Error in /location_details endpoint for {location_name_for_error}: {e}\n{traceback.format_exc()}")
+        logger.exception("Error in /location_details endpoint for %s: %s", location_name_for_error, e)
         return jsonify({"error": "An internal server error occurred while fetching location details."}), 500
 
 
+@app.route('/location_details/<int:location_id>', methods=['GET'])
+def location_details_by_id(location_id):
+    """
+    Cacheable variant of /location_details for one LocationID: precompressed body (gzip, or br
+    when the brotli package is installed), strong ETag, Cache-Control and 304 responses.
+    """
+    if chatbot is None or chatbot.df.empty:
+        logger.error("Error in /location_details/%s: Chatbot or its data is unavailable.", location_id)
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+
+    entry = chatbot.get_location_details(location_id=location_id)
+    if entry is None:
+        logger.info("Location not found via get_location_details: ID %s", location_id)
+        return jsonify({"error": f"Details not found for location ID {location_id}. It might not be in my database."}), 404
+    return location_details_response(entry)
+
+
+@app.route('/pois/nearby', methods=['GET'])
+def pois_nearby():
+    """
+    The POIs nearest to a point: ?lat=&lng=[&k=50][&offset=0][&max_km=][&types=Museum,Park]
+    Returns {"results": [POI + location_id + distance_km, ...], "next_offset": int or null}.
+    """
+    if chatbot is None or chatbot.df.empty:
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+    try:
+        query = nearby_query()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage('spatial_query'):
+        results = chatbot.nearby_pois(**query)
+    next_offset = query['offset'] + len(results) if len(results) == query['k'] else None
+    return jsonify({"results": results, "next_offset": next_offset})
+
+
+@app.route('/pois/viewport', methods=['GET'])
+def pois_viewport():
+    """
+    The POIs inside a map viewport, closest to its centre first:
+    ?south=&west=&north=&east=[&limit=50][&offset=0][&types=...]  (west > east crosses the antimeridian)
+    Returns {"results": [...], "total": int, "next_offset": int or null}.
+    """
+    if chatbot is None or chatbot.df.empty:
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+    try:
+        south = query_number('south', minimum=-90, maximum=90)
+        north = query_number('north', minimum=-90, maximum=90)
+        west = query_number('west', minimum=-180, maximum=180)
+        east = query_number('east', minimum=-180, maximum=180)
+        limit = query_number('limit', int, SPATIAL_DEFAULT_RESULTS, 1, SPATIAL_MAX_RESULTS)
+        offset = query_number('offset', int, 0, 0)
+        if south > north:
+            raise ValueError("'south' must not be greater than 'north'.")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage('spatial_query'):
+        results, total = chatbot.pois_in_viewport(south, west, north, east, query_types(), limit, offset)
+    next_offset = offset + len(results) if offset + len(results) < total else None
+    return jsonify({"results": results, "total": total, "next_offset": next_offset})
+
+
+@app.route('/search', methods=['GET'])
+def search():
+    """
+    Full-text search over destinations and POIs, best BM25 score first:
+    ?q=...[&k=20][&offset=0][&kind=destination|poi][&types=Museum,...][&countries=Italy,...][&prefix=0]
+    The last word of q also matches longer words (search as you type) unless prefix=0.
+    Returns {"results": [...], "total": int, "next_offset": int or null}.
+    """
+    if chatbot is None or chatbot.df.empty:
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+    query = request.args.get('q', '').strip()
+    try:
+        if not query:
+            raise ValueError("Missing 'q' parameter.")
+        k = query_number('k', int, SEARCH_DEFAULT_RESULTS, 1, SEARCH_MAX_RESULTS)
+        offset = query_number('offset', int, 0, 0)
+        kinds = query_list('kind')
+        if kinds and not set(kinds) <= {'destination', 'poi'}:
+            raise ValueError("'kind' must be 'destination' or 'poi'.")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    prefix = request.args.get('prefix', '1').lower() not in ('0', 'false', 'no')
+    with stage('search'):
+        results, total = chatbot.search(query, k, offset, kinds, query_types(), query_list('countries'), prefix)
+    next_offset = offset + len(results) if offset + len(results) < total else None
+    return jsonify({"results": results, "total": total, "next_offset": next_offset})
+
+
+@app.route('/itinerary', methods=['GET'])
+def itinerary():
+    """
+    Visiting order of a destination's POIs, split into days:
+    ?location_id=[&pois=0,3,5][&start_lat=&start_lng=][&days=][&day_hours=8][&visit_minutes=60][&travel_kmh=30]
+    pois are positions in the destination's POI list (/location_details); default all of them.
+    Returns {"location_id": int, "distance_km": float, "days": [{"day", "distance_km", "hours", "stops": [...]}]}.
+    """
+    if chatbot is None or chatbot.df.empty:
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+    try:
+        location_id = query_number('location_id', int, minimum=0)
+        poi_indexes = query_list('pois')
+        if poi_indexes is not None:
+            try:
+                poi_indexes = [int(index) for index in poi_indexes]
+            except ValueError:
+                raise ValueError("'pois' must be a list of POI indexes.") from None
+        start_lat = query_number('start_lat', default=None, minimum=-90, maximum=90)
+        start_lng = query_number('start_lng', default=None, minimum=-180, maximum=180)
+        if (start_lat is None) != (start_lng is None):
+            raise ValueError("'start_lat' and 'start_lng' must be given together.")
+        options = {
+            'start': (start_lat, start_lng) if start_lat is not None else None,
+            'days': query_number('days', int, None, 1, ITINERARY_MAX_DAYS),
+            'day_hours': query_number('day_hours', default=DEFAULT_DAY_HOURS, minimum=1, maximum=24),
+            'visit_minutes': query_number('visit_minutes', default=DEFAULT_VISIT_MINUTES, minimum=0, maximum=24 * 60),
+            'travel_kmh': query_number('travel_kmh', default=DEFAULT_TRAVEL_KMH, minimum=1, maximum=1000),
+        }
+        with stage('itinerary'):
+            plan = chatbot.plan_itinerary(location_id, poi_indexes, max_pois=ITINERARY_MAX_POIS, **options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if plan is None:
+        return jsonify({"error": f"Location ID {location_id} not found."}), 404
+    return jsonify(plan)
+
+
+@app.route('/destinations/nearby', methods=['GET'])
+def destinations_nearby():
+    """
+    The destinations nearest to a point; same parameters as /pois/nearby (types = destination types).
+    """
+    if chatbot is None or chatbot.df.empty:
+        return jsonify({"error": "Chatbot data is currently unavailable."}), 503
+    try:
+        query = nearby_query()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage('spatial_query'):
+        results = chatbot.nearby_destinations(**query)
+    next_offset = query['offset'] + len(results) if len(results) == query['k'] else None
+    return jsonify({"results": results, "next_offset": next_offset})
+
+
 @app.route('/reset_session', methods=['GET'])
 def reset_session():
     """Clears the user's session data."""
+    if context_store is not None and session.get('context_id'):
+        context_store.delete(session['context_id'])
     session.clear()
-    print("Session cleared.")
+    logger.debug("Session cleared.")
     return jsonify({"message": "Session cleared successfully."})
 
 
 
+# --- Monitoring ---
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the request, stage, cache and data metrics."""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Admin routes ---
+
+def admin_authorized():
+    """True if the request carries the configured admin token."""
+    token = request.headers.get('X-Admin-Token')
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+
+@app.route('/admin/reload_data', methods=['POST'])
+def reload_data():
+    """Starts a background reload of the destination and POI data (requires X-Admin-Token)."""
+    if chatbot is None:
+        return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden."}), 403
+
+    wait = request.args.get('wait', '').lower() in ('1', 'true', 'yes')
+    started = chatbot.reload_data(wait=wait)
+    status = chatbot.data_status()
+    if not started:
+        return jsonify({"message": "A reload is already in progress.", "status": status}), 409
+    return jsonify({"message": "Reload finished." if wait else "Reload started.", "status": status}), 200 if wait else 202
+
+
+@app.route('/admin/data_status', methods=['GET'])
+def data_status():
+    """Reports the loaded data version, row counts and reload timings (requires X-Admin-Token)."""
+    if chatbot is None:
+        return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden."}), 403
+    return jsonify(chatbot.data_status())
+
+
+@app.route('/admin/cache_stats', methods=['GET'])
+def cache_stats():
+    """Reports size and hit / miss counters of the Chatbot caches and the context store (requires X-Admin-Token)."""
+    if chatbot is None:
+        return jsonify({"error": "Chatbot service is unavailable due to initialization failure."}), 503
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden."}), 403
+    stats = chatbot.cache_stats()
+    stats['context_store'] = context_store.stats() if context_store is not None else None
+    return jsonify(stats)
+
+
 # --- Main execution ---
 if __name__ == '__main__':
     # Check if chatbot failed initialization before running
     if chatbot is None:
-        print("\n--- APPLICATION FAILED TO START: Chatbot could not be initialized. Check logs above. ---\n")
+        logger.critical("APPLICATION FAILED TO START: Chatbot could not be initialized. Check logs above.")
     elif chatbot.df.empty:
-         print("\n--- APPLICATION WARNING: Chatbot initialized but data is empty. App will run but may lack functionality. Check CSV files and paths. ---\n")
+         logger.warning("Chatbot initialized but data is empty. App will run but may lack functionality. Check CSV files and paths.")
     else:
-         print("\n--- Chatbot initialized successfully. Starting Flask app... ---\n")
+         logger.info("Chatbot initialized successfully. Starting Flask app...")
 
     # Use host='0.0.0.0' to make it accessible on your network
     # Debug=True MUST be False in production
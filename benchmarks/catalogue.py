@@ -0,0 +1,200 @@
+"""
+Synthetic travel catalogue in the schema of destinations.csv and points_of_interest.csv, at any
+scale. Run from the project root:
+
+    python -m benchmarks.catalogue --destinations 100000 --pois 5000000 --out catalogue/
+
+Vocabularies are the real ones: types and budgets as written in destinations.csv (the keys of
+type_mapping / budget_mapping), Travel Style and Suitable For values from the synonyms in
+mappings.py, Best Time to Visit strings and POI types as they occur in the shipped data.
+Frequent values are drawn more often (Zipf-like weights), names are unique pseudo-words and
+POIs lie around their destination. The same seed gives the same files. POIs are generated and
+written in chunks, so memory stays flat for millions of rows.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from mappings import (budget_mapping, style_synonym_mapping, suitable_for_synonyms_mapping,
+                      type_mapping)
+
+# (country, language, centre latitude, centre longitude)
+COUNTRIES = (
+    ('France', 'French', 46.6, 2.4), ('Italy', 'Italian', 42.8, 12.5), ('Spain', 'Spanish', 40.2, -3.6),
+    ('Germany', 'German', 51.1, 10.4), ('Greece', 'Greek', 39.1, 22.9), ('England', 'English', 52.6, -1.5),
+    ('Scotland', 'English', 56.8, -4.2), ('Croatia', 'Croatian', 45.1, 15.2), ('Portugal', 'Portuguese', 39.6, -8.0),
+    ('Belgium', 'Dutch', 50.6, 4.6), ('Switzerland', 'German', 46.8, 8.2), ('Poland', 'Polish', 52.0, 19.1),
+    ('Austria', 'German', 47.6, 14.1), ('Czech Republic', 'Czech', 49.8, 15.5), ('Norway', 'Norwegian', 61.4, 8.5),
+    ('Romania', 'Romanian', 45.9, 24.9), ('Netherlands', 'Dutch', 52.2, 5.5), ('Slovakia', 'Slovak', 48.7, 19.7),
+    ('Ireland', 'English', 53.2, -8.0), ('Hungary', 'Hungarian', 47.2, 19.5), ('Sweden', 'Swedish', 62.0, 15.0),
+    ('Iceland', 'Icelandic', 64.9, -18.6), ('Slovenia', 'Slovenian', 46.1, 14.9), ('Malta', 'Maltese', 35.9, 14.4),
+)
+BEST_TIMES = (
+    'Spring, Summer, Autumn', 'Spring, Autumn', 'Spring, Summer', 'Summer', 'Summer, Winter',
+    'Late Spring, Summer, Early Autumn', 'Summer, Late Spring', 'Spring, Summer, Early Autumn',
+    'Spring, Late Summer, Early Autumn', 'Spring, Early Summer, Autumn', 'Summer, Winter (Northern Lights)',
+    'Spring, Autumn, Winter (Christmas Markets)', 'Winter', 'Autumn, Winter',
+)
+POI_TYPES = ('Sight', 'Town', 'Activity', 'Park', 'Museum', 'Viewpoint', 'Beach', 'Lake', 'Mountain Peak',
+             'Trail', 'Castle', 'Winery/Region', 'Region', 'Forest')
+SYLLABLES = ('ka', 'lo', 'ri', 'ven', 'tas', 'mor', 'el', 'din', 'ost', 'pra', 'gu', 'sel', 'an', 'bri', 'tou', 'nev',
+             'sa', 'mir', 'do', 'len', 'ca', 'ber', 'ni', 'val')
+FILLER_WORDS = ('the', 'and', 'with', 'of', 'a', 'to', 'in', 'its', 'for', 'famous', 'charming', 'old', 'historic',
+                'quiet', 'lively', 'scenic', 'local', 'views', 'streets', 'square', 'harbour', 'valley', 'hills',
+                'village', 'market', 'church', 'walks', 'river', 'lake', 'coast', 'cafes', 'food', 'wine', 'gardens')
+DESTINATION_COLUMNS = ['LocationID', 'LocationName', 'Country', 'Language', 'Type', 'Budget', 'Best Time to Visit',
+                       'Travel Style', 'Suitable For', 'Keywords/Main Attractions', 'Latitude', 'Longitude', 'Description']
+POI_COLUMNS = ['ParentLocationID', 'POIName', 'POIType', 'POILat', 'POILng', 'POIDescription', 'POIDescriptionOld']
+POI_CHUNK_DESTINATIONS = 20000 # Destinations whose POIs are generated and written at once
+
+
+def zipf_weights(count, exponent=1.0):
+    """Probabilities proportional to 1 / rank ** exponent."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def vocabulary(synonym_mapping):
+    """Every standardized value and synonym of a mapping, title-cased, standardized values first."""
+    values = list(dict.fromkeys(
+        [key.title() for key in synonym_mapping]
+        + [synonym.title() for synonyms in synonym_mapping.values() for synonym in synonyms]
+    ))
+    return np.array(values, dtype=object)
+
+
+def pseudo_words(numbers):
+    """Unique pseudo-word per non-negative number (its digits in base len(SYLLABLES))."""
+    base = len(SYLLABLES)
+    words = []
+    for number in numbers:
+        syllables = [SYLLABLES[number % base]]
+        number //= base
+        while number:
+            syllables.append(SYLLABLES[number % base])
+            number //= base
+        syllables.append(SYLLABLES[len(syllables) % base]) # At least two syllables
+        words.append(''.join(syllables).title())
+    return words
+
+
+def pick_lists(rng, values, weights, low, high, rows):
+    """rows comma-separated lists of low..high distinct values."""
+    return [', '.join(rng.choice(values, size, replace=False, p=weights)) for size in rng.integers(low, high + 1, rows)]
+
+
+def sentences(rng, words, rows, low, high):
+    """rows texts of low..high words; content words from words, mixed with FILLER_WORDS."""
+    pool = np.concatenate((np.array(FILLER_WORDS, dtype=object), np.char.lower(words.astype(str)).astype(object)))
+    weights = zipf_weights(len(pool), 0.8)
+    lengths = rng.integers(low, high + 1, rows)
+    drawn = rng.choice(pool, int(lengths.sum()), p=weights)
+    ends = np.cumsum(lengths)
+    return [' '.join(drawn[end - length:end]).capitalize() + '.' for end, length in zip(ends, lengths)]
+
+
+def generate_destinations(destinations, seed=1):
+    """The destinations DataFrame (schema of destinations.csv)."""
+    rng = np.random.default_rng(seed)
+    countries = rng.choice(len(COUNTRIES), destinations, p=zipf_weights(len(COUNTRIES), 0.7))
+    country_table = np.array(COUNTRIES, dtype=object)
+    styles = vocabulary(style_synonym_mapping)
+    suitable = vocabulary(suitable_for_synonyms_mapping)
+    types = np.array(list(type_mapping), dtype=object)
+    budgets = np.array(list(budget_mapping), dtype=object)
+    names = pseudo_words(rng.permutation(destinations) + len(SYLLABLES))
+    return pd.DataFrame({
+        'LocationID': np.arange(1, destinations + 1),
+        'LocationName': names,
+        'Country': country_table[countries, 0],
+        'Language': country_table[countries, 1],
+        'Type': rng.choice(types, destinations, p=zipf_weights(len(types), 0.8)),
+        'Budget': rng.choice(budgets, destinations, p=zipf_weights(len(budgets), 1.0)),
+        'Best Time to Visit': rng.choice(np.array(BEST_TIMES, dtype=object), destinations, p=zipf_weights(len(BEST_TIMES), 1.0)),
+        'Travel Style': pick_lists(rng, styles, zipf_weights(len(styles), 0.9), 3, 7, destinations),
+        'Suitable For': pick_lists(rng, suitable, zipf_weights(len(suitable), 0.9), 2, 5, destinations),
+        'Keywords/Main Attractions': pick_lists(rng, styles, zipf_weights(len(styles), 0.7), 2, 4, destinations),
+        'Latitude': np.round(country_table[countries, 2].astype(float) + rng.normal(0, 1.5, destinations), 4),
+        'Longitude': np.round(country_table[countries, 3].astype(float) + rng.normal(0, 2.0, destinations), 4),
+        'Description': sentences(rng, styles, destinations, 25, 60),
+    })
+
+
+def generate_pois(destinations_df, pois, seed=1):
+    """
+    Yields POI DataFrames (schema of points_of_interest.csv) for consecutive chunks of destinations.
+    Each destination gets at least one POI; the rest are spread with a heavy tail (a few
+    destinations have many POIs, like large cities).
+    """
+    rng = np.random.default_rng(seed + 1)
+    destinations = len(destinations_df)
+    if destinations == 0:
+        return
+    weights = rng.pareto(1.5, destinations) + 1
+    counts = 1 + rng.multinomial(max(0, pois - destinations), weights / weights.sum())
+    styles = vocabulary(style_synonym_mapping)
+    poi_types = np.array(POI_TYPES, dtype=object)
+    location_ids = destinations_df['LocationID'].to_numpy()
+    lat = destinations_df['Latitude'].to_numpy()
+    lng = destinations_df['Longitude'].to_numpy()
+    next_name = 0
+    for first in range(0, destinations, POI_CHUNK_DESTINATIONS):
+        chunk = slice(first, min(destinations, first + POI_CHUNK_DESTINATIONS))
+        chunk_counts = counts[chunk]
+        rows = int(chunk_counts.sum())
+        parents = np.repeat(np.arange(chunk.start, chunk.stop), chunk_counts)
+        types = rng.choice(poi_types, rows, p=zipf_weights(len(poi_types), 1.1))
+        names = [f"{word} {poi_type}" for word, poi_type in zip(pseudo_words(np.arange(next_name, next_name + rows)), types)]
+        next_name += rows
+        yield pd.DataFrame({
+            'ParentLocationID': location_ids[parents],
+            'POIName': names,
+            'POIType': types,
+            'POILat': np.round(lat[parents] + rng.normal(0, 0.05, rows), 5),
+            'POILng': np.round(lng[parents] + rng.normal(0, 0.07, rows), 5),
+            'POIDescription': sentences(rng, styles, rows, 8, 25),
+            'POIDescriptionOld': '',
+        }, columns=POI_COLUMNS)
+
+
+def write_catalogue(out_dir, destinations, pois, seed=1):
+    """
+    Writes destinations.csv and points_of_interest.csv into out_dir.
+
+    Returns:
+        tuple: (destinations CSV path, POIs CSV path, number of POIs written)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    locations_path = os.path.join(out_dir, 'destinations.csv')
+    pois_path = os.path.join(out_dir, 'points_of_interest.csv')
+    destinations_df = generate_destinations(destinations, seed)
+    destinations_df.to_csv(locations_path, index=False, columns=DESTINATION_COLUMNS)
+    written = 0
+    with open(pois_path, 'w', newline='') as pois_file:
+        pois_file.write(','.join(POI_COLUMNS) + '\n')
+        for chunk in generate_pois(destinations_df, pois, seed):
+            chunk.to_csv(pois_file, index=False, header=False)
+            written += len(chunk)
+    return locations_path, pois_path, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--destinations', type=int, default=10000)
+    parser.add_argument('--pois', type=int, default=100000, help="Number of POIs (at least one per destination)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='catalogue')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    locations_path, pois_path, written = write_catalogue(args.out, args.destinations, args.pois, args.seed)
+    size_mb = (os.path.getsize(locations_path) + os.path.getsize(pois_path)) / 2 ** 20
+    print(f"{args.destinations} destinations, {written} POIs ({size_mb:.1f} MB) written to {args.out} "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold start comparison of the data layer: CSV parsing vs. the memory-mapped binary snapshot
+(see dataset.py). Each variant runs in a fresh subprocess. Run from the project root:
+
+    python -m benchmarks.cold_start [--locations destinations.csv] [--pois points_of_interest.csv]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import rss_mb
+
+
+def measure(source, locations, pois, snapshot_dir):
+    """Loads the data once from the given source in this process and returns the measurements."""
+    import pandas # noqa: F401 - import cost is not attributed to the data layer
+    import dataset
+    from destination_index import DestinationIndex
+    from location_index import LocationIndex
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if source == 'snapshot':
+            locations_df, poi_table = dataset.load_snapshot(snapshot_dir)
+        else:
+            locations_df, poi_table = dataset.load_csv_dataset(locations, pois)
+    load_seconds = time.perf_counter() - start
+    DestinationIndex(locations_df)
+    LocationIndex(locations_df, poi_table)
+    total_seconds = time.perf_counter() - start
+
+    return {
+        "source": source,
+        "locations": len(locations_df),
+        "pois": len(poi_table),
+        "load_seconds": round(load_seconds, 4),
+        "load_and_index_seconds": round(total_seconds, 4),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", default="destinations.csv")
+    parser.add_argument("--pois", default="points_of_interest.csv")
+    parser.add_argument("--json", help="Write the report to this JSON file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.locations, args.pois, args.snapshot_dir)))
+        return
+
+    import dataset
+    with tempfile.TemporaryDirectory() as temp_dir:
+        snapshot_dir = os.path.join(temp_dir, "snapshot")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            dataset.build_snapshot(args.locations, args.pois, snapshot_dir)
+        print(f"Snapshot built in {time.perf_counter() - start:.2f}s")
+
+        results = []
+        for source in ("csv", "snapshot"):
+            command = [sys.executable, "-m", "benchmarks.cold_start", "--child", source,
+                       "--locations", args.locations, "--pois", args.pois, "--snapshot-dir", snapshot_dir]
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(f"{'source':<10} {'rows':>16} {'load [s]':>9} {'+index [s]':>11} {'+RSS [MB]':>10}")
+    for result in results:
+        rows = f"{result['locations']}/{result['pois']}"
+        print(f"{result['source']:<10} {rows:>16} {result['load_seconds']:>9.4f} "
+              f"{result['load_and_index_seconds']:>11.4f} {result['rss_delta_mb']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as report:
+            json.dump(results, report, indent=2)
+
+
+if __name__ == "__main__":
+    main()
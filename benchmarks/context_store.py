@@ -0,0 +1,82 @@
+"""
+Session cookie size and per-request time of the context store backends (see context_store.py).
+Replays the same conversations through /chat with every backend. Run from the project root:
+
+    python -m benchmarks.context_store [--conversations 200] [--turns 6]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+CONVERSATION_MESSAGES = [
+    "i want a cheap beach holiday",
+    "something romantic and cultural",
+    "a city with good food and nightlife",
+    "for families with kids",
+    "luxury please",
+    "maybe hiking and nature",
+    "historical sites and museums",
+    "a relaxing island for couples",
+]
+
+
+def run_backend(web, backend, conversations, turns, sqlite_path):
+    """Replays the conversations with one backend; returns cookie sizes and request timings."""
+    from context_store import create_context_store
+
+    web.context_store = create_context_store(backend, ttl=web.app.permanent_session_lifetime.total_seconds(), path=sqlite_path)
+    rng = random.Random(7) # Same conversations for every backend
+    cookie_bytes = []
+    timings = []
+    for _ in range(conversations):
+        client = web.app.test_client()
+        for message in rng.sample(CONVERSATION_MESSAGES, turns):
+            cookie = client.get_cookie('session')
+            cookie_bytes.append(len(cookie.value) if cookie else 0)
+            start = time.perf_counter()
+            response = client.post('/chat', json={"message": message})
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.get_data(as_text=True)
+    timings.sort()
+    stats = web.context_store.stats() if web.context_store is not None else {}
+    return {
+        "backend": backend,
+        "avg_cookie_bytes": sum(cookie_bytes) / len(cookie_bytes),
+        "max_cookie_bytes": max(cookie_bytes),
+        "p50_ms": percentile(timings, 0.5),
+        "p95_ms": percentile(timings, 0.95),
+        "avg_payload_bytes": stats.get('avg_payload_bytes'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=6)
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app as web
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [
+            run_backend(web, backend, args.conversations, min(args.turns, len(CONVERSATION_MESSAGES)),
+                        os.path.join(directory, 'contexts.sqlite3'))
+            for backend in ('cookie', 'memory', 'sqlite')
+        ]
+
+    baseline = results[0]['avg_cookie_bytes']
+    print(f"{args.conversations} conversations x {args.turns} turns (cookie size = 'session' cookie sent with each request)")
+    print(f"{'backend':<8} {'avg cookie B':>12} {'max cookie B':>12} {'saved B/req':>11} {'stored B':>8} {'p50 ms':>7} {'p95 ms':>7}")
+    for result in results:
+        stored = '-' if result['avg_payload_bytes'] is None else f"{result['avg_payload_bytes']:.1f}"
+        print(f"{result['backend']:<8} {result['avg_cookie_bytes']:>12.1f} {result['max_cookie_bytes']:>12} "
+              f"{baseline - result['avg_cookie_bytes']:>11.1f} {stored:>8} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
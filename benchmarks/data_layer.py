@@ -0,0 +1,194 @@
+"""
+Scalability of the data layer on synthetic catalogues (benchmarks/catalogue.py): load time per
+step, peak memory and per-query latency as the number of destinations and POIs grows. Each
+scale and source (CSV, binary snapshot) is measured in a fresh subprocess. Run from the
+project root:
+
+    python -m benchmarks.data_layer [--scales 1000:10000 10000:100000 100000:1000000] [--queries 200]
+    python -m benchmarks.data_layer --scales 100000:5000000 --keep catalogues/ --json report.json
+
+A scale is DESTINATIONS:POIS. Generated catalogues are kept (and reused) with --keep.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentile, rss_mb
+
+QUERY_NAMES = ('get_location_data_by_name', 'get_location_details', 'recommend_destination', 'recommend_by_country',
+               'nearby_pois', 'search')
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def random_contexts(rng, count, countries=()):
+    """
+    Contexts with a random subset of the four preferences, values from mappings.py. With
+    countries, each context is also restricted to one of them (posting list path).
+    """
+    from ai_logic import new_context
+    from benchmarks.ranking import BUDGETS, INTENTS, STYLES, SUITABLE_FOR, TYPES
+
+    contexts = []
+    for _ in range(count):
+        intents = [intent for intent in INTENTS if rng.random() < 0.6] or ['recommend_type']
+        context = new_context({
+            'intents': intents,
+            'type': rng.choice(TYPES),
+            'budget': rng.choice(BUDGETS),
+            'style': rng.sample(STYLES, rng.randint(1, 3)),
+            'suitable_for': rng.sample(SUITABLE_FOR, rng.randint(1, 2)),
+        })
+        if countries:
+            context['intents'].append('recommend_country')
+            context['countries'] = [rng.choice(countries)]
+        contexts.append(context)
+    return contexts
+
+
+def latencies(function, arguments):
+    """Sorted latencies in ms of function(*args) for each args tuple."""
+    timings = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings
+
+
+def measure(source, locations, pois, snapshot_dir, queries):
+    """Loads the catalogue in this process (like the server does) and runs the queries."""
+    import random
+
+    from log_config import setup_logging
+    setup_logging(level='WARNING', log_format='text')
+    from ai_logic import Chatbot
+    from data_processing import recommend_destination
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    chatbot = Chatbot(locations, pois, nlp_profile='stub', snapshot_dir=snapshot_dir)
+    total_seconds = time.perf_counter() - start
+    data = chatbot.data
+    if data.source != source:
+        raise RuntimeError(f"expected to load from {source}, loaded from {data.source}")
+    result = {
+        'source': source,
+        'locations': len(data.df),
+        'pois': len(data.pois),
+        'load_seconds': round(total_seconds, 3),
+        'load_stages': data.load_stages,
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+    rng = random.Random(1)
+    rows = [rng.randrange(len(data.df)) for _ in range(queries)]
+    names = [(data.df['LocationName'].iloc[row],) for row in rows]
+    ids = [(int(data.df['LocationID'].iloc[row]),) for row in rows]
+    points = [(float(data.pois.lat[row]), float(data.pois.lng[row]), 20) for row in (rng.randrange(len(data.pois)) for _ in range(queries))]
+    words = data.df['Description'].iloc[rows[0]].split()
+    timings = {
+        'get_location_data_by_name': latencies(chatbot.get_location_data_by_name, names),
+        'get_location_details': latencies(lambda location_id: chatbot.get_location_details(location_id=location_id), ids),
+        'recommend_destination': latencies(lambda context: recommend_destination(context, data.ranker, cache=None),
+                                           [(context,) for context in random_contexts(rng, queries)]),
+        'recommend_by_country': latencies(lambda context: recommend_destination(context, data.ranker, cache=None),
+                                          [(context,) for context in random_contexts(rng, queries, sorted(data.destination_index.country_rows))]),
+        'nearby_pois': latencies(chatbot.nearby_pois, points),
+        'search': latencies(lambda query: chatbot.search(query, 20), [(' '.join(rng.sample(words, 2)),) for _ in range(queries)]),
+    }
+    result['queries'] = {name: {'p50_ms': round(percentile(values, 0.5), 4), 'p95_ms': round(percentile(values, 0.95), 4)}
+                         for name, values in timings.items()}
+    return result
+
+
+def run_child(*arguments):
+    command = [sys.executable, '-m', 'benchmarks.data_layer', *arguments]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments[:2])} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def build_snapshot_child(locations, pois, snapshot_dir):
+    import contextlib
+    import io
+
+    import dataset
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset.build_snapshot(locations, pois, snapshot_dir)
+    return {'build_seconds': round(time.perf_counter() - start, 3), 'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+
+def report(scale, generate_seconds, snapshot, results):
+    print(f"\n{scale[0]} destinations, {scale[1]} POIs (generated in {generate_seconds:.1f} s, "
+          f"snapshot built in {snapshot['build_seconds']:.1f} s, peak {snapshot['peak_rss_mb']:.0f} MB)")
+    print(f"  {'source':<9} {'load s':>8} {'+RSS MB':>8} {'peak MB':>8}  slowest steps")
+    for result in results:
+        steps = sorted(result['load_stages'].items(), key=lambda item: -item[1])[:3]
+        print(f"  {result['source']:<9} {result['load_seconds']:>8.2f} {result['rss_delta_mb']:>8.0f} {result['peak_rss_mb']:>8.0f}  "
+              + ', '.join(f"{name} {seconds:.2f}" for name, seconds in steps))
+    print(f"  {'query (' + results[-1]['source'] + ')':<28} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timing in results[-1]['queries'].items():
+        print(f"  {name:<28} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', nargs='+', default=['1000:10000', '10000:100000', '100000:1000000'])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--keep', help="Directory for the generated catalogues (reused when present)")
+    parser.add_argument('--json', help="Write the report to this JSON file.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--locations', help=argparse.SUPPRESS)
+    parser.add_argument('--pois', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'build':
+        print(json.dumps(build_snapshot_child(args.locations, args.pois, args.snapshot_dir)))
+        return
+    if args.child:
+        print(json.dumps(measure(args.child, args.locations, args.pois, args.snapshot_dir, args.queries)))
+        return
+
+    from benchmarks.catalogue import write_catalogue
+
+    report_rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for scale in args.scales:
+            destinations, pois = (int(part) for part in scale.split(':'))
+            out_dir = os.path.join(args.keep or temp_dir, f"{destinations}_{pois}")
+            locations_path = os.path.join(out_dir, 'destinations.csv')
+            pois_path = os.path.join(out_dir, 'points_of_interest.csv')
+            start = time.perf_counter()
+            if not (os.path.exists(locations_path) and os.path.exists(pois_path)):
+                write_catalogue(out_dir, destinations, pois)
+            generate_seconds = time.perf_counter() - start
+
+            snapshot_dir = os.path.join(temp_dir, f"snapshot_{destinations}_{pois}")
+            paths = ['--locations', locations_path, '--pois', pois_path, '--snapshot-dir', snapshot_dir]
+            results = [run_child('--child', 'csv', *paths, '--queries', str(args.queries))]
+            snapshot = run_child('--child', 'build', *paths)
+            results.append(run_child('--child', 'snapshot', *paths, '--queries', str(args.queries)))
+            report((destinations, pois), generate_seconds, snapshot, results)
+            report_rows.append({'destinations': destinations, 'pois': pois, 'snapshot': snapshot, 'results': results})
+
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump(report_rows, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Build time, memory and query latency of the semantic search index (embedding_index.py): once
+for destinations.csv / points_of_interest.csv and once for synthetic item matrices of larger
+catalogues. Run from the project root:
+
+    python -m benchmarks.embedding_index [--vectors hashing] [--items 100000 1000000] [--queries 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile, rss_mb
+from embedding_index import (EMBEDDING_INDEX_FORMAT, HASHING_DIMS, MANIFEST_FILE, EmbeddingIndex,
+                             build_embedding_index)
+
+QUERIES = [
+    "ancient ruins and temples", "wine tasting in vineyards", "snorkeling on a coral reef", "medieval castles",
+    "hiking in the alps", "romantic canals", "street food markets", "northern lights", "quiet beaches",
+    "modern art museums", "volcanoes and hot springs", "skiing and snowboarding", "gothic cathedrals",
+]
+ITEMS_PER_DESTINATION = 10
+
+
+def directory_mb(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2 ** 20
+
+
+def latency(index, queries, batch_size, k=5):
+    """p50 / p95 per call in ms, with batch_size queries per call."""
+    timings = []
+    for start in range(0, len(queries) - batch_size + 1, batch_size):
+        begin = time.perf_counter()
+        index.search(queries[start:start + batch_size], k)
+        timings.append((time.perf_counter() - begin) * 1000)
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.95)
+
+
+def report(label, index, queries):
+    single = latency(index, queries, 1)
+    batched = latency(index, queries, 32)
+    print(f"{label:<28} single p50 {single[0]:8.3f} ms  p95 {single[1]:8.3f} ms   "
+          f"batch of 32 p50 {batched[0]:8.3f} ms ({batched[0] / 32:.3f} ms/query)")
+
+
+def synthetic_index(directory, items, dims=HASHING_DIMS, seed=1):
+    """Random unit item vectors in groups of ITEMS_PER_DESTINATION, stored like a built index."""
+    rng = np.random.default_rng(seed)
+    vectors = np.lib.format.open_memmap(os.path.join(directory, 'vectors.npy'), mode='w+', dtype=np.float32, shape=(items, dims))
+    for start in range(0, items, 100000): # Chunked, so generating does not need float64 copies of the whole matrix
+        chunk = rng.standard_normal((min(100000, items - start), dims), dtype=np.float32)
+        vectors[start:start + len(chunk)] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    vectors.flush()
+    del vectors
+    group_starts = np.arange(0, items, ITEMS_PER_DESTINATION, dtype=np.int64)
+    np.save(os.path.join(directory, 'item_kinds.npy'), np.full(items, 2, dtype=np.int8))
+    np.save(os.path.join(directory, 'item_poi_rows.npy'), np.arange(items, dtype=np.int32))
+    np.save(os.path.join(directory, 'group_starts.npy'), group_starts)
+    np.save(os.path.join(directory, 'group_location_ids.npy'), np.arange(1, len(group_starts) + 1, dtype=np.int64))
+    manifest = {
+        'format': EMBEDDING_INDEX_FORMAT, 'data_version': 'synthetic', 'items': items, 'destinations': len(group_starts),
+        'vectors': {'kind': 'hashing', 'name': 'hashing', 'dims': dims, 'query_words': 0},
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--locations', default='destinations.csv')
+    parser.add_argument('--pois', default='points_of_interest.csv')
+    parser.add_argument('--vectors', default='hashing', help="spaCy package with word vectors, or 'hashing'")
+    parser.add_argument('--items', type=int, nargs='*', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=256)
+    args = parser.parse_args()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'index')
+        start = time.perf_counter()
+        manifest = build_embedding_index(args.locations, args.pois, directory, args.vectors)
+        build_seconds = time.perf_counter() - start
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        index = EmbeddingIndex.load(directory)
+        load_ms = (time.perf_counter() - start) * 1000
+        print(f"{args.locations}: {manifest['items']} items, {manifest['vectors']['name']} ({manifest['vectors']['dims']} dims): "
+              f"build {build_seconds:.2f} s, {directory_mb(directory):.1f} MB on disk, load {load_ms:.1f} ms, "
+              f"+{rss_mb() - rss_before:.1f} MB RSS")
+        report('data set', index, queries)
+
+    for items in args.items:
+        with tempfile.TemporaryDirectory() as tmp:
+            synthetic_index(tmp, items)
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            index = EmbeddingIndex.load(tmp)
+            load_ms = (time.perf_counter() - start) * 1000
+            report(f"{items} items ({directory_mb(tmp):.0f} MB)", index, queries)
+            print(f"{'':<28} load {load_ms:.1f} ms, +{rss_mb() - rss_before:.1f} MB RSS after queries (memory-mapped pages)")
+            del index
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Message latency with and without the entity cache (Chatbot.entity_cache). Run from the project root:
+
+    python -m benchmarks.entity_cache [--messages 5000] [--unique-share 0.2] [--nlp-profile lookup]
+
+The workload is the chat messages of benchmarks/conversations.jsonl, drawn with a Zipf law (a few
+messages are very common, like real chat openers), mixed with a share of unique messages that
+always miss. Each message runs through Chatbot.process_message with a fresh context.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile
+from benchmarks.replay import DEFAULT_CONVERSATIONS
+
+
+def recorded_messages(path):
+    messages = []
+    with open(path) as conversations:
+        for line in conversations:
+            if line.strip():
+                messages += [turn['message'] for turn in json.loads(line)['turns'] if turn['op'] == 'chat']
+    return sorted(set(messages))
+
+
+def workload(messages, count, unique_share, seed=1):
+    """count messages: Zipf-distributed recorded ones plus unique variants (a numbered suffix)."""
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.3, count), len(messages)) - 1
+    unique = rng.random(count) < unique_share
+    return [f"{messages[rank]} {position}" if is_unique else messages[rank]
+            for position, (rank, is_unique) in enumerate(zip(ranks, unique))]
+
+
+def run(chatbot, texts):
+    """Sorted per-message latencies in ms."""
+    from ai_logic import new_context
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        chatbot.process_message(text, new_context())
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--unique-share', type=float, default=0.2)
+    parser.add_argument('--nlp-profile', default=None)
+    args = parser.parse_args()
+
+    from log_config import setup_logging
+    setup_logging(level='WARNING', log_format='text')
+    from ai_logic import Chatbot
+    chatbot = Chatbot(nlp_profile=args.nlp_profile)
+    if chatbot.nlp is None:
+        sys.exit(f"spaCy pipeline for profile '{chatbot.nlp_profile}' is not available.")
+    if chatbot.entity_cache is None:
+        sys.exit("The entity cache is disabled (ENTITY_CACHE_SIZE=0).")
+    chatbot.recommendation_cache = None # Measure the full path of every message
+
+    texts = workload(recorded_messages(args.conversations), args.messages, args.unique_share)
+    entity_cache, chatbot.entity_cache = chatbot.entity_cache, None
+    print(f"profile '{chatbot.nlp_profile}', {len(texts)} messages, {len(set(texts))} distinct")
+    print(f"{'entity cache':<14} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, cache in (('off', None), ('on', entity_cache)):
+        chatbot.entity_cache = cache
+        latencies = run(chatbot, texts)
+        print(f"{label:<14} {len(latencies) / (sum(latencies) / 1000):>8.1f} {percentile(latencies, 0.5):>8.2f} "
+              f"{percentile(latencies, 0.95):>8.2f} {percentile(latencies, 0.99):>8.2f}")
+    stats = entity_cache.stats()
+    print(f"hit ratio {stats['hit_rate']:.3f}, {stats['size']} entries, {stats['bytes'] / 1024:.0f} KB "
+          f"(limit {(stats['max_bytes'] or 0) / 1024:.0f} KB), {stats['evictions']} evictions")
+
+
+if __name__ == '__main__':
+    main()
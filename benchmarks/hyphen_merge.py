@@ -0,0 +1,67 @@
+"""
+Per-message cost of merging hyphenated tokens: the old per-call merge_hyphenated_tokens
+(new Matcher for every message) against the HyphenMerger pipeline component.
+Run from the project root:
+
+    python -m benchmarks.hyphen_merge [--profile lookup] [--repeat 2000]
+"""
+import argparse
+import time
+
+from benchmarks.common import percentile
+
+SAMPLE_MESSAGES = [
+    "i want a cheap beach holiday",
+    "something romantic in a city, mid-range please",
+    "luxury mountain region for hiking and skiing",
+    "a budget-friendly island for families",
+    "show me more options",
+    "is there a family-friendly all-inclusive resort?",
+]
+
+
+def time_per_message(process, messages, repeat):
+    """Runs process(message) for every message `repeat` times; returns sorted per-call microseconds."""
+    timings = []
+    for _ in range(repeat):
+        for message in messages:
+            start = time.perf_counter()
+            process(message)
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', default=None, help="NLP profile (default: NLP_PROFILE or 'lookup')")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    from nlp_pipeline import load_nlp
+    from spacy_merger import merge_hyphenated_tokens, HYPHEN_MERGER_NAME
+
+    nlp = load_nlp(args.profile)
+    with nlp.select_pipes(disable=[HYPHEN_MERGER_NAME]):
+        # Same texts through both paths must give the same tokens
+        for message in SAMPLE_MESSAGES:
+            before = [token.text for token in merge_hyphenated_tokens(nlp(message))]
+            after = [token.text for token in nlp.get_pipe(HYPHEN_MERGER_NAME)(nlp(message))]
+            assert before == after, (message, before, after)
+
+        variants = {
+            "pipeline without merge": lambda message: nlp(message),
+            "per-call Matcher (before)": lambda message: merge_hyphenated_tokens(nlp(message)),
+        }
+        results = {name: time_per_message(process, SAMPLE_MESSAGES, args.repeat) for name, process in variants.items()}
+    results["pipeline component (after)"] = time_per_message(nlp, SAMPLE_MESSAGES, args.repeat)
+
+    print(f"profile components: {nlp.pipe_names}, {len(SAMPLE_MESSAGES)} messages x {args.repeat}")
+    print(f"{'variant':<28} {'mean us':>9} {'p50 us':>9} {'p95 us':>9}")
+    for name, timings in results.items():
+        mean = sum(timings) / len(timings)
+        print(f"{name:<28} {mean:>9.1f} {percentile(timings, 0.5):>9.1f} {percentile(timings, 0.95):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
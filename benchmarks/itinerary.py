@@ -0,0 +1,77 @@
+"""
+Latency and route quality of the POI itinerary planner (itinerary.py): for every destination
+of points_of_interest.csv and for synthetic POI sets of a few hundred points. Run from the
+project root:
+
+    python -m benchmarks.itinerary [--pois 10 50 100 200 500 1000] [--repeat 20]
+
+Route quality is the length after 2-opt relative to the nearest-neighbour start.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile
+from dataset import load_csv_dataset
+from itinerary import distance_matrix, plan_itinerary
+
+SYNTHETIC_SPREAD_DEGREES = 0.5 # A city and its surroundings
+
+
+def timed(lat, lng, repeat, **options):
+    """Sorted latencies in ms and the last plan."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        plan = plan_itinerary(lat, lng, **options)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings, plan
+
+
+def report(label, timings, plans):
+    improvement = np.mean([plan['km'] / plan['nearest_neighbour_km'] for plan in plans if plan['nearest_neighbour_km'] > 0])
+    passes = np.mean([plan['passes'] for plan in plans])
+    print(f"{label:<26} p50 {percentile(timings, 0.5):8.2f} ms  p95 {percentile(timings, 0.95):8.2f} ms  "
+          f"route {improvement:6.1%} of nearest neighbour, {passes:4.1f} 2-opt passes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--locations', default='destinations.csv')
+    parser.add_argument('--pois-csv', default='points_of_interest.csv')
+    parser.add_argument('--pois', type=int, nargs='+', default=[10, 50, 100, 200, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    _, poi_table = load_csv_dataset(args.locations, args.pois_csv)
+    sizes = np.diff(poi_table.offsets)
+    timings, plans = [], []
+    for position in range(len(poi_table.location_ids)):
+        rows = slice(poi_table.offsets[position], poi_table.offsets[position + 1])
+        location_timings, plan = timed(poi_table.lat[rows], poi_table.lng[rows], args.repeat, days=2)
+        timings += location_timings
+        plans.append(plan)
+    timings.sort()
+    report(f"{args.pois_csv} ({len(sizes)} sets, max {sizes.max() if len(sizes) else 0})", timings, plans)
+
+    rng = np.random.default_rng(1)
+    for pois in args.pois:
+        timings, plans = [], []
+        for _ in range(5):
+            lat = 45 + rng.uniform(0, SYNTHETIC_SPREAD_DEGREES, pois)
+            lng = 10 + rng.uniform(0, SYNTHETIC_SPREAD_DEGREES, pois)
+            set_timings, plan = timed(lat, lng, max(1, args.repeat // 5), days=3, start=(45.25, 10.25))
+            timings += set_timings
+            plans.append(plan)
+        timings.sort()
+        report(f"{pois} random POIs", timings, plans)
+
+        start = time.perf_counter()
+        distance_matrix(lat, lng)
+        print(f"{'':<26} distance matrix alone {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
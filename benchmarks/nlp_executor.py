@@ -0,0 +1,87 @@
+"""
+Chat throughput of one process with N request threads: spaCy parsing in the request thread
+versus the NLP worker pool (nlp_executor.py). Run from the project root:
+
+    python -m benchmarks.nlp_executor [--concurrency 1 4 16] [--processes 4] [--seconds 5] [--nlp-profile lookup]
+
+Each configuration runs Chatbot.process_message from the given number of threads for a fixed
+time (what a threaded server does) and reports messages per second and latency percentiles.
+Offloading can only scale with more CPU cores than one.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+from benchmarks.common import percentile
+
+SAMPLE_MESSAGES = [
+    "i want a cheap beach holiday",
+    "something romantic in a city, mid-range please",
+    "luxury mountain region for hiking and skiing",
+    "a budget-friendly island for families with kids who love nature and adventure",
+    "we are a couple looking for a quiet, relaxing lake region with good food and wine",
+]
+
+
+def run(chatbot, threads, seconds):
+    """Returns (messages per second, sorted latencies in ms)."""
+    from ai_logic import new_context
+
+    latencies = [[] for _ in range(threads)]
+    deadline = time.monotonic() + seconds
+
+    def worker(position):
+        count = position
+        while time.monotonic() < deadline:
+            message = SAMPLE_MESSAGES[count % len(SAMPLE_MESSAGES)]
+            count += 1
+            start = time.perf_counter()
+            chatbot.process_message(message, new_context())
+            latencies[position].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(position,)) for position in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    merged = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+    return len(merged) / elapsed, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch-window-ms', type=float, default=0)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--nlp-profile', default=None)
+    args = parser.parse_args()
+
+    from log_config import setup_logging
+    setup_logging(level='WARNING', log_format='text')
+    from ai_logic import Chatbot
+    chatbot = Chatbot(nlp_profile=args.nlp_profile)
+    if chatbot.nlp is None:
+        sys.exit(f"spaCy pipeline for profile '{chatbot.nlp_profile}' is not available.")
+    chatbot.recommendation_cache = None # Measure the full path of every message
+
+    print(f"profile '{chatbot.nlp_profile}', {os.cpu_count()} CPUs, {args.processes} NLP processes")
+    print(f"{'threads':>7} {'mode':<10} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in ('in-thread', 'offload'):
+        if mode == 'offload':
+            chatbot.start_nlp_executor(args.processes, wait=True, batch_window_ms=args.batch_window_ms,
+                                       max_batch=args.max_batch, queue_depth=max(args.concurrency) * 4)
+        for threads in args.concurrency:
+            throughput, latencies = run(chatbot, threads, args.seconds)
+            print(f"{threads:>7} {mode:<10} {throughput:>8.1f} {percentile(latencies, 0.5):>8.2f} "
+                  f"{percentile(latencies, 0.95):>8.2f} {percentile(latencies, 0.99):>8.2f}")
+    chatbot.stop_nlp_executor()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup and memory report for the spaCy pipeline profiles (see nlp_pipeline.py).
+
+Every profile is loaded in a fresh subprocess so load time and resident memory are not
+polluted by the other profiles. Run from the project root:
+
+    python -m benchmarks.nlp_profiles [--profiles lookup full] [--json report.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import rss_mb
+
+SAMPLE_MESSAGES = [
+    "i want a cheap beach holiday",
+    "something romantic in a city, mid-range please",
+    "luxury mountain region for hiking and skiing",
+    "a budget-friendly island for families",
+]
+
+
+def measure_profile(profile, repeat):
+    """Loads one profile in this process and returns its measurements."""
+    import spacy # noqa: F401 - import cost is not attributed to the profile
+    from nlp_pipeline import load_nlp
+    from intent_detection import detect_intent_spacy
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    nlp = load_nlp(profile)
+    load_seconds = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for message in SAMPLE_MESSAGES:
+                context = {'suitable_for': [], 'style': [], 'intents': [], 'type': None, 'budget': None}
+                detect_intent_spacy(message, context, nlp)
+    per_message_ms = (time.perf_counter() - start) * 1000 / (repeat * len(SAMPLE_MESSAGES))
+
+    return {
+        "profile": profile,
+        "components": nlp.pipe_names,
+        "vectors": int(nlp.vocab.vectors.shape[0]),
+        "load_seconds": round(load_seconds, 3),
+        "rss_mb": round(rss_after, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+        "per_message_ms": round(per_message_ms, 3),
+    }
+
+
+def run_child(profile, repeat):
+    """Runs measure_profile in a fresh interpreter and returns its result dict."""
+    command = [sys.executable, "-m", "benchmarks.nlp_profiles", "--child", profile, "--repeat", str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.getcwd())
+    if completed.returncode != 0:
+        error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"profile": profile, "error": error}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from nlp_pipeline import NLP_PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(NLP_PROFILES), choices=NLP_PROFILES)
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions of the sample messages.")
+    parser.add_argument("--json", help="Write the report to this JSON file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_profile(args.child, args.repeat)))
+        return
+
+    results = [run_child(profile, args.repeat) for profile in args.profiles]
+
+    print(f"{'profile':<12} {'load [s]':>9} {'RSS [MB]':>9} {'+RSS [MB]':>10} {'msg [ms]':>9}  components")
+    for result in results:
+        if "error" in result:
+            print(f"{result['profile']:<12} not available: {result['error']}")
+            continue
+        print(f"{result['profile']:<12} {result['load_seconds']:>9.3f} {result['rss_mb']:>9.1f} "
+              f"{result['rss_delta_mb']:>10.1f} {result['per_message_ms']:>9.3f}  {', '.join(result['components'])}")
+
+    if args.json:
+        with open(args.json, "w") as report:
+            json.dump(results, report, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Throughput of serve.py with different worker counts, plus how much memory the workers
+share with the master (copy-on-write). Run from the project root:
+
+    python -m benchmarks.prefork_throughput [--workers 1 2 4] [--seconds 10] [--clients-per-worker 2]
+
+Each worker count gets a fresh server on a free port. Load comes from separate client
+processes, each sending POST /chat requests on new connections for the given duration.
+PSS (proportional set size) of a worker only counts its share of pages shared with the
+master and the other workers; RSS counts them fully.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import percentile
+
+SAMPLE_MESSAGES = [
+    "i want a cheap beach holiday",
+    "something romantic in a city, mid-range please",
+    "luxury mountain region for hiking and skiing",
+    "a budget-friendly island for families",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/metrics')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def client(port, seconds, offset):
+    """Sends chat requests until the time is up; returns the latencies in ms (errors as None)."""
+    latencies = []
+    deadline = time.monotonic() + seconds
+    position = offset
+    while time.monotonic() < deadline:
+        body = json.dumps({"message": SAMPLE_MESSAGES[position % len(SAMPLE_MESSAGES)]})
+        position += 1
+        start = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            connection.request('POST', '/chat', body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            latencies.append((time.perf_counter() - start) * 1000 if response.status == 200 else None)
+        except OSError:
+            latencies.append(None)
+    return latencies
+
+
+def memory_kb(pid):
+    """Returns (rss_kb, pss_kb) of a process from /proc (Linux), or (None, None)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            values = {line.split(':')[0]: int(line.split()[1]) for line in smaps if line.split(':')[0] in ('Rss', 'Pss')}
+        return values.get('Rss'), values.get('Pss')
+    except OSError:
+        return None, None
+
+
+def worker_pids(master_pid):
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as children:
+            return [int(pid) for pid in children.read().split()]
+    except OSError:
+        return []
+
+
+def run(workers, seconds, clients_per_worker):
+    port = free_port()
+    env = dict(os.environ, LOG_LEVEL='WARNING', DATA_WATCH_INTERVAL='0')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers)],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        client(port, 1, 0) # Warm-up
+
+        clients = workers * clients_per_worker
+        with multiprocessing.Pool(clients) as pool:
+            start = time.perf_counter()
+            results = pool.starmap(client, [(port, seconds, offset) for offset in range(clients)])
+            elapsed = time.perf_counter() - start
+
+        latencies = sorted(value for result in results for value in result if value is not None)
+        errors = sum(1 for result in results for value in result if value is None)
+        memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        return {
+            "workers": workers,
+            "clients": clients,
+            "requests": len(latencies),
+            "errors": errors,
+            "req_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "master_rss_mb": round((memory_kb(server.pid)[0] or 0) / 1024, 1),
+            "worker_rss_mb": round(sum(rss or 0 for rss, _ in memory) / 1024 / max(1, len(memory)), 1),
+            "worker_pss_mb": round(sum(pss or 0 for _, pss in memory) / 1024 / max(1, len(memory)), 1),
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput scaling of the pre-fork server (serve.py).")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients-per-worker', type=int, default=2)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>8} {'scaling':>7} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6} "
+          f"{'master RSS':>10} {'worker RSS':>10} {'worker PSS':>10}")
+    results = []
+    for workers in args.workers:
+        result = run(workers, args.seconds, args.clients_per_worker)
+        results.append(result)
+        scaling = result['req_per_s'] / results[0]['req_per_s'] if results[0]['req_per_s'] else 0
+        print(f"{result['workers']:>7} {result['clients']:>7} {result['req_per_s']:>8} {scaling:>6.2f}x "
+              f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['errors']:>6} "
+              f"{result['master_rss_mb']:>8} MB {result['worker_rss_mb']:>7} MB {result['worker_pss_mb']:>7} MB")
+
+    if args.json:
+        with open(args.json, 'w') as report:
+            json.dump(results, report, indent=2)
+
+
+if __name__ == '__main__':
+    main()
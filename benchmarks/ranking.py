@@ -0,0 +1,119 @@
+"""
+Scored top-k ranking (ranking.py) on synthetic destination tables much larger than
+destinations.csv, compared with the boolean filter + random sample it replaced.
+Run from the project root:
+
+    python -m benchmarks.ranking [--rows 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import percentile
+from data_processing import RECOMMENDATION_LIMIT
+from destination_index import DestinationIndex
+from mappings import style_synonym_mapping, suitable_for_synonyms_mapping
+from ranking import DestinationRanker, context_features
+
+TYPES = ['City', 'Island', 'Region', 'Coastal Region', 'Mountain Region', 'Lake Region', 'Specific Site']
+BUDGETS = ['Budget-friendly', 'Moderate', 'Luxury']
+STYLES = list(style_synonym_mapping)
+SUITABLE_FOR = list(suitable_for_synonyms_mapping)
+INTENTS = ['recommend_type', 'recommend_budget', 'recommend_style', 'recommend_suitable_for']
+
+
+def synthetic_destinations(rows, seed=1):
+    """Destinations with random type, budget and 2-6 styles / 1-4 suitable_for values."""
+    rng = np.random.default_rng(seed)
+    styles = np.array(STYLES, dtype=object)
+    suitable = np.array(SUITABLE_FOR, dtype=object)
+    return pd.DataFrame({
+        'LocationID': np.arange(1, rows + 1),
+        'LocationName': [f"Destination {i}" for i in range(rows)],
+        'Country': rng.choice(['France', 'Italy', 'Spain', 'Norway', 'Greece'], rows),
+        'Type': rng.choice(TYPES, rows),
+        'Budget': rng.choice(BUDGETS, rows),
+        'Best Time to Visit': 'Spring, Summer',
+        'Travel Style': [', '.join(rng.choice(styles, rng.integers(2, 7), replace=False)) for _ in range(rows)],
+        'Suitable For': [', '.join(rng.choice(suitable, rng.integers(1, 5), replace=False)) for _ in range(rows)],
+        'Latitude': rng.uniform(-60, 70, rows),
+        'Longitude': rng.uniform(-180, 180, rows),
+    })
+
+
+def random_context(rng):
+    return {
+        'type': rng.choice(TYPES).lower(),
+        'budget': rng.choice(BUDGETS),
+        'style': rng.sample(STYLES, rng.randint(1, 3)),
+        'suitable_for': rng.sample(SUITABLE_FOR, rng.randint(1, 2)),
+        'intents': rng.sample(INTENTS, rng.randint(1, 4)),
+    }
+
+
+def filter_and_sample(index, context):
+    """The previous approach: AND of the hard filters, then a random sample of the matches."""
+    mask = index.all_rows()
+    if 'recommend_type' in context['intents']:
+        mask &= index.type_mask(context['type'])
+    if 'recommend_budget' in context['intents']:
+        mask &= index.budget_mask(context['budget'])
+    if 'recommend_style' in context['intents']:
+        for value in context['style']:
+            mask &= index.contains_mask('Travel Style', value)
+    if 'recommend_suitable_for' in context['intents']:
+        for value in context['suitable_for']:
+            mask &= index.contains_mask('Suitable For', value)
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > RECOMMENDATION_LIMIT:
+        candidates = np.random.choice(candidates, RECOMMENDATION_LIMIT, replace=False)
+    return candidates
+
+
+def rank(ranker, context):
+    features = context_features(context)
+    shortlist = ranker.shortlist(features, RECOMMENDATION_LIMIT)
+    rows, scores = ranker.pick(shortlist, RECOMMENDATION_LIMIT)
+    return ranker.recommendations(features, rows, scores, shortlist.max_score)
+
+
+def measure(function, contexts):
+    timings = []
+    empty = 0
+    for context in contexts:
+        start = time.perf_counter()
+        result = function(context)
+        timings.append((time.perf_counter() - start) * 1000)
+        empty += not len(result)
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.95), empty
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    contexts = [random_context(rng) for _ in range(args.queries)]
+    print(f"{'rows':>8} {'build s':>8} {'matrix MB':>9} {'rank p50':>9} {'rank p95':>9} {'filter p50':>10} "
+          f"{'filter p95':>10} {'empty (filter)':>14}")
+    for rows in args.rows:
+        df = synthetic_destinations(rows)
+        start = time.perf_counter()
+        index = DestinationIndex(df)
+        ranker = DestinationRanker(index)
+        build_seconds = time.perf_counter() - start
+
+        rank_p50, rank_p95, _ = measure(lambda context: rank(ranker, context), contexts)
+        filter_p50, filter_p95, filter_empty = measure(lambda context: filter_and_sample(index, context), contexts)
+        print(f"{rows:>8} {build_seconds:>8.2f} {ranker.features.nbytes / 2 ** 20:>9.1f} {rank_p50:>8.3f}ms {rank_p95:>8.3f}ms "
+              f"{filter_p50:>9.3f}ms {filter_p95:>9.3f}ms {filter_empty:>7}/{len(contexts)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Replays recorded conversations against the chat endpoints and reports throughput and latency.
+
+Conversations are JSONL, one conversation per line:
+
+    {"id": "beach-family", "turns": [
+        {"op": "chat", "message": "i want a cheap beach holiday"},
+        {"op": "details"},                             # first location of the last chat reply
+        {"op": "details", "location_id": 12},          # or "location_name": "..."
+        {"op": "reset"}]}
+
+Every conversation runs in its own session (cookie), so multi-turn context is exercised.
+Run from the project root:
+
+    # In-process (Flask test client), stub NLP: no spaCy model or lookup data needed
+    python -m benchmarks.replay --nlp-profile stub --repeat 20 --concurrency 4
+
+    # Against a running server (python app.py / python serve.py)
+    python -m benchmarks.replay --url http://127.0.0.1:5001 --concurrency 16
+
+    # Save a baseline, later fail (exit code 1) when p50/p95/p99 or throughput regress by > 20 %
+    python -m benchmarks.replay --nlp-profile stub --save-baseline baseline.json
+    python -m benchmarks.replay --nlp-profile stub --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import percentile
+
+DEFAULT_CONVERSATIONS = os.path.join(os.path.dirname(__file__), 'conversations.jsonl')
+ENDPOINTS = {'chat': '/chat', 'details': '/location_details', 'reset': '/reset_session'}
+COMPARED_LATENCIES = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def load_conversations(path):
+    """
+    Reads conversations from a JSONL file. A turn given as a plain string is a chat message.
+
+    Returns:
+        list: {'id': str, 'turns': [dict, ...]} per conversation.
+    """
+    conversations = []
+    with open(path, encoding='utf-8') as lines:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            turns = [{'op': 'chat', 'message': turn} if isinstance(turn, str) else turn for turn in record.get('turns', [])]
+            for turn in turns:
+                if turn.get('op', 'chat') not in ENDPOINTS:
+                    raise ValueError(f"{path}:{number}: unknown op {turn.get('op')!r}")
+            conversations.append({'id': record.get('id', f"line-{number}"), 'turns': turns})
+    return conversations
+
+
+# --- Transports ---
+
+class InProcessSession:
+    """One conversation through the Flask test client (keeps the session cookie)."""
+
+    def __init__(self, web):
+        self.client = web.app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpSession:
+    """One conversation against a running server (keeps the session cookie)."""
+
+    def __init__(self, base_url, timeout=60):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        response = self.session.request(method, self.base_url + path, json=payload, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+
+# --- Replay ---
+
+class Recorder:
+    """Thread-safe collection of (op, status, milliseconds) samples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    def add(self, op, status, elapsed_ms):
+        with self._lock:
+            self.samples.append((op, status, elapsed_ms))
+
+
+def replay_conversation(session, conversation, recorder):
+    """Runs all turns of one conversation in order."""
+    last_locations = []
+    for turn in conversation['turns']:
+        op = turn.get('op', 'chat')
+        if op == 'chat':
+            method, payload = 'POST', {'message': turn['message']}
+        elif op == 'details':
+            if 'location_id' in turn or 'location_name' in turn:
+                payload = {key: turn[key] for key in ('location_id', 'location_name') if key in turn}
+            elif last_locations:
+                first = last_locations[0]
+                payload = {'location_id': first['id']} if first.get('id') is not None else {'location_name': first.get('name')}
+            else:
+                continue # Nothing was recommended yet, a user could not click anything
+            method = 'POST'
+        else:
+            method, payload = 'GET', None
+
+        path = ENDPOINTS[op]
+        if op == 'details' and 'location_id' in payload:
+            # Like static/js/script.js: by ID through the cacheable GET variant
+            method, path, payload = 'GET', f"{path}/{payload['location_id']}", None
+
+        start = time.perf_counter()
+        try:
+            status, body = session.request(method, path, payload)
+        except Exception:
+            status, body = None, None # Connection error / timeout
+        recorder.add(op, status, (time.perf_counter() - start) * 1000)
+
+        if op == 'chat' and status == 200 and body:
+            last_locations = body.get('locations') or []
+        elif op == 'reset':
+            last_locations = []
+
+
+def summarize(recorder, wall_seconds):
+    """Aggregates the samples into throughput and per-endpoint latency percentiles."""
+    endpoints = {}
+    for op in ENDPOINTS:
+        samples = [sample for sample in recorder.samples if sample[0] == op]
+        if not samples:
+            continue
+        latencies = sorted(elapsed for _, _, elapsed in samples)
+        endpoints[op] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, status, _ in samples if status is None or status >= 500),
+            'client_errors': sum(1 for _, status, _ in samples if status is not None and 400 <= status < 500),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+        }
+    total_requests = len(recorder.samples)
+    return {
+        'requests': total_requests,
+        'errors': sum(stats['errors'] for stats in endpoints.values()),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(total_requests / wall_seconds, 2) if wall_seconds else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def run_replay(conversations, make_session, repeat, concurrency, warmup):
+    """Replays every conversation `repeat` times on `concurrency` threads; returns the summary."""
+    for conversation in conversations[:warmup]:
+        replay_conversation(make_session(), conversation, Recorder())
+
+    recorder = Recorder()
+    jobs = [conversation for _ in range(repeat) for conversation in conversations]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(replay_conversation, make_session(), conversation, recorder) for conversation in jobs]:
+            future.result()
+    return summarize(recorder, time.perf_counter() - start)
+
+
+def compare(result, baseline, threshold):
+    """
+    Compares a run against a baseline.
+
+    Returns:
+        list: Human-readable regression descriptions (empty if within the threshold).
+    """
+    regressions = []
+    old, new = baseline['summary'], result['summary']
+    if old['throughput_rps'] and new['throughput_rps'] < old['throughput_rps'] * (1 - threshold):
+        regressions.append(f"throughput {new['throughput_rps']} req/s < baseline {old['throughput_rps']} req/s")
+    if new['errors'] > old['errors']:
+        regressions.append(f"errors {new['errors']} > baseline {old['errors']}")
+    for op, old_stats in old['endpoints'].items():
+        new_stats = new['endpoints'].get(op)
+        if new_stats is None:
+            continue
+        for key in COMPARED_LATENCIES:
+            if old_stats[key] and new_stats[key] > old_stats[key] * (1 + threshold):
+                regressions.append(f"{op} {key} {new_stats[key]} > baseline {old_stats[key]}")
+    return regressions
+
+
+def print_summary(result):
+    summary = result['summary']
+    meta = result['meta']
+    print(f"{meta['mode']} replay of {meta['conversations']} conversations x {meta['repeat']}, "
+          f"concurrency {meta['concurrency']}, NLP profile {meta['nlp_profile']}")
+    print(f"{summary['requests']} requests in {summary['wall_seconds']}s = {summary['throughput_rps']} req/s, "
+          f"{summary['errors']} errors")
+    print(f"{'endpoint':<8} {'requests':>8} {'4xx':>5} {'errors':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for op, stats in summary['endpoints'].items():
+        print(f"{op:<8} {stats['requests']:>8} {stats['client_errors']:>5} {stats['errors']:>6} {stats['mean_ms']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay JSONL conversations and report throughput / latency.")
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS, help="JSONL file with conversations")
+    parser.add_argument('--url', help="Base URL of a running server; default: in-process Flask test client")
+    parser.add_argument('--nlp-profile', help="NLP profile for in-process runs (e.g. 'stub': no spaCy data needed)")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10, help="Replays of the whole file")
+    parser.add_argument('--warmup', type=int, default=3, help="Conversations replayed before measuring")
+    parser.add_argument('--save-baseline', help="Write the result to this JSON file")
+    parser.add_argument('--baseline', help="Compare with this JSON result and exit 1 on regression")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative regression (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.conversations)
+    if args.url:
+        mode, nlp_profile = 'http', 'server'
+        make_session = lambda: HttpSession(args.url)
+    else:
+        if args.nlp_profile:
+            os.environ['NLP_PROFILE'] = args.nlp_profile
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        import app as web
+        if web.chatbot is None or web.chatbot.nlp is None:
+            sys.exit("Chatbot or NLP pipeline could not be loaded; try --nlp-profile stub")
+        mode, nlp_profile = 'inprocess', web.chatbot.nlp_profile
+        make_session = lambda: InProcessSession(web)
+
+    summary = run_replay(conversations, make_session, args.repeat, args.concurrency, args.warmup)
+    result = {
+        'meta': {
+            'mode': mode,
+            'url': args.url,
+            'nlp_profile': nlp_profile,
+            'conversations_file': os.path.basename(args.conversations),
+            'conversations': len(conversations),
+            'repeat': args.repeat,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'summary': summary,
+    }
+    print_summary(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as output:
+            json.dump(result, output, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION against {args.baseline} (threshold {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (threshold {args.threshold:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
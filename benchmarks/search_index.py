@@ -0,0 +1,119 @@
+"""
+Build time, memory and query latency of the full-text search index (search_index.py) on
+synthetic POI catalogues with Zipf-distributed words, compared with a substring scan over the
+POI texts. Run from the project root:
+
+    python -m benchmarks.search_index [--pois 100000 1000000] [--queries 200]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import percentile, rss_mb
+from dataset import PoiTable
+from search_index import SearchIndex
+
+POI_TYPES = ('Sight', 'Museum', 'Park', 'Beach', 'Activity', 'Town', 'Viewpoint', 'Trail')
+COUNTRIES = ('France', 'Italy', 'Spain', 'Norway', 'Greece', 'Croatia', 'Portugal', 'Austria')
+SYLLABLES = ('ka', 'lo', 'ri', 'ven', 'tas', 'mor', 'el', 'din', 'ost', 'pra', 'gu', 'sel', 'an', 'bri', 'tou', 'nev')
+VOCABULARY_SIZE = 50000
+
+
+def vocabulary(size, seed=1):
+    """Distinct pseudo-words of 2-4 syllables."""
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES, rng.integers(2, 5))))
+    return sorted(words)
+
+
+def synthetic_catalogue(pois, destinations, seed=1):
+    """Destinations and POIs whose names (2-4 words) and descriptions (15-40 words) follow a Zipf law."""
+    rng = np.random.default_rng(seed)
+    words = np.array(vocabulary(VOCABULARY_SIZE), dtype=object)
+    ranks = np.minimum(rng.zipf(1.2, pois * 45), VOCABULARY_SIZE) - 1
+    position = 0
+    names, descriptions = [], []
+    for length_name, length_description in zip(rng.integers(2, 5, pois), rng.integers(15, 41, pois)):
+        names.append(' '.join(words[ranks[position:position + length_name]]).title())
+        position += length_name
+        descriptions.append(' '.join(words[ranks[position:position + length_description]]))
+        position += length_description
+    locations_df = pd.DataFrame({
+        'LocationID': np.arange(1, destinations + 1),
+        'LocationName': [f"Destination {i}" for i in range(destinations)],
+        'Country': rng.choice(COUNTRIES, destinations),
+        'Type': 'Region',
+        'Description': '',
+    })
+    poi_table = PoiTable.from_dataframe(pd.DataFrame({
+        'ParentLocationID': rng.integers(1, destinations + 1, pois),
+        'name': names,
+        'type': rng.choice(POI_TYPES, pois),
+        'lat': rng.uniform(-60, 70, pois),
+        'lng': rng.uniform(-180, 180, pois),
+        'description': descriptions,
+    }))
+    return locations_df, poi_table, words, ranks
+
+
+def timed_ms(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def report(label, timings):
+    timings.sort()
+    print(f"  {label:<30} p50 {percentile(timings, 0.5):8.3f} ms  p95 {percentile(timings, 0.95):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pois', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    for pois in args.pois:
+        locations_df, poi_table, words, ranks = synthetic_catalogue(pois, max(1, pois // 10))
+        rss_before = rss_mb()
+        index, build_ms = timed_ms(SearchIndex.build, locations_df, poi_table)
+        postings_mb = sum(array.nbytes for array in index.arrays().values()) / 2 ** 20
+        print(f"{pois} POIs, {len(index.terms)} terms, {len(index.postings_docs)} postings: build {build_ms / 1000:.1f} s, "
+              f"{postings_mb:.1f} MB of arrays, +{rss_mb() - rss_before:.1f} MB RSS")
+
+        rng = np.random.default_rng(2)
+        # Query words drawn from the text itself (frequent words, the expensive case) and
+        # uniformly from the vocabulary (mostly rare words, like names)
+        frequent = [' '.join(pair) for pair in words[ranks[rng.integers(0, len(ranks), (args.queries, 2))]]]
+        rare = [' '.join(pair) for pair in words[rng.integers(0, len(words), (args.queries, 2))]]
+        cases = (
+            ('2 rare words', rare, {}),
+            ('2 words', frequent, {}),
+            ('2 words, prefix of last', frequent, {'prefix': True}),
+            ('2 words, type + country filter', frequent, {'poi_types': ['Museum'], 'countries': ['Italy']}),
+        )
+        for label, queries, options in cases:
+            timings = []
+            for query in queries:
+                text = query[:-2] if options.get('prefix') else query
+                _, elapsed = timed_ms(index.search, text, args.k, prefix=options.get('prefix', False),
+                                      poi_types=options.get('poi_types'), countries=options.get('countries'))
+                timings.append(elapsed)
+            report(label, timings)
+
+        descriptions = poi_table.description.to_list(missing='')
+        timings = []
+        for query in frequent[:10]:
+            word = query.split()[0]
+            _, elapsed = timed_ms(lambda: [row for row, text in enumerate(descriptions) if word in text])
+            timings.append(elapsed)
+        report('substring scan (1 word)', timings)
+
+
+if __name__ == '__main__':
+    main()
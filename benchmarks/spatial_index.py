@@ -0,0 +1,103 @@
+"""
+Build time, memory and query latency of the POI spatial index (spatial_index.py) on synthetic
+POIs, compared with a brute-force scan; results are checked against the brute force.
+Run from the project root:
+
+    python -m benchmarks.spatial_index [--points 1000000] [--queries 200] [--k 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile, rss_mb
+from spatial_index import SpatialIndex, haversine_km
+
+POI_TYPES = ('Sight', 'Museum', 'Park', 'Beach', 'Activity', 'Town', 'Viewpoint', 'Trail')
+
+
+def synthetic_pois(count, seed=1):
+    """POIs clustered around random "cities" (70 %) plus uniform background points."""
+    rng = np.random.default_rng(seed)
+    clustered = int(count * 0.7)
+    centers_lat = rng.uniform(-60, 70, 2000)
+    centers_lng = rng.uniform(-180, 180, 2000)
+    center = rng.integers(0, 2000, clustered)
+    lat = np.concatenate([centers_lat[center] + rng.normal(0, 0.3, clustered), rng.uniform(-90, 90, count - clustered)])
+    lng = np.concatenate([centers_lng[center] + rng.normal(0, 0.3, clustered), rng.uniform(-180, 180, count - clustered)])
+    lat = np.clip(lat, -90, 90)
+    lng = (lng + 180) % 360 - 180
+    codes = rng.integers(0, len(POI_TYPES), count).astype(np.int32)
+    return lat, lng, codes
+
+
+def brute_nearest(lat, lng, codes, query, k, allowed):
+    distances = haversine_km(query[0], query[1], lat, lng)
+    if allowed is not None:
+        distances = np.where(np.isin(codes, allowed), distances, np.inf)
+    order = np.lexsort((np.arange(len(distances)), distances))[:k]
+    return order[np.isfinite(distances[order])]
+
+
+def brute_within(lat, lng, box):
+    south, west, north, east = box
+    inside = (lat >= south) & (lat <= north)
+    inside &= ((lng >= west) & (lng <= east)) if west <= east else ((lng >= west) | (lng <= east))
+    return np.flatnonzero(inside)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def report(label, index_ms, brute_ms):
+    index_ms.sort()
+    brute_ms.sort()
+    print(f"{label:<24} index p50 {percentile(index_ms, 0.5):8.3f} ms  p95 {percentile(index_ms, 0.95):8.3f} ms   "
+          f"brute force p50 {percentile(brute_ms, 0.5):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    lat, lng, codes = synthetic_pois(args.points)
+    rss_before = rss_mb()
+    index, build_ms = timed(SpatialIndex, lat, lng, codes, POI_TYPES)
+    print(f"{args.points} POIs: build {build_ms:.1f} ms, +{rss_mb() - rss_before:.1f} MB RSS")
+
+    rng = np.random.default_rng(2)
+    # Half of the queries at POIs (dense areas), half anywhere (mostly empty areas)
+    picks = rng.integers(0, args.points, args.queries)
+    queries = [(lat[i], lng[i]) if n % 2 else (rng.uniform(-80, 80), rng.uniform(-180, 180)) for n, i in enumerate(picks)]
+
+    for label, allowed in (('nearest', None), ('nearest, 1 type', index.category_codes(['Museum']))):
+        index_ms, brute_ms = [], []
+        for query in queries:
+            (rows, _), elapsed = timed(index.nearest, query[0], query[1], args.k, allowed)
+            index_ms.append(elapsed)
+            expected, elapsed = timed(brute_nearest, lat, lng, codes, query, args.k, allowed)
+            brute_ms.append(elapsed)
+            assert np.array_equal(rows, expected), (label, query)
+        report(f"{label} (k={args.k})", index_ms, brute_ms)
+
+    for label, span in (('viewport city', 0.1), ('viewport region', 2.0), ('viewport continent', 40.0)):
+        index_ms, brute_ms = [], []
+        for query in queries:
+            box = (query[0] - span / 2, query[1] - span, query[0] + span / 2, query[1] + span)
+            box = (max(-90, box[0]), (box[1] + 180) % 360 - 180, min(90, box[2]), (box[3] + 180) % 360 - 180)
+            (rows, total), elapsed = timed(index.within, *box, None, 0, 200)
+            index_ms.append(elapsed)
+            expected, elapsed = timed(brute_within, lat, lng, box)
+            brute_ms.append(elapsed)
+            assert total == len(expected) and set(rows) <= set(expected), (label, box)
+        report(label, index_ms, brute_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a maximum size and a time-to-live per entry.
+    Keeps hit / miss / eviction counters for monitoring.
+    """
+
+    def __init__(self, max_size, ttl=None, clock=time.monotonic, max_bytes=None, sizeof=None):
+        """
+        Args:
+            max_size (int): Maximum number of entries; the least recently used one is evicted first.
+            ttl (float, optional): Seconds an entry stays valid. None or <= 0 = no expiry.
+            clock (callable): Time source (monotonic seconds).
+            max_bytes (int, optional): Memory budget; least recently used entries are evicted
+                while the estimated size of all entries exceeds it. None = only max_size.
+            sizeof (callable, optional): (key, value) -> estimated bytes; required with max_bytes.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("max_bytes needs a sizeof function")
+        self.max_size = max_size
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self._sizeof = sizeof if self.max_bytes else None
+        self._clock = clock
+        self._entries = OrderedDict() # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.clears = 0
+
+    def get(self, key, default=None):
+        """Returns the cached value for key (and marks it as recently used), or default."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self._bytes -= entry[2]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Stores value under key, evicting the least recently used entry when full."""
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        size = self._sizeof(key, value) if self._sizeof else 0
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (expires_at, value, size)
+            self._entries.move_to_end(key)
+            self._bytes += size
+            while len(self._entries) > self.max_size or (self.max_bytes and self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Removes key and returns its value (default if missing or expired)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+        if entry is None or (entry[0] is not None and entry[0] <= self._clock()):
+            return default
+        return entry[1]
+
+    def clear(self):
+        """Drops all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.clears += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Size, limits and counters; hit_rate is hits / lookups (0.0 before the first lookup).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'clears': self.clears,
+            }
@@ -0,0 +1,307 @@
+"""
+Server-side storage for conversation contexts.
+
+The session cookie only carries an opaque context ID; the context itself lives in a store:
+    memory - in-process LRU with TTL (one process; contexts are lost on restart)
+    sqlite - local SQLite file, shared by all processes on the machine (serve.py workers)
+
+Contexts are stored in a compact binary form (ContextCodec): type and budget as enum codes,
+the intent / style / suitable_for / months / countries / languages / cultures lists as bitsets
+over the known values. The lists are sets for recommendations, so decoded lists come back in
+vocabulary order.
+"""
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from caching import LRUCache
+from intent_detection import CONTEXT_LIST_KEYS, CONTEXT_VALUE_KEYS, CONTEXT_VOCABULARIES
+
+CONTEXT_STORE_BACKENDS = ('memory', 'sqlite', 'cookie')
+DEFAULT_MEMORY_STORE_SIZE = 100000 # Contexts kept by the memory backend
+SQLITE_PURGE_EVERY = 1000 # Writes between deletes of expired rows
+
+# Payload formats (first byte)
+_CODED = 1
+_JSON = 2 # Fallback for contexts with values outside the vocabulary
+
+
+def new_context_id():
+    """Random, URL-safe ID stored in the session cookie."""
+    return secrets.token_urlsafe(16)
+
+
+def _json_bytes(context):
+    return json.dumps(context, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ContextCodec:
+    """Encodes contexts as a few bytes: enum codes for type / budget, bitsets for the lists."""
+
+    def __init__(self, vocabularies=CONTEXT_VOCABULARIES):
+        """
+        Args:
+            vocabularies (dict): Context field -> known values (see intent_detection.context_vocabularies);
+                contexts with other values fall back to JSON.
+        """
+        self.vocabularies = {field: tuple(values) for field, values in vocabularies.items()}
+        self.codes = {
+            field: {value: code for code, value in enumerate(values)}
+            for field, values in self.vocabularies.items()
+        }
+        # Changes whenever the vocabularies change, so persisted payloads can be invalidated
+        self.fingerprint = hashlib.sha1(json.dumps(self.vocabularies, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self._keys = set(CONTEXT_LIST_KEYS) | set(CONTEXT_VALUE_KEYS)
+
+    def _encode_coded(self, context):
+        if set(context) != self._keys:
+            return None
+        payload = bytearray([_CODED])
+        for field in CONTEXT_VALUE_KEYS:
+            value = context[field]
+            if value is None:
+                payload.append(0)
+                continue
+            code = self.codes[field].get(value)
+            if code is None or code >= 255:
+                return None
+            payload.append(code + 1) # 0 = None
+        for field in CONTEXT_LIST_KEYS:
+            bits = 0
+            for value in context[field]:
+                code = self.codes[field].get(value)
+                if code is None:
+                    return None
+                bits |= 1 << code
+            width = (bits.bit_length() + 7) // 8
+            payload.append(width)
+            payload += bits.to_bytes(width, 'little')
+        return bytes(payload)
+
+    def encode(self, context):
+        """
+        Args:
+            context (dict): The conversation context.
+
+        Returns:
+            bytes: The compact payload (JSON fallback if a value is not in the vocabulary).
+        """
+        return self._encode_coded(context) or bytes([_JSON]) + _json_bytes(context)
+
+    def decode(self, payload):
+        """
+        Args:
+            payload (bytes): Result of encode.
+
+        Returns:
+            dict: The conversation context.
+        """
+        if payload[0] == _JSON:
+            return json.loads(payload[1:].decode('utf-8'))
+
+        context = {}
+        position = 1
+        for field in CONTEXT_VALUE_KEYS:
+            code = payload[position]
+            position += 1
+            context[field] = self.vocabularies[field][code - 1] if code else None
+        for field in CONTEXT_LIST_KEYS:
+            width = payload[position]
+            bits = int.from_bytes(payload[position + 1:position + 1 + width], 'little')
+            position += 1 + width
+            context[field] = [value for code, value in enumerate(self.vocabularies[field]) if bits >> code & 1]
+        return {key: context[key] for key in CONTEXT_LIST_KEYS + CONTEXT_VALUE_KEYS}
+
+
+class ContextStore(ABC):
+    """Base class: counters and encoding shared by the backends."""
+
+    backend = None
+
+    def __init__(self, ttl, codec=None):
+        """
+        Args:
+            ttl (float): Seconds a context is kept after its last save.
+            codec (ContextCodec, optional): Defaults to a codec over the current mappings.
+        """
+        self.ttl = ttl
+        self.codec = codec or ContextCodec()
+        self._stats_lock = threading.Lock()
+        self.loads = 0
+        self.load_misses = 0
+        self.saves = 0
+        self.payload_bytes = 0
+        self.context_json_bytes = 0
+
+    def load(self, context_id):
+        """Returns the stored context for context_id, or None if missing / expired."""
+        payload = self._get(context_id)
+        with self._stats_lock:
+            self.loads += 1
+            if payload is None:
+                self.load_misses += 1
+        return None if payload is None else self.codec.decode(payload)
+
+    def save(self, context_id, context):
+        """Stores the context (and restarts its TTL)."""
+        payload = self.codec.encode(context)
+        self._put(context_id, payload)
+        with self._stats_lock:
+            self.saves += 1
+            self.payload_bytes += len(payload)
+            # What the cookie used to carry for this context (before signing / base64)
+            self.context_json_bytes += len(_json_bytes(context))
+
+    def delete(self, context_id):
+        self._delete(context_id)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Backend, stored context count and load / save counters. avg_bytes_saved is the
+                average JSON size of a saved context minus its stored payload size.
+        """
+        with self._stats_lock:
+            saves = self.saves or 1
+            return {
+                'backend': self.backend,
+                'contexts': self._count(),
+                'ttl': self.ttl,
+                'loads': self.loads,
+                'load_misses': self.load_misses,
+                'saves': self.saves,
+                'avg_payload_bytes': round(self.payload_bytes / saves, 1),
+                'avg_context_json_bytes': round(self.context_json_bytes / saves, 1),
+                'avg_bytes_saved': round((self.context_json_bytes - self.payload_bytes) / saves, 1),
+            }
+
+    # --- Backend interface ---
+    @abstractmethod
+    def _get(self, context_id):
+        """Stored payload for context_id, or None if missing / expired."""
+
+    @abstractmethod
+    def _put(self, context_id, payload):
+        """Stores payload for context_id with a fresh TTL."""
+
+    @abstractmethod
+    def _delete(self, context_id):
+        """Removes the context (no error if it does not exist)."""
+
+    @abstractmethod
+    def _count(self):
+        """Number of stored contexts."""
+
+
+class MemoryContextStore(ContextStore):
+    """In-process LRU store; each process has its own contexts."""
+
+    backend = 'memory'
+
+    def __init__(self, ttl, max_size=DEFAULT_MEMORY_STORE_SIZE, codec=None):
+        super().__init__(ttl, codec)
+        self._cache = LRUCache(max_size, ttl)
+
+    def _get(self, context_id):
+        return self._cache.get(context_id)
+
+    def _put(self, context_id, payload):
+        self._cache.put(context_id, payload)
+
+    def _delete(self, context_id):
+        self._cache.pop(context_id)
+
+    def _count(self):
+        return len(self._cache)
+
+
+class SQLiteContextStore(ContextStore):
+    """
+    Store in a local SQLite database (WAL mode), usable from several processes at once.
+    Each thread of each process gets its own connection.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path, ttl, codec=None):
+        super().__init__(ttl, codec)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS contexts "
+                "(id TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            row = connection.execute("SELECT value FROM meta WHERE key = 'codec'").fetchone()
+            if row is None or row[0] != self.codec.fingerprint:
+                # Payloads written with other vocabularies cannot be decoded any more
+                connection.execute("DELETE FROM contexts")
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('codec', ?)", (self.codec.fingerprint,))
+        # Not kept open: the store is created before serve.py forks its workers
+        connection.close()
+        self._local.connection = None
+
+    def _connection(self):
+        # Connections must not cross threads or fork() (serve.py workers)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _get(self, context_id):
+        row = self._connection().execute(
+            "SELECT payload FROM contexts WHERE id = ? AND expires_at > ?", (context_id, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _put(self, context_id, payload):
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            "INSERT OR REPLACE INTO contexts (id, payload, expires_at) VALUES (?, ?, ?)",
+            (context_id, payload, now + self.ttl)
+        )
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            connection.execute("DELETE FROM contexts WHERE expires_at <= ?", (now,))
+
+    def _delete(self, context_id):
+        self._connection().execute("DELETE FROM contexts WHERE id = ?", (context_id,))
+
+    def _count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM contexts WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+def create_context_store(backend, ttl, path=None):
+    """
+    Creates the context store for a backend name.
+
+    Args:
+        backend (str): One of CONTEXT_STORE_BACKENDS. 'cookie' keeps the context in the
+            session cookie (no store).
+        ttl (float): Seconds a context is kept after its last save.
+        path (str, optional): SQLite database file (sqlite backend).
+
+    Returns:
+        ContextStore or None: None for the 'cookie' backend.
+    """
+    backend = backend.strip().lower()
+    if backend not in CONTEXT_STORE_BACKENDS:
+        raise ValueError(f"Unknown context store '{backend}'. Choose one of: {', '.join(CONTEXT_STORE_BACKENDS)}")
+    if backend == 'memory':
+        return MemoryContextStore(ttl)
+    if backend == 'sqlite':
+        return SQLiteContextStore(path, ttl)
+    return None
@@ -1,89 +1,113 @@
-import pandas as pd
-from mappings import type_mapping, budget_mapping, style_synonym_mapping, suitable_for_synonyms_mapping
+import os
 
+from metrics import stage
+from ranking import context_features, context_places
+from seasons import mask_of_names
 
+RECOMMENDATION_LIMIT = 4
 
+# --- Ranking cache (see Chatbot.recommendation_cache); size 0 disables it ---
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 1024))
+RECOMMENDATION_CACHE_TTL = float(os.environ.get('RECOMMENDATION_CACHE_TTL', 300)) # Seconds
 
+_MISSING = object() # Marks a context without a 'budget' key in cache keys
 
-def recommend_destination(context, destination_data):
+
+def canonical_context(context):
+    """
+    Normalized cache key for the parts of a context that recommend_destination looks at.
+    Contexts that rank the destinations the same way get the same key: only the fields of active
+    intents are used, type and list entries are lowercased, lists are treated as sets and months
+become their mask.
+
+    Args:
+        context (dict): The conversation context.
+
+    Returns:
+        tuple: A hashable key.
+    """
+    intents = context['intents']
+    key = []
+    if "recommend_type" in intents:
+        key.append(('type', (context.get('type') or '').lower()))
+    if "recommend_budget" in intents:
+        key.append(('budget', context.get('budget', _MISSING)))
+    if "recommend_suitable_for" in intents:
+        key.append(('suitable_for', frozenset(value.lower() for value in context['suitable_for'])))
+    if "recommend_style" in intents:
+        key.append(('style', frozenset(value.lower() for value in context['style'])))
+    if "recommend_season" in intents:
+        key.append(('season', mask_of_names(context.get('months') or ())))
+    if "recommend_culture" in intents:
+        key.append(('cultures', frozenset(context.get('cultures') or ())))
+    countries, languages = context_places(context)
+    if countries:
+        key.append(('countries', countries))
+    if languages:
+        key.append(('languages', languages))
+    return tuple(key)
+
+
+def clarifying_question(context):
+    """
+    Checks that every active recommendation intent has its entity.
+
+    Args:
+        context (dict): The conversation context.
+
+    Returns:
+        str or None: A clarifying question for the first intent without an entity, or None.
     """
-    Recommends destinations based on intent and entities, handling list of budgets from mapping.
+    intents = context['intents']
+    if "recommend_type" in intents and not context.get('type'):
+        return "Could you please specify what type of destination you are looking for (e.g., city, beach)?"
+    if "recommend_budget" in intents and 'budget' not in context:
+        return "Could you please specify your budget level (e.g., budget-friendly, mid-range, luxury)?"
+    if "recommend_suitable_for" in intents and not context['suitable_for']:
+        return "Could you please specify what travel style you are looking for (e.g., adventure, relaxing)?"
+    if "recommend_style" in intents and not context['style']:
+        return "Could you please specify what travel style you are looking for (e.g., adventure, relaxing)?"
+    return None
+
+
+def recommend_destination(context, ranker, cache=None):
     """
-    recommendations = []
-    filtered_destinations = destination_data
-
-    if "recommend_type" in context['intents']:
-        if 'type' in context:
-            destination_type = context['type']
-            temp = filtered_destinations['Type']
-            filtered_destinations = filtered_destinations[filtered_destinations['Type'].str.lower() == destination_type.lower()]
-        else:
-            return "Could you please specify what type of destination you are looking for (e.g., city, beach)?"
-
-    if "recommend_budget" in context['intents']:
-        if 'budget' in context:
-            budget_level = context['budget']
-            filtered_destinations = filtered_destinations[
-                filtered_destinations['Budget'].apply(lambda x: x == context['budget'])
-            ]
-        else:
-            return "Could you please specify your budget level (e.g., budget-friendly, mid-range, luxury)?"
-        
-    if "recommend_suitable_for" in context['intents']:
-        if context['suitable_for']:
-            suitable_for = context['suitable_for']
-            temp_destinations = pd.DataFrame(columns=['LocationID','LocationName','Country','Language','Type','Budget','Best Time to Visit','Travel Style','Suitable For','Keywords/Main Attractions'])
-            for suitable_for_detail in suitable_for:
-                    for exact_suitable_for in suitable_for_synonyms_mapping[suitable_for_detail.lower()]:
-                        temp_destinations += filtered_destinations[
-                            filtered_destinations['Suitable For'].str.lower().str.contains(exact_suitable_for.lower(), na=False)
-                        ]
-            if temp_destinations.empty:
-                for suitable_for_detail in suitable_for:
-                    filtered_destinations = filtered_destinations[
-                        filtered_destinations['Suitable For'].str.lower().str.contains(suitable_for_detail.lower(), na=False)
-                    ]
-                
-        else:
-            return "Could you please specify what travel style you are looking for (e.g., adventure, relaxing)?"
-
-
-    if "recommend_style" in context['intents']:
-        if context['style']:
-            travel_style = context['style']
-            temp_destinations = pd.DataFrame(columns=['LocationID','LocationName','Country','Language','Type','Budget','Best Time to Visit','Travel Style','Suitable For','Keywords/Main Attractions'])
-            for style in travel_style:
-                    for exact_style in style_synonym_mapping[style.lower()]:
-                        temp_destinations += filtered_destinations[
-                            filtered_destinations['Travel Style'].str.lower().str.contains(exact_style.lower(), na=False)
-                        ]
-            if temp_destinations.empty:
-                for style in travel_style:
-                    filtered_destinations = filtered_destinations[
-                        filtered_destinations['Travel Style'].str.lower().str.contains(style.lower(), na=False)
-                    ]
-                
-        else:
-            return "Could you please specify what travel style you are looking for (e.g., adventure, relaxing)?"
-
-
-    if context['intents'] == "recommend_general":
-        if not destination_data.empty:
-            recommended_sample = filtered_destinations.sample(min(3, len(filtered_destinations)))
-            for index, row in recommended_sample.iterrows():
-                recommendations.append(f"- {row['LocationName']}, {row['Country']} ({row['Type']}, Budget: {row['Budget']})")
-            if recommendations:
-                return "Here are some general recommendations:\n" + "\n".join(recommendations)
-            else:
-                return "Sorry, no general recommendations at the moment."
-        else:
-            return "Sorry, I don't have any destination data to make recommendations."
-
-    if not filtered_destinations.empty:
-        recommended_sample = filtered_destinations.sample(min(4, len(filtered_destinations)))
-        for index, row in recommended_sample.iterrows():
-            recommendations.append({'id':row['LocationID'],'name' :row['LocationName'], 'country': row['Country'], "type": row['Type'], 'budget': row['Budget'], 'best_time_to_visit': row['Best Time to Visit'], 'style':row['Travel Style'],'latitude':row['Latitude'], 'longitude':row['Longitude']})
-        if recommendations:
-            return recommendations
-        
-    return recommendations
\ No newline at end of file
+    Ranks the destinations against the preferences in the context.
+
+    Args:
+        context (dict): The conversation context.
+        ranker (DestinationRanker): Feature matrix over the destinations (and, through its
+            DestinationIndex, the country / language posting lists).
+        cache (LRUCache, optional): Shortlist cache keyed by canonical_context. Only scoring
+            is cached; the random draw among equally scored destinations runs on every call.
+
+    Returns:
+        list or str: Up to RECOMMENDATION_LIMIT recommendation dicts, best first (each with
+            'score', 'matched' and 'full_match'), or a clarifying question when an intent is
+            missing its entity.
+    """
+    question = clarifying_question(context)
+    if question:
+        return question
+
+    features = context_features(context)
+    with stage('recommend_score'):
+        shortlist = None
+        if cache is not None:
+            key = canonical_context(context)
+            cached = cache.get(key)
+            # Entries remember the ranker they were computed with, so results from data that
+            # was replaced by a reload are never used
+            if cached is not None and cached[0] is ranker:
+                shortlist = cached[1]
+
+        if shortlist is None:
+            # Country / language constraints narrow the candidates to their posting lists
+            rows = ranker.destination_index.place_rows(*context_places(context))
+            shortlist = ranker.shortlist(features, RECOMMENDATION_LIMIT, rows)
+            if cache is not None:
+                cache.put(key, (ranker, shortlist))
+
+    with stage('recommend_pick'):
+        rows, scores = ranker.pick(shortlist, RECOMMENDATION_LIMIT)
+        return ranker.recommendations(features, rows, scores, shortlist.max_score)
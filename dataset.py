@@ -0,0 +1,490 @@
+"""
+Destination / POI data layer.
+
+Locations are kept in a DataFrame (repeated values as categoricals), POIs in a columnar
+PoiTable: flat arrays sorted by parent location with per-location offset ranges.
+
+Both can be compiled into a binary snapshot directory (plain .npy arrays + manifest.json),
+together with the full-text search index, that is memory-mapped at startup instead of
+parsing the CSVs again:
+
+    python dataset.py build [--locations destinations.csv] [--pois points_of_interest.csv] [--out data_snapshot]
+
+The snapshot is only used while the CSV files it was built from are unchanged; otherwise
+loading falls back to the CSVs.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from mappings import type_mapping, budget_mapping
+from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get('DATA_SNAPSHOT_DIR', 'data_snapshot')
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+
+REQUIRED_LOCATION_COLUMNS = ['LocationID', 'LocationName', 'Type', 'Budget', 'Travel Style', 'Country', 'Best Time to Visit', 'Latitude', 'Longitude', 'Description']
+# Low-cardinality location columns stored as interned categorical codes
+CATEGORICAL_LOCATION_COLUMNS = ['Country', 'Language', 'Type', 'Budget', 'Best Time to Visit']
+
+REQUIRED_POI_COLUMNS = ['ParentLocationID', 'POIName', 'POIType', 'POILat', 'POILng']
+
+
+# --- Columns ---
+
+class TextColumn:
+    """Strings stored as one UTF-8 byte buffer plus offsets (optionally memory-mapped)."""
+
+    def __init__(self, data, offsets, nulls=None):
+        self.data = data        # uint8[total_bytes]
+        self.offsets = offsets  # int64[n + 1]
+        self.nulls = nulls      # bool[n] or None when there are no missing values
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = []
+        nulls = []
+        for value in values:
+            missing = not isinstance(value, str) and pd.isna(value)
+            nulls.append(missing)
+            encoded.append(b'' if missing else str(value).encode('utf-8'))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets, np.array(nulls, dtype=bool) if any(nulls) else None)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if self.nulls is not None and self.nulls[index]:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def to_list(self, missing=None):
+        return [missing if value is None else value for value in (self[i] for i in range(len(self)))]
+
+    def arrays(self):
+        arrays = {'data': self.data, 'offsets': self.offsets}
+        if self.nulls is not None:
+            arrays['nulls'] = self.nulls
+        return arrays
+
+
+class CategoryColumn:
+    """Values stored as int32 codes into a tuple of distinct strings (-1 = missing)."""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = tuple(categories)
+
+    @classmethod
+    def from_values(cls, values):
+        codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        return cls(codes.astype(np.int32), [str(category) for category in categories])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return None if code < 0 else self.categories[code]
+
+    def arrays(self):
+        return {'codes': self.codes}
+
+
+# --- POI table ---
+
+class PoiTable:
+    """
+    Columnar POI storage. POIs are sorted by ParentLocationID (CSV order kept within a location);
+    the POIs of location_ids[i] are the rows offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, location_ids, offsets, name, poi_type, lat, lng, description=None):
+        self.location_ids = location_ids  # int64[k], sorted, unique
+        self.offsets = offsets            # int64[k + 1]
+        self.name = name                  # TextColumn
+        self.type = poi_type              # CategoryColumn
+        self.lat = lat                    # float64[n]
+        self.lng = lng                    # float64[n]
+        self.description = description    # TextColumn or None when the CSV has no POIDescription
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+            TextColumn.from_values([]), CategoryColumn.from_values([]),
+            np.zeros(0), np.zeros(0)
+        )
+
+    @classmethod
+    def from_dataframe(cls, pois_df):
+        """
+        Builds the table from a POI DataFrame with columns ParentLocationID, name, type, lat, lng
+        and optionally description.
+        """
+        pois_df = pois_df[pois_df['ParentLocationID'].notna()]
+        parent_ids = pois_df['ParentLocationID'].to_numpy().astype(np.int64)
+        order = np.argsort(parent_ids, kind='stable')
+        parent_ids = parent_ids[order]
+        pois_df = pois_df.iloc[order]
+
+        location_ids, starts = np.unique(parent_ids, return_index=True)
+        offsets = np.append(starts, len(parent_ids)).astype(np.int64)
+
+        description = None
+        if 'description' in pois_df.columns:
+            description = TextColumn.from_values(pois_df['description'])
+        return cls(
+            location_ids, offsets,
+            TextColumn.from_values(pois_df['name']),
+            CategoryColumn.from_values(pois_df['type']),
+            pois_df['lat'].to_numpy(dtype=np.float64),
+            pois_df['lng'].to_numpy(dtype=np.float64),
+            description
+        )
+
+    def __len__(self):
+        return len(self.lat)
+
+    def row_range(self, location_id):
+        """Returns (start, end) POI rows of a location; empty range if it has no POIs."""
+        try:
+            location_id = int(location_id)
+        except (TypeError, ValueError):
+            return 0, 0
+        position = np.searchsorted(self.location_ids, location_id)
+        if position >= len(self.location_ids) or self.location_ids[position] != location_id:
+            return 0, 0
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def parent_ids(self, rows):
+        """Returns the ParentLocationID of each POI row (int64 array)."""
+        return self.location_ids[np.searchsorted(self.offsets, rows, side='right') - 1]
+
+    def record(self, row):
+        """Returns one POI as the dict sent to the frontend."""
+        record = {
+            'name': self.name[row],
+            'type': self.type[row],
+            'lat': float(self.lat[row]),
+            'lng': float(self.lng[row]),
+        }
+        if self.description is not None:
+            record['description'] = self.description[row]
+        return record
+
+    def for_location(self, location_id):
+        """Returns the POIs of a location as a list of dicts (CSV order)."""
+        start, end = self.row_range(location_id)
+        return [self.record(row) for row in range(start, end)]
+
+
+# --- CSV loading ---
+
+def load_csv_dataset(locations_csv_path, pois_csv_path):
+    """
+    Loads and preprocesses location and POI data from the CSV files.
+    Expects a 'Description' column in the locations CSV.
+    Optionally reads 'POIDescription' from the POIs CSV.
+
+    Returns:
+        tuple: (locations_df, poi_table). locations_df is empty if the locations could not be loaded.
+    """
+    try:
+        # --- File Existence Checks ---
+        if not os.path.exists(locations_csv_path):
+            logger.critical("Locations file not found at '%s'. Cannot load data.", locations_csv_path)
+            return pd.DataFrame(), PoiTable.empty()
+
+        # --- Load Locations ---
+        locations_df = pd.read_csv(locations_csv_path)
+        logger.info("Loading locations: %d rows from %s", len(locations_df), locations_csv_path)
+
+        # --- Check Required Location Columns (Including Description) ---
+        missing_loc_cols = [col for col in REQUIRED_LOCATION_COLUMNS if col not in locations_df.columns]
+        if missing_loc_cols:
+            logger.critical("Missing required columns in locations CSV: %s. Cannot load data.", missing_loc_cols)
+            return pd.DataFrame(), PoiTable.empty()
+
+        # --- Preprocess Locations ---
+        locations_df['Type'] = locations_df['Type'].replace(type_mapping, regex=False)
+        locations_df['Budget'] = locations_df['Budget'].replace(budget_mapping, regex=False)
+        locations_df['Description'] = locations_df['Description'].fillna("No description available for this location.")
+        locations_df['Description'] = locations_df['Description'].astype(str) # Ensure string type
+        locations_df = compact_locations(locations_df)
+
+        # --- Handle POIs ---
+        if not os.path.exists(pois_csv_path):
+            logger.warning("POIs file not found at '%s'. Locations will have no POIs.", pois_csv_path)
+            return locations_df, PoiTable.empty()
+
+        pois_df = pd.read_csv(pois_csv_path)
+        logger.info("Loading POIs: %d rows from %s", len(pois_df), pois_csv_path)
+
+        missing_poi_cols = [col for col in REQUIRED_POI_COLUMNS if col not in pois_df.columns]
+        if missing_poi_cols:
+            logger.warning("Missing required columns in POIs CSV: %s. POIs may not load correctly.", missing_poi_cols)
+            return locations_df, PoiTable.empty()
+
+        # Rename columns for consistency
+        poi_rename_map = {'POIName': 'name', 'POIType': 'type', 'POILat': 'lat', 'POILng': 'lng'}
+        if 'POIDescription' in pois_df.columns:
+            logger.debug("Found optional 'POIDescription' column in POIs CSV.")
+            poi_rename_map['POIDescription'] = 'description'
+        else:
+            logger.info("Optional 'POIDescription' column not found in POIs CSV. Descriptions will be empty.")
+        pois_df = pois_df[['ParentLocationID'] + list(poi_rename_map)].rename(columns=poi_rename_map)
+
+        # Fill NaN/missing POI descriptions if column exists
+        if 'description' in pois_df.columns:
+            pois_df['description'] = pois_df['description'].fillna("").astype(str)
+
+        return locations_df, PoiTable.from_dataframe(pois_df)
+
+    except Exception as e:
+        logger.exception("Unexpected error during data loading: %s", e)
+        return pd.DataFrame(), PoiTable.empty()
+
+
+def compact_locations(locations_df):
+    """Converts the low-cardinality location columns to categoricals."""
+    for column in CATEGORICAL_LOCATION_COLUMNS:
+        if column in locations_df.columns:
+            locations_df[column] = locations_df[column].astype('category')
+    return locations_df
+
+
+# --- Snapshot ---
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _sources(locations_csv_path, pois_csv_path):
+    sources = {'locations': _source_fingerprint(locations_csv_path)}
+    if os.path.exists(pois_csv_path):
+        sources['pois'] = _source_fingerprint(pois_csv_path)
+    return sources
+
+
+def data_version(locations_csv_path, pois_csv_path):
+    """
+    Short fingerprint of the current source files (path, size, mtime). Changes whenever one of
+    the CSV files is edited; identical for every process that sees the same files.
+    """
+    try:
+        sources = _sources(locations_csv_path, pois_csv_path)
+    except OSError:
+        return 'missing'
+    return hashlib.sha1(json.dumps(sources, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def _save_arrays(directory, prefix, arrays):
+    files = {}
+    for key, array in arrays.items():
+        file_name = f"{prefix}.{key}.npy"
+        np.save(os.path.join(directory, file_name), np.ascontiguousarray(array))
+        files[key] = file_name
+    return files
+
+
+def _load_arrays(directory, files, mmap):
+    return {key: np.load(os.path.join(directory, file_name), mmap_mode='r' if mmap else None)
+            for key, file_name in files.items()}
+
+
+def build_snapshot(locations_csv_path, pois_csv_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Compiles the CSV files into a snapshot directory. The directory is replaced atomically
+    (written next to it and renamed), so running workers never see a half-written snapshot.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    locations_df, poi_table = load_csv_dataset(locations_csv_path, pois_csv_path)
+    if locations_df.empty:
+        raise ValueError("No location data loaded, snapshot not written.")
+
+    staging_dir = f"{snapshot_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    # --- Locations: one entry per column ---
+    location_columns = []
+    for position, column in enumerate(locations_df.columns):
+        values = locations_df[column]
+        prefix = f"locations.{position}"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            category = CategoryColumn(values.cat.codes.to_numpy(dtype=np.int32), [str(c) for c in values.cat.categories])
+            location_columns.append({'name': column, 'kind': 'category', 'categories': list(category.categories),
+                                     'files': _save_arrays(staging_dir, prefix, category.arrays())})
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            location_columns.append({'name': column, 'kind': 'numeric',
+                                     'files': _save_arrays(staging_dir, prefix, {'values': values.to_numpy()})})
+        else:
+            location_columns.append({'name': column, 'kind': 'text',
+                                     'files': _save_arrays(staging_dir, prefix, TextColumn.from_values(values).arrays())})
+
+    # --- POIs ---
+    poi_files = {
+        'index': _save_arrays(staging_dir, 'pois.index', {'location_ids': poi_table.location_ids, 'offsets': poi_table.offsets}),
+        'name': _save_arrays(staging_dir, 'pois.name', poi_table.name.arrays()),
+        'type': _save_arrays(staging_dir, 'pois.type', poi_table.type.arrays()),
+        'coords': _save_arrays(staging_dir, 'pois.coords', {'lat': poi_table.lat, 'lng': poi_table.lng}),
+    }
+    if poi_table.description is not None:
+        poi_files['description'] = _save_arrays(staging_dir, 'pois.description', poi_table.description.arrays())
+
+    # --- Full-text search index ---
+    search_index = SearchIndex.build(locations_df, poi_table)
+    search = {'files': _save_arrays(staging_dir, 'search', search_index.arrays()), **search_index.meta()}
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'created': time.time(),
+        'sources': _sources(locations_csv_path, pois_csv_path),
+        'locations': {'rows': len(locations_df), 'columns': location_columns},
+        'pois': {'rows': len(poi_table), 'type_categories': list(poi_table.type.categories), 'files': poi_files},
+        'search': search,
+    }
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    # Swap the new snapshot in
+    old_dir = f"{snapshot_dir.rstrip(os.sep)}.old-{os.getpid()}"
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old_dir)
+    os.rename(staging_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(snapshot_dir):
+    """Returns the snapshot manifest, or None if there is no readable snapshot."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_is_fresh(snapshot_dir, locations_csv_path, pois_csv_path):
+    """True if the snapshot exists and was built from the current versions of the CSV files."""
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or manifest.get('format') != SNAPSHOT_FORMAT:
+        return False
+    try:
+        return manifest['sources'] == _sources(locations_csv_path, pois_csv_path)
+    except OSError:
+        return False
+
+
+def load_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR, mmap=True):
+    """
+    Loads a snapshot. Large arrays (POI text and coordinates) stay memory-mapped, so their pages
+    are shared between all worker processes through the OS page cache.
+
+    Returns:
+        tuple: (locations_df, poi_table)
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in '{snapshot_dir}'.")
+
+    # --- Locations ---
+    columns = {}
+    for column in manifest['locations']['columns']:
+        arrays = _load_arrays(snapshot_dir, column['files'], mmap)
+        if column['kind'] == 'category':
+            columns[column['name']] = pd.Categorical.from_codes(np.asarray(arrays['codes']), categories=column['categories'])
+        elif column['kind'] == 'numeric':
+            columns[column['name']] = np.asarray(arrays['values'])
+        else:
+            text = TextColumn(arrays['data'], arrays['offsets'], arrays.get('nulls'))
+            columns[column['name']] = text.to_list(missing=np.nan)
+    locations_df = pd.DataFrame(columns)
+
+    # --- POIs ---
+    files = manifest['pois']['files']
+    index = _load_arrays(snapshot_dir, files['index'], mmap)
+    name = _load_arrays(snapshot_dir, files['name'], mmap)
+    coords = _load_arrays(snapshot_dir, files['coords'], mmap)
+    description = None
+    if 'description' in files:
+        arrays = _load_arrays(snapshot_dir, files['description'], mmap)
+        description = TextColumn(arrays['data'], arrays['offsets'], arrays.get('nulls'))
+    poi_table = PoiTable(
+        index['location_ids'], index['offsets'],
+        TextColumn(name['data'], name['offsets'], name.get('nulls')),
+        CategoryColumn(_load_arrays(snapshot_dir, files['type'], mmap)['codes'], manifest['pois']['type_categories']),
+        coords['lat'], coords['lng'],
+        description
+    )
+    return locations_df, poi_table
+
+
+def load_search_index(snapshot_dir=DEFAULT_SNAPSHOT_DIR, mmap=True):
+    """
+    Loads the full-text search index stored in a snapshot (postings stay memory-mapped).
+
+    Returns:
+        SearchIndex or None: None if the snapshot has no search index (built by an older version).
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or 'search' not in manifest:
+        return None
+    search = manifest['search']
+    return SearchIndex(_load_arrays(snapshot_dir, search['files'], mmap), search['countries'], search['poi_types'], search['n_destinations'])
+
+
+def load_dataset(locations_csv_path, pois_csv_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Loads the data from the snapshot when it is fresh, otherwise from the CSV files.
+
+    Returns:
+        tuple: (locations_df, poi_table, source) where source is 'snapshot' or 'csv'.
+    """
+    if snapshot_dir and snapshot_is_fresh(snapshot_dir, locations_csv_path, pois_csv_path):
+        try:
+            locations_df, poi_table = load_snapshot(snapshot_dir)
+            logger.info("Loaded data snapshot from '%s'.", snapshot_dir)
+            return locations_df, poi_table, 'snapshot'
+        except Exception as e:
+            logger.warning("Could not load data snapshot from '%s': %s. Falling back to CSV.", snapshot_dir, e)
+    elif snapshot_dir and read_manifest(snapshot_dir) is not None:
+        logger.warning("Data snapshot in '%s' is stale. Loading CSV files; rebuild with: python dataset.py build", snapshot_dir)
+
+    locations_df, poi_table = load_csv_dataset(locations_csv_path, pois_csv_path)
+    return locations_df, poi_table, 'csv'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile the destination and POI CSV files into a binary snapshot.")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--locations', default='destinations.csv')
+    parser.add_argument('--pois', default='points_of_interest.csv')
+    parser.add_argument('--out', default=DEFAULT_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    from log_config import setup_logging
+    setup_logging(log_format='text')
+
+    start = time.perf_counter()
+    manifest = build_snapshot(args.locations, args.pois, args.out)
+    print(f"Snapshot written to '{args.out}': {manifest['locations']['rows']} locations, "
+          f"{manifest['pois']['rows']} POIs in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,212 @@
+import re
+
+import numpy as np
+import pandas as pd
+from mappings import style_synonym_mapping, suitable_for_synonyms_mapping
+from seasons import parse_best_time
+
+
+# Fields copied into every recommendation dict (output key -> DataFrame column)
+RECOMMENDATION_FIELDS = {
+    'id': 'LocationID',
+    'name': 'LocationName',
+    'country': 'Country',
+    'type': 'Type',
+    'budget': 'Budget',
+    'best_time_to_visit': 'Best Time to Visit',
+    'style': 'Travel Style',
+    'latitude': 'Latitude',
+    'longitude': 'Longitude',
+}
+
+# Separators of multi-valued place cells ("Spain & France", "German, French, Italian, Romansh")
+_PLACE_SEPARATORS = re.compile(r'\s*(?:[,/;&]|\band\b)\s*')
+_PARENTHESES = re.compile(r'\([^)]*\)')
+
+
+def place_names(cell):
+    """Names listed in a Country / Language cell, e.g. "English, Irish (Gaeilge)" -> ['English', 'Irish']."""
+    if not isinstance(cell, str):
+        return []
+    names = (name.strip() for name in _PLACE_SEPARATORS.split(_PARENTHESES.sub('', cell)))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def posting_lists(column):
+    """
+    Row-ID posting list per name of a multi-valued column.
+
+    Args:
+        column (pd.Series): Country or Language column.
+
+    Returns:
+        dict: name -> sorted, read-only np.ndarray of int32 row positions.
+    """
+    codes, cells = pd.factorize(column)
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    bounds = np.searchsorted(codes[order], np.arange(len(cells) + 1))
+    cell_rows = [order[bounds[code]:bounds[code + 1]] for code in range(len(cells))]
+    by_name = {}
+    for code, cell in enumerate(cells):
+        for name in place_names(cell):
+            by_name.setdefault(name, []).append(cell_rows[code])
+    postings = {}
+    for name, parts in by_name.items():
+        rows = np.unique(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+        rows.setflags(write=False)
+        postings[name] = rows
+    return postings
+
+
+class DestinationIndex:
+    """
+    Boolean row masks over the destinations DataFrame, built once at load time.
+
+    Every type / budget / style / suitable_for filter is precomputed as a NumPy boolean
+    array (one entry per destination row); the DestinationRanker stacks them into its
+    feature matrix instead of running string operations on the DataFrame. Best Time to Visit
+    is parsed into a 12-bit month mask per destination (see seasons.py), and every country and
+    language gets a posting list of the rows it occurs in.
+    """
+
+    def __init__(self, destinations_df):
+        """
+        Builds the index.
+
+        Args:
+            destinations_df (pd.DataFrame): The preprocessed destinations (Chatbot.df).
+        """
+        self.size = len(destinations_df)
+
+        # --- Prebuilt recommendation dicts (row order) ---
+        if self.size and all(column in destinations_df.columns for column in RECOMMENDATION_FIELDS.values()):
+            rows = destinations_df[list(RECOMMENDATION_FIELDS.values())].to_dict('records')
+            self.records = [
+                {key: row[column] for key, column in RECOMMENDATION_FIELDS.items()}
+                for row in rows
+            ]
+        else:
+            self.records = [{} for _ in range(self.size)]
+
+        # --- Lowercased free-text columns, kept only to build masks for unknown values ---
+        self._text_columns = {
+            column: destinations_df[column].str.lower()
+            for column in ('Travel Style', 'Suitable For')
+            if column in destinations_df.columns
+        }
+
+        # --- Type: case-insensitive equality ---
+        self._type_masks = {}
+        if 'Type' in destinations_df.columns:
+            lowered_types = destinations_df['Type'].str.lower()
+            for value in lowered_types.dropna().unique():
+                self._type_masks[value] = (lowered_types == value).to_numpy()
+
+        # --- Budget: exact equality ---
+        self._budget_masks = {}
+        if 'Budget' in destinations_df.columns:
+            for value in destinations_df['Budget'].dropna().unique():
+                self._budget_masks[value] = (destinations_df['Budget'] == value).to_numpy()
+
+        # --- Best Time to Visit: month mask per row, each distinct value parsed once ---
+        if 'Best Time to Visit' in destinations_df.columns:
+            codes, values = pd.factorize(destinations_df['Best Time to Visit'])
+            value_masks = np.array([parse_best_time(value) for value in values] + [0], dtype=np.uint16)
+            self.month_masks = value_masks[codes] # Code -1 (missing value) picks the trailing 0
+        else:
+            self.month_masks = np.zeros(self.size, dtype=np.uint16)
+        self.month_masks.setflags(write=False)
+
+        # --- Country / language: row-ID posting lists ---
+        self.country_rows = posting_lists(destinations_df['Country']) if 'Country' in destinations_df.columns else {}
+        self.language_rows = posting_lists(destinations_df['Language']) if 'Language' in destinations_df.columns else {}
+
+        # --- Style / suitable_for: substring of the lowercased free-text column ---
+        self._contains_masks = {}
+        for column, mapping in (('Travel Style', style_synonym_mapping), ('Suitable For', suitable_for_synonyms_mapping)):
+            for key in mapping:
+                self._contains_masks[(column, key.lower())] = self._substring_mask(column, key.lower())
+
+    def feature_masks(self):
+        """
+        All precomputed masks, for the ranking feature matrix.
+
+        Returns:
+            list: (field, value, mask) triples; field is 'type', 'budget', 'style' or 'suitable_for'.
+        """
+        masks = [('type', value, mask) for value, mask in self._type_masks.items()]
+        masks += [('budget', value, mask) for value, mask in self._budget_masks.items()]
+        for key in style_synonym_mapping:
+            masks.append(('style', key, self.contains_mask('Travel Style', key)))
+        for key in suitable_for_synonyms_mapping:
+            masks.append(('suitable_for', key, self.contains_mask('Suitable For', key)))
+        return masks
+
+    def all_rows(self):
+        """Returns a fresh mask selecting every destination."""
+        return np.ones(self.size, dtype=bool)
+
+    def _no_rows(self):
+        return np.zeros(self.size, dtype=bool)
+
+    def type_mask(self, destination_type):
+        """Mask of destinations whose Type equals destination_type (case-insensitive)."""
+        return self._type_masks.get(destination_type.lower(), self._no_rows())
+
+    def budget_mask(self, budget):
+        """Mask of destinations whose Budget equals budget exactly."""
+        return self._budget_masks.get(budget, self._no_rows())
+
+    def month_mask(self, months):
+        """
+        Mask of destinations whose best time to visit shares a month with months.
+
+        Args:
+            months (int): 12-bit month mask (see seasons.months_mask).
+        """
+        return (self.month_masks & np.uint16(months)) != 0
+
+    def place_rows(self, countries=(), languages=()):
+        """
+        Rows in any of the countries and speaking any of the languages.
+
+        Args:
+            countries (iterable): Country names (keys of country_rows); empty for no constraint.
+            languages (iterable): Language names (keys of language_rows); empty for no constraint.
+
+        Returns:
+            np.ndarray or None: Sorted int32 row positions, or None without any constraint.
+        """
+        rows = None
+        for names, postings in ((countries, self.country_rows), (languages, self.language_rows)):
+            names = list(names)
+            if not names:
+                continue
+            lists = [postings[name] for name in names if name in postings]
+            union = np.unique(np.concatenate(lists)) if len(lists) > 1 else (lists[0] if lists else np.zeros(0, dtype=np.int32))
+            rows = union if rows is None else np.intersect1d(rows, union, assume_unique=True)
+        return rows
+
+    def country_mask(self, country):
+        """Mask of destinations in country (exact name, a key of country_rows)."""
+        mask = self._no_rows()
+        rows = self.country_rows.get(country)
+        if rows is not None:
+            mask[rows] = True
+        return mask
+
+    def contains_mask(self, column, value):
+        """
+        Mask of destinations whose lowercased column contains value.lower() (plain substring,
+        not a regular expression).
+
+        Masks for all mapping keys are built up front and kept; any other value is computed
+        on every call, so arbitrary values cannot grow the index.
+        """
+        mask = self._contains_masks.get((column, value.lower()))
+        return mask if mask is not None else self._substring_mask(column, value.lower())
+
+    def _substring_mask(self, column, lowered):
+        if column not in self._text_columns:
+            return self._no_rows()
+        return self._text_columns[column].str.contains(lowered, regex=False, na=False).to_numpy()
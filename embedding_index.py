@@ -0,0 +1,353 @@
+"""
+Semantic similarity search over destination and POI texts.
+
+Built offline from the CSV files into a directory of .npy files plus manifest.json:
+
+    python embedding_index.py build [--vectors en_core_web_lg] [--out embedding_index]
+
+Every destination Description, its 'Keywords/Main Attractions' and every POIDescription is
+embedded as the mean of its word vectors, L2-normalized and stored as one float32 matrix
+(items x dims), grouped by destination. At startup the matrix is memory-mapped (shared by all
+serve.py workers). A batch of queries is one matrix multiply; the score of a destination is
+its best matching item, and the top k come from np.argpartition.
+
+Vector sources:
+    <spaCy model> - word vectors of an installed spaCy package (default en_core_web_lg). The
+                    vectors of the words needed for queries are copied into the index, so the
+                    server does not have to load the model (any NLP_PROFILE works).
+    hashing       - deterministic pseudo-random vector per word: no model needed, similarity
+                    is plain word overlap (CI / benchmarks).
+
+The index is only used while it matches the data version of the CSV files.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+from spacy.lang.en.stop_words import STOP_WORDS
+
+from dataset import data_version, load_csv_dataset
+from mappings import style_synonym_mapping, suitable_for_synonyms_mapping, type_synonym_mapping
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_INDEX_FORMAT = 1
+DEFAULT_EMBEDDING_INDEX_DIR = os.environ.get('EMBEDDING_INDEX_DIR', 'embedding_index')
+DEFAULT_VECTORS = 'en_core_web_lg'
+DEFAULT_QUERY_VOCAB_SIZE = 50000 # Most frequent model words kept for queries (besides the data's own words)
+HASHING_DIMS = 256
+SEMANTIC_MIN_SIMILARITY = float(os.environ.get('SEMANTIC_MIN_SIMILARITY', 0.3)) # Cosine similarity a chat suggestion needs
+MANIFEST_FILE = 'manifest.json'
+
+# Item kinds (what a destination matched on)
+ITEM_KINDS = ('description', 'attractions', 'poi')
+_DESCRIPTION, _ATTRACTIONS, _POI = range(len(ITEM_KINDS))
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+# Words of nearly every travel message or description; they would make any text look similar
+GENERIC_WORDS = frozenset({
+    'destination', 'destinations', 'go', 'going', 'holiday', 'like', 'looking', 'place', 'places', 'recommend',
+    'somewhere', 'suggest', 'travel', 'trip', 'vacation', 'visit', 'want', 'would',
+})
+
+
+def content_words(text):
+    """Lowercased words of a text without stop words and very short tokens."""
+    if not isinstance(text, str):
+        return []
+    return [word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 2 and word not in STOP_WORDS and word not in GENERIC_WORDS]
+
+
+def embed(texts, lookup, dims):
+    """
+    Mean word vector per text, L2-normalized (zero vector if no word is known).
+
+    Args:
+        texts (list): Texts to embed.
+        lookup (callable): word -> vector (np.ndarray) or None.
+        dims (int): Vector size.
+
+    Returns:
+        np.ndarray: float32 (len(texts) x dims).
+    """
+    matrix = np.zeros((len(texts), dims), dtype=np.float32)
+    for position, text in enumerate(texts):
+        vectors = [vector for vector in map(lookup, content_words(text)) if vector is not None]
+        if vectors:
+            matrix[position] = np.mean(vectors, axis=0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+# --- Vector sources ---
+
+@functools.lru_cache(maxsize=65536)
+def _hashed_vector(word, dims):
+    """Unit vector of a word for HashingVectors; cached per (word, dims), not per instance."""
+    seed = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+    vector = np.random.default_rng(seed).standard_normal(dims).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class HashingVectors:
+    """A fixed pseudo-random unit vector per word, derived from a hash of the word."""
+
+    kind = 'hashing'
+
+    def __init__(self, dims=HASHING_DIMS):
+        self.dims = dims
+        self.name = 'hashing'
+
+    def vector(self, word):
+        return _hashed_vector(word, self.dims)
+
+
+class SpacyVectors:
+    """Word vectors of an installed spaCy package (only used while building the index)."""
+
+    kind = 'spacy'
+
+    def __init__(self, model_name):
+        import spacy
+        nlp = spacy.load(model_name, exclude=['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'ner', 'senter'])
+        self.vocab = nlp.vocab
+        if not self.vocab.vectors.shape[0]:
+            raise ValueError(f"spaCy package '{model_name}' has no word vectors.")
+        self.dims = self.vocab.vectors.shape[1]
+        self.name = f"{model_name}-{nlp.meta.get('version', '?')}"
+
+    def vector(self, word):
+        if not self.vocab.has_vector(word):
+            return None
+        return np.asarray(self.vocab.get_vector(word), dtype=np.float32)
+
+    def frequent_words(self, limit):
+        """Up to `limit` lowercase alphabetic words, in vector table order."""
+        words = []
+        for key, _ in sorted(self.vocab.vectors.key2row.items(), key=lambda item: item[1]):
+            word = self.vocab.strings[key] if key in self.vocab.strings else None
+            if word and word.isalpha() and word.islower():
+                words.append(word)
+                if len(words) >= limit:
+                    break
+        return words
+
+
+def load_vector_source(name):
+    """'hashing' or the name of an installed spaCy package with word vectors."""
+    return HashingVectors() if name == 'hashing' else SpacyVectors(name)
+
+
+# --- Build ---
+
+def _items(locations_df, poi_table):
+    """(location_id, kind, poi_row, text) per item, grouped by destination in data order."""
+    pois_by_location = {}
+    if poi_table.description is not None:
+        for position, location_id in enumerate(poi_table.location_ids):
+            pois_by_location[int(location_id)] = range(poi_table.offsets[position], poi_table.offsets[position + 1])
+
+    items = []
+    for location in locations_df.to_dict('records'):
+        location_id = int(location['LocationID'])
+        items.append((location_id, _DESCRIPTION, -1, location.get('Description')))
+        items.append((location_id, _ATTRACTIONS, -1, location.get('Keywords/Main Attractions')))
+        for row in pois_by_location.get(location_id, ()):
+            items.append((location_id, _POI, int(row), f"{poi_table.name[row] or ''}. {poi_table.description[row] or ''}"))
+    return [item for item in items if content_words(item[3])]
+
+
+def build_embedding_index(locations_csv_path, pois_csv_path, out_dir=DEFAULT_EMBEDDING_INDEX_DIR,
+                          vectors=DEFAULT_VECTORS, query_vocab_size=DEFAULT_QUERY_VOCAB_SIZE):
+    """
+    Embeds all destination and POI texts and writes the index directory (replaced atomically).
+
+    Args:
+        locations_csv_path (str): Destinations CSV.
+        pois_csv_path (str): POIs CSV.
+        out_dir (str): Output directory.
+        vectors (str): 'hashing' or a spaCy package name (see load_vector_source).
+        query_vocab_size (int): Frequent model words stored for embedding queries (spaCy sources).
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    version = data_version(locations_csv_path, pois_csv_path)
+    locations_df, poi_table = load_csv_dataset(locations_csv_path, pois_csv_path)
+    if locations_df.empty:
+        raise ValueError("No location data loaded, embedding index not written.")
+    source = load_vector_source(vectors)
+
+    items = _items(locations_df, poi_table)
+    matrix = embed([text for _, _, _, text in items], source.vector, source.dims)
+    location_ids = np.array([item[0] for item in items], dtype=np.int64)
+    group_starts = np.flatnonzero(np.r_[True, location_ids[1:] != location_ids[:-1]])
+
+    staging_dir = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    arrays = {
+        'vectors': matrix,
+        'item_kinds': np.array([item[1] for item in items], dtype=np.int8),
+        'item_poi_rows': np.array([item[2] for item in items], dtype=np.int32),
+        'group_starts': group_starts.astype(np.int64),
+        'group_location_ids': location_ids[group_starts],
+    }
+
+    query_words = 0
+    if source.kind == 'spacy':
+        # Vectors for query words, so the server can embed messages without the model
+        words = dict.fromkeys(source.frequent_words(query_vocab_size))
+        for text in [item[3] for item in items] + [' '.join(synonyms) for mapping in (style_synonym_mapping, suitable_for_synonyms_mapping, type_synonym_mapping) for synonyms in mapping.values()]:
+            words.update(dict.fromkeys(content_words(text)))
+        words = [word for word in words if source.vector(word) is not None]
+        arrays['query_vectors'] = np.stack([source.vector(word) for word in words]).astype(np.float32)
+        with open(os.path.join(staging_dir, 'query_words.json'), 'w') as words_file:
+            json.dump(words, words_file)
+        query_words = len(words)
+
+    for key, array in arrays.items():
+        np.save(os.path.join(staging_dir, f"{key}.npy"), np.ascontiguousarray(array))
+    manifest = {
+        'format': EMBEDDING_INDEX_FORMAT,
+        'created': time.time(),
+        'data_version': version,
+        'vectors': {'kind': source.kind, 'name': source.name, 'dims': source.dims, 'query_words': query_words},
+        'items': len(items),
+        'destinations': len(group_starts),
+    }
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    old_dir = f"{out_dir.rstrip(os.sep)}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(staging_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+# --- Query ---
+
+class EmbeddingIndex:
+    """Memory-mapped item vectors plus what is needed to embed queries."""
+
+    def __init__(self, directory, manifest, mmap=True):
+        mode = 'r' if mmap else None
+        load = lambda key: np.load(os.path.join(directory, f"{key}.npy"), mmap_mode=mode)
+        self.manifest = manifest
+        self.vectors = load('vectors')
+        self.item_kinds = load('item_kinds')
+        self.item_poi_rows = load('item_poi_rows')
+        self.group_starts = np.asarray(load('group_starts'))
+        self.group_ends = np.r_[self.group_starts[1:], len(self.vectors)]
+        self.location_ids = np.asarray(load('group_location_ids'))
+        self.dims = manifest['vectors']['dims']
+
+        if manifest['vectors']['kind'] == 'hashing':
+            self._lookup = HashingVectors(self.dims).vector
+        else:
+            with open(os.path.join(directory, 'query_words.json')) as words_file:
+                rows = {word: row for row, word in enumerate(json.load(words_file))}
+            query_vectors = load('query_vectors')
+            self._lookup = lambda word: query_vectors[rows[word]] if word in rows else None
+
+    @classmethod
+    def load(cls, directory, expected_version=None, mmap=True):
+        """
+        Loads the index from a directory.
+
+        Args:
+            directory (str): Index directory (see build_embedding_index).
+            expected_version (str, optional): Data version the index must have been built from.
+
+        Returns:
+            EmbeddingIndex or None: None if there is no index or it is stale / unreadable.
+        """
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format') != EMBEDDING_INDEX_FORMAT:
+            logger.warning("Embedding index in '%s' has an unknown format; rebuild with: python embedding_index.py build", directory)
+            return None
+        if expected_version is not None and manifest.get('data_version') != expected_version:
+            logger.warning("Embedding index in '%s' is stale; rebuild with: python embedding_index.py build", directory)
+            return None
+        try:
+            index = cls(directory, manifest, mmap)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load embedding index from '%s': %s", directory, e)
+            return None
+        logger.info("Loaded embedding index from '%s': %d items, %s vectors.", directory, len(index.vectors), manifest['vectors']['name'])
+        return index
+
+    def embed_queries(self, texts):
+        """Normalized query vectors (zero rows for texts without known words)."""
+        return embed(texts, self._lookup, self.dims)
+
+    def search(self, texts, k, min_score=0.0):
+        """
+        The destinations most similar to each text.
+
+        Args:
+            texts (list): Query texts (answered together with one matrix multiply).
+            k (int): Results per text.
+            min_score (float, optional): Minimum cosine similarity.
+
+        Returns:
+            list: Per text, up to k (location_id, score, item_kind, poi_row) tuples, best first;
+                poi_row is -1 unless the best item is a POI.
+        """
+        queries = self.embed_queries(texts)
+        if not len(self.group_starts) or k <= 0:
+            return [[] for _ in texts]
+        similarities = queries @ self.vectors.T # (texts x items)
+        scores = np.maximum.reduceat(similarities, self.group_starts, axis=1) # Best item per destination
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for position, query in enumerate(queries):
+            if not query.any():
+                results.append([])
+                continue
+            groups = top[position][np.argsort(-scores[position, top[position]], kind='stable')]
+            matches = []
+            for group in groups:
+                score = float(scores[position, group])
+                if score < min_score:
+                    break
+                start = self.group_starts[group]
+                item = start + int(np.argmax(similarities[position, start:self.group_ends[group]]))
+                matches.append((int(self.location_ids[group]), score, ITEM_KINDS[self.item_kinds[item]], int(self.item_poi_rows[item])))
+            results.append(matches)
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the embedding index over destination and POI descriptions.")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--locations', default='destinations.csv')
+    parser.add_argument('--pois', default='points_of_interest.csv')
+    parser.add_argument('--out', default=DEFAULT_EMBEDDING_INDEX_DIR)
+    parser.add_argument('--vectors', default=DEFAULT_VECTORS, help="spaCy package with word vectors, or 'hashing'")
+    parser.add_argument('--query-vocab', type=int, default=DEFAULT_QUERY_VOCAB_SIZE)
+    args = parser.parse_args()
+
+    from log_config import setup_logging
+    setup_logging(log_format='text')
+
+    start = time.perf_counter()
+    manifest = build_embedding_index(args.locations, args.pois, args.out, args.vectors, args.query_vocab)
+    print(f"Embedding index written to '{args.out}': {manifest['items']} items of {manifest['destinations']} destinations, "
+          f"{manifest['vectors']['name']} ({manifest['vectors']['dims']} dims) in {time.perf_counter() - start:.2f}s")
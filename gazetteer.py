@@ -0,0 +1,95 @@
+"""
+Country and language names in chat messages.
+
+The gazetteer is compiled at load time from the countries and languages that actually occur in
+the destinations (the keys of the DestinationIndex posting lists) plus their aliases and
+demonyms from mappings.py, into a single KeywordMatcher. Phrases match whole words only: both the
+phrases and the message are reduced to lowercase words separated by single spaces and padded
+with a space on each side.
+
+Country names and aliases ("italy", "czechia", "uk") are hard constraints. A demonym ("spanish
+food", "a french city") is only a preference for that country's culture: it may describe a
+place outside the catalogue ("spanish food in mexico"), so it ranks instead of filtering. A
+language name that is also a demonym needs a cue to be a language ("french-speaking", "speak
+french", "french language"); language names that are not demonyms ("catalan", "romansh") name
+the language on their own.
+"""
+import re
+
+from keyword_matcher import KeywordMatcher
+from mappings import country_alias_mapping, country_demonym_mapping, language_alias_mapping
+
+# Words around a language name that make it a language constraint
+LANGUAGE_CUES_AFTER = ('speaking', 'speaker', 'speakers', 'language', 'spoken')
+LANGUAGE_CUES_BEFORE = ('speak', 'speaks', 'speaking')
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_phrase(text):
+    """Lowercase words separated by single spaces, padded with a space on each side."""
+    return f" {_NON_WORD.sub(' ', text.lower()).strip()} "
+
+
+class Gazetteer:
+    """Phrase matcher for the countries and languages of the loaded destinations."""
+
+    def __init__(self, destination_index, country_aliases=country_alias_mapping,
+                 country_demonyms=country_demonym_mapping, language_aliases=language_alias_mapping):
+        """
+        Compiles the matcher.
+
+        Args:
+            destination_index (DestinationIndex): Provides the country / language names (its
+                posting lists); aliases of names that do not occur in the data are left out.
+            country_aliases (dict): Country -> other names.
+            country_demonyms (dict): Country -> demonyms.
+            language_aliases (dict): Language -> other names.
+        """
+        keywords = []
+        country_phrases = set()
+        for country in destination_index.country_rows:
+            for phrase in [country, *country_aliases.get(country, ())]:
+                phrase = normalize_phrase(phrase)
+                country_phrases.add(phrase)
+                keywords.append((phrase, ('country', country, phrase)))
+            for phrase in country_demonyms.get(country, ()):
+                phrase = normalize_phrase(phrase)
+                country_phrases.add(phrase)
+                keywords.append((phrase, ('culture', country, phrase)))
+        for language in destination_index.language_rows:
+            for phrase in [language, *language_aliases.get(language, ())]:
+                phrase = normalize_phrase(phrase)
+                if phrase not in country_phrases:
+                    keywords.append((phrase, ('language', language, phrase)))
+                # A cued match also records the bare phrase, so its demonym reading is dropped
+                for cue in LANGUAGE_CUES_AFTER:
+                    keywords.append((f"{phrase}{cue} ", ('language', language, phrase)))
+                for cue in LANGUAGE_CUES_BEFORE:
+                    keywords.append((f" {cue}{phrase}", ('language', language, phrase)))
+        self.matcher = KeywordMatcher(keywords)
+        self.size = len(keywords)
+
+    def find(self, text):
+        """
+        Countries and languages named in a message (one pass of the matcher).
+
+        Args:
+            text (str): The message.
+
+        Returns:
+            dict: {'intents': list, 'countries': list, 'languages': list, 'cultures': list};
+                cultures are the countries named only by a demonym. The intents are
+                'recommend_country' / 'recommend_language' / 'recommend_culture' for the
+                lists that are not empty.
+        """
+        found = self.matcher.find(normalize_phrase(text))
+        language_phrases = {phrase for field, _, phrase in found if field == 'language'}
+        places = {
+            field: sorted({value for kind, value, phrase in found if kind == kind_name and phrase not in language_phrases})
+            for field, kind_name in (('countries', 'country'), ('cultures', 'culture'))
+        }
+        places['languages'] = sorted({value for kind, value, _ in found if kind == 'language'})
+        places['intents'] = [intent for field, intent in (('countries', 'recommend_country'), ('languages', 'recommend_language'),
+                                                          ('cultures', 'recommend_culture')) if places[field]]
+        return places
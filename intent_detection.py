@@ -1,136 +1,338 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+
 import spacy
-from spacy_merger import merge_hyphenated_tokens
-from mappings import type_synonym_mapping,budget_synonym_mapping,style_synonym_mapping,suitable_for_synonyms_mapping
+from spacy_merger import merge_hyphenated_tokens, HYPHEN_MERGER_NAME
+from keyword_matcher import KeywordMatcher
+from metrics import stage
+from mappings import (type_synonym_mapping,budget_synonym_mapping,style_synonym_mapping,suitable_for_synonyms_mapping,
+                      country_alias_mapping, language_alias_mapping)
+from seasons import MONTHS, MONTH_WORDS, AMBIGUOUS_MONTH_WORDS, TIME_PREPOSITIONS, message_months
+
+logger = logging.getLogger(__name__)
+
+# --- Entity cache (see Chatbot.entity_cache); size 0 disables it ---
+ENTITY_CACHE_SIZE = int(os.environ.get('ENTITY_CACHE_SIZE', 8192))
+ENTITY_CACHE_MAX_BYTES = int(os.environ.get('ENTITY_CACHE_MAX_BYTES', 8 * 2 ** 20))
+ENTITY_CACHE_ENTRY_OVERHEAD = 100 # Bytes of bookkeeping per entry (OrderedDict node, (expires_at, value, size) tuple)
+
+
+# --- Intents reported by extract_entities ---
+INTENTS = ('recommend_type', 'recommend_budget', 'recommend_style', 'recommend_suitable_for', 'recommend_season',
+           'recommend_country', 'recommend_language', 'recommend_culture')
+
+# --- Conversation context fields (see ai_logic.new_context) ---
+CONTEXT_LIST_KEYS = ('suitable_for', 'style', 'intents', 'months', 'countries', 'languages', 'cultures')
+CONTEXT_VALUE_KEYS = ('type', 'budget')
+
+# --- Intent keywords (lemmas), built once at import ---
+TYPE_INTENT_KEYWORDS = frozenset(["type", "kind", "like", "want", "city", "island", "beach", "mountain", "countryside", "coastal", "lake", "region", "site"])
+
+BUDGET_INTENT_KEYWORDS = frozenset(
+    ["budget", "cheap", "inexpensive", "affordable", "luxury", "expensive", "costly", "budget-friendly", "mid-range", "moderate", "low", "high"]
+    + [synonym for synonyms in budget_synonym_mapping.values() for synonym in synonyms]
+)
+
+STYLE_INTENT_KEYWORDS = frozenset(
+    ["style", "travel", "vacation", "vacation style", "travel style", "like", "want", "adventure", "relax", "cultural", "romantic", "nature", "historical", "foodie", "wellness"]
+    + [synonym for synonyms in style_synonym_mapping.values() for synonym in synonyms]
+)
+
+SUITABLE_FOR_INTENT_KEYWORDS = frozenset(
+    synonym for synonyms in suitable_for_synonyms_mapping.values() for synonym in synonyms
+)
+
 
+# --- Entity synonym matcher, built once at import ---
+# Each synonym carries (category, rank, standardized value). The rank is the position of the
+# standardized value in its mapping, so "first match wins" keeps the mapping order.
+ENTITY_CATEGORIES = (
+    ('type', type_synonym_mapping, str.title),
+    ('budget', budget_synonym_mapping, str.capitalize),
+    ('style', style_synonym_mapping, str.capitalize),
+    ('suitable_for', suitable_for_synonyms_mapping, str.capitalize),
+)
 
 
-def detect_intent_spacy(user_input, context, nlp):
+def context_vocabularies(categories=ENTITY_CATEGORIES, intents=INTENTS, months=MONTHS,
+                         countries=tuple(country_alias_mapping), languages=tuple(language_alias_mapping)):
     """
-    Detects user intent using spaCy for more advanced NLU.
+    Every value a context field can hold, as stored by update_context.
 
     Args:
-        user_input (str): The user's input text.
+        categories (tuple): (category, synonym_mapping, normalize) triples.
+        intents (tuple): All intent names.
+        months (tuple): All month names.
+        countries (tuple): Known country names (also the values of 'cultures').
+        languages (tuple): Known language names.
 
     Returns:
-        tuple: (intent_str, entities_dict) - detected intent and extracted entities.
+        dict: Context field -> tuple of values (in mapping order).
     """
+    vocabularies = {
+        category: tuple(dict.fromkeys(normalize(value) for value in synonym_mapping))
+        for category, synonym_mapping, normalize in categories
+    }
+    vocabularies['intents'] = tuple(intents)
+    vocabularies['months'] = tuple(months)
+    vocabularies['countries'] = tuple(countries)
+    vocabularies['languages'] = tuple(languages)
+    vocabularies['cultures'] = tuple(countries)
+    return vocabularies
 
-    recommend_intent_keywords = ["recommend", "suggest", "find", "destination", "place", "go"]  
-    type_intent_keywords = ["type", "kind", "like", "want", "city", "island", "beach", "mountain", "countryside", "coastal", "lake", "region", "site"] # Added more type keywords to cover more categories
-    destination_types = [value[0] for value in type_synonym_mapping.values() if value]
-    budget_intent_keywords = ["budget", "cheap", "inexpensive", "affordable", "luxury", "expensive", "costly", "budget-friendly", "mid-range", "moderate", "low", "high"] # Added budget related keywords
-    for value in budget_synonym_mapping.values():
-        budget_intent_keywords.extend(value)
-        
-    suitable_for_intent_keywords = [item for sublist in suitable_for_synonyms_mapping.values() for item in sublist]
 
-    style_intent_keywords = ["style", "travel", "vacation", "vacation style", "travel style", "like", "want", "adventure", "relax", "cultural", "romantic", "nature", "historical", "foodie", "wellness"]
-    for value in style_synonym_mapping.values():
-        style_intent_keywords.extend(value)
-    #travel_styles = style_synonym_mapping.keys()
+CONTEXT_VOCABULARIES = context_vocabularies()
 
-    doc = nlp(user_input)
-    intent = "recommend_general" # Default
-    entities = {}
-    detected_intents = []
-    entities['style'] = set()
-    entities['suitable_for'] = set()
 
-    #Merge hyphenated words
-    doc = merge_hyphenated_tokens(doc)
+def build_entity_matcher(categories=ENTITY_CATEGORIES):
+    """
+    Compiles all entity synonyms into a single KeywordMatcher.
 
-    # Check for TYPE intent
-    if any(token.lemma_ in type_intent_keywords for token in doc):
-        detected_intents.append("recommend_type")
-        for dtype_standardized, dtype_synonyms in type_synonym_mapping.items(): # Iterate through synonym mapping
-            for synonym in dtype_synonyms: # Check for each synonym
-                if synonym.lower() in user_input.lower():
-                    entities['type'] = dtype_standardized.title() # Use standardized type (Title Case)
-                    break # Exit inner loop after finding a synonym
-            if 'type' in entities: # Exit outer loop if type entity is found
-                break
+    Args:
+        categories (tuple): (category, synonym_mapping, normalize) triples.
 
+    Returns:
+        KeywordMatcher: Matcher whose payloads are (category, rank, standardized_value, synonym).
     """
+    keywords = []
+    for category, synonym_mapping, normalize in categories:
+        for rank, (standardized, synonyms) in enumerate(synonym_mapping.items()):
+            for synonym in synonyms:
+                keywords.append((synonym.lower(), (category, rank, normalize(standardized), synonym.lower())))
+    return KeywordMatcher(keywords)
+
+
+ENTITY_MATCHER = build_entity_matcher()
+
+# Synonyms containing a month or season word ("winter sports"): inside them the word is not a time of year
+SEASONAL_SYNONYMS = frozenset(
+    synonym.lower() for _, synonym_mapping, _ in ENTITY_CATEGORIES for synonyms in synonym_mapping.values()
+    for synonym in synonyms if not MONTH_WORDS.keys().isdisjoint(re.findall(r'[a-z]+', synonym.lower()))
+)
+
+
+def mappings_version(categories=ENTITY_CATEGORIES):
+    """
+    Short fingerprint of everything extract_entities depends on besides the message: the
+    synonym mappings, the intent keywords and the month words. Changes whenever mappings.py,
+    seasons.py (or a keyword set here) is edited, so cached entities of older mappings are
+    never reused.
+    """
+    content = [
+        [category, list(synonym_mapping.items())] for category, synonym_mapping, _ in categories
+    ] + [sorted(keywords) for keywords in (TYPE_INTENT_KEYWORDS, BUDGET_INTENT_KEYWORDS,
+                                           STYLE_INTENT_KEYWORDS, SUITABLE_FOR_INTENT_KEYWORDS,
+                                           AMBIGUOUS_MONTH_WORDS, TIME_PREPOSITIONS)]
+    content.append(sorted(MONTH_WORDS.items()))
+    return hashlib.sha1(repr(content).encode('utf-8')).hexdigest()[:12]
+
+
+MAPPINGS_VERSION = mappings_version()
+
+
+def extract_entities(doc, user_input):
+    """
+    Extracts intents and entities from an already processed message.
+    Does not touch any conversation context.
+
+    Args:
+        doc (spacy.tokens.Doc): The processed message (hyphenated tokens merged).
+        user_input (str): The original message text.
+
+    Returns:
+        dict: {'intents': list, 'type': str or None, 'budget': str or None,
+               'style': list, 'suitable_for': list, 'months': list}
+    """
+    lemmas = {token.lemma_ for token in doc}
+
+    # One pass over the text finds every synonym of every category
+    lowered = user_input.lower()
+    matches = ENTITY_MATCHER.find(lowered)
+    found = {category: {} for category, _, _ in ENTITY_CATEGORIES}
+    for category, rank, value, _ in sorted(matches):
+        found[category][value] = None # Ordered set: several synonyms may give the same value
+    found = {category: list(values) for category, values in found.items()}
+
+    entities = {'intents': [], 'type': None, 'budget': None, 'style': [], 'suitable_for': [], 'months': []}
+
+    # Check for TYPE intent
+    if not lemmas.isdisjoint(TYPE_INTENT_KEYWORDS):
+        entities['intents'].append("recommend_type")
+        if found['type']:
+            entities['type'] = found['type'][0] # First type in mapping order wins
+
     # Check for BUDGET intent
-    print("\n--- DEBUGGING BUDGET INTENT ---") # Debug block start
-    print(f"User Input: '{user_input}'") # Print the user input
-    print(f"Budget Intent Keywords: {budget_intent_keywords}") # Print the keyword list
-
-    budget_intent_found = False # Flag to track if budget intent keywords are found
-
-    for token in doc:
-        token_lemma = token.lemma_
-        print(f"  Token: '{token.text}', Lemma: '{token_lemma}'") # Print each token and its lemma
-        if token_lemma in budget_intent_keywords:
-            budget_intent_found = True
-            print(f"    Lemma '{token_lemma}' FOUND in budget_intent_keywords!") # Indicate a match
-    
-    """
-    #necessary        
-    if any(token.lemma_ in budget_intent_keywords for token in doc): # Use the flag instead of re-evaluating any()
-        detected_intents.append("recommend_budget")
-        print("Budget intent detected (based on keyword found).") # Confirmation message
-        for budget_standardized, budget_synonyms in budget_synonym_mapping.items():
-                for synonym in budget_synonyms:
-                    if synonym.lower() in user_input.lower():
-                        entities['budget'] = budget_standardized.capitalize()
-                        break
-                if 'budget' in entities:
-                    break
+    if not lemmas.isdisjoint(BUDGET_INTENT_KEYWORDS):
+        entities['intents'].append("recommend_budget")
+        logger.debug("Budget intent detected (based on keyword found).")
+        if found['budget']:
+            entities['budget'] = found['budget'][0]
     else:
-        print("No budget intent keywords found in input.") # Indicate no keywords found
+        logger.debug("No budget intent keywords found in input.")
+
+    # Check for STYLE intent
+    if not lemmas.isdisjoint(STYLE_INTENT_KEYWORDS):
+        entities['intents'].append("recommend_style")
+        logger.debug("style intent detected")
+        entities['style'] = found['style']
+
+    # Check for SUITABLE_FOR intent
+    if not lemmas.isdisjoint(SUITABLE_FOR_INTENT_KEYWORDS):
+        entities['intents'].append("recommend_suitable_for")
+        logger.debug("suitable_for intent detected")
+        entities['suitable_for'] = found['suitable_for']
+
+    # Check for SEASON intent: months and seasons are whole words ("may" only as a month) that
+    # are not part of a matched synonym ("winter sports" is a style, not a season)
+    spans = []
+    for synonym in {match[3] for match in matches} & SEASONAL_SYNONYMS:
+        start = lowered.find(synonym)
+        while start >= 0:
+            spans.append((start, start + len(synonym)))
+            start = lowered.find(synonym, start + 1)
+    words = [None if any(start <= token.idx < end for start, end in spans) else token.lower_ for token in doc]
+    months = message_months(words)
+    if months:
+        entities['intents'].append("recommend_season")
+        logger.debug("season intent detected")
+        entities['months'] = months
 
+    return entities
+
+
+def update_context(context, entities):
     """
-    print(f"  any(token.lemma_ in budget_intent_keywords for token in doc) evaluated to: {budget_intent_found}") # Print the final result of the condition
-    print("--- DEBUGGING BUDGET INTENT END ---\n") # Debug block end
+    Merges extracted entities into the conversation context (in place). Months and cultures
+    replace the ones from earlier messages (the trip moved to another time or place); a new
+    country or language replaces both earlier countries and languages, so "somewhere in Italy"
+    followed by "a French-speaking city" does not ask for both. The other lists grow.
+
+    Args:
+        context (dict): The conversation context.
+        entities (dict): Result of extract_entities, optionally with the 'countries',
+            'languages' and 'cultures' found by a Gazetteer.
     """
+    if entities['type']:
+        context['type'] = entities['type']
+    if entities['budget']:
+        context['budget'] = entities['budget']
+    for item in entities['suitable_for']:
+        if item not in context['suitable_for']:
+            context['suitable_for'].append(item)
+    for item in entities['style']:
+        if item not in context['style']:
+            context['style'].append(item)
+    for field in ('months', 'cultures'):
+        if entities.get(field):
+            context[field] = list(entities[field])
+    if entities.get('countries') or entities.get('languages'):
+        for field in ('countries', 'languages'):
+            context[field] = list(entities.get(field) or ())
+    for item in entities['intents']:
+        if item not in context['intents']:
+            context['intents'].append(item)
 
 
-     # Check for STYLE intent (MODIFIED for synonym handling)
-    if any(token.lemma_ in style_intent_keywords for token in doc):
-        detected_intents.append("recommend_style")
-        print("style intent detected")
-        for style_standardized, style_synonyms in style_synonym_mapping.items(): # Iterate through style synonym mapping
-            for synonym in style_synonyms: # Check for each synonym
-                if synonym.lower() in user_input.lower():
-                    entities['style'].add(style_standardized.capitalize()) # Use standardized style (Title Case)
-                    break # Exit inner loop after finding a synonym
+def extract_entities_batch(texts, nlp, batch_size=64):
+    """
+    Parses several messages with nlp.pipe and extracts their entities (see extract_entities).
 
+    Args:
+        texts (list): Normalized message texts.
+        nlp (spacy.Language): The loaded spaCy pipeline.
+        batch_size (int, optional): nlp.pipe batch size.
 
+    Returns:
+        list: One entities dict per text.
+    """
+    results = []
+    for doc, text in zip(nlp.pipe(texts, batch_size=batch_size), texts):
+        if HYPHEN_MERGER_NAME not in nlp.pipe_names:
+            doc = merge_hyphenated_tokens(doc)
+        results.append(extract_entities(doc, text))
+    return results
 
-    if any(token.lemma_ in suitable_for_intent_keywords for token in doc):
-        detected_intents.append("recommend_suitable_for")
-        print("suitable_for intent detected")
-        for suitable_for_standardized, suitable_for_synonyms in suitable_for_synonyms_mapping.items(): # Iterate through style synonym mapping
-            for synonym in suitable_for_synonyms: # Check for each synonym
-                if synonym.lower() in user_input.lower():
-                    entities['suitable_for'].add(suitable_for_standardized.capitalize()) # Use standardized style (Title Case)
-                    break # Exit inner loop after finding a synonym
-            
-    
-    if 'type' in entities:
-        context['type'] = entities["type"]
-    if 'budget' in entities:
-        context['budget'] = entities['budget']
-    if entities['suitable_for']:
-        for item in entities["suitable_for"]:
-            if item not in context["suitable_for"]:
-                context['suitable_for'].append(item)
-        #context['suitable_for'].update(entities["suitable_for"])
-    if entities['style']:
-        for item in entities["style"]:
-            if item not in context["style"]:
-                context['style'].append(item)
-        #context['style'].update(entities["style"])
-    if detected_intents:
-        for item in detected_intents:
-            if item not in context["intents"]:
-                context['intents'].append(item)
-        #context['intents'].update(detected_intents)
-    
-
-    print(f" Intents: {detected_intents}")
-    return detected_intents, context
-
-            
 
+def parse_entities(user_input, nlp, doc=None):
+    """
+    Parses one message (unless doc is given) and extracts its entities, timing each stage.
+
+    Args:
+        user_input (str): The user's input text.
+        nlp (spacy.Language): The loaded spaCy pipeline.
+        doc (spacy.tokens.Doc, optional): user_input already processed by nlp (e.g. via nlp.pipe).
+
+    Returns:
+        dict: Entities as returned by extract_entities.
+    """
+    if doc is None:
+        with stage('nlp'):
+            doc = nlp(user_input)
+
+    #Merge hyphenated words (already done inside nlp() by pipelines from load_nlp)
+    if HYPHEN_MERGER_NAME not in nlp.pipe_names:
+        with stage('merge_hyphenated'):
+            doc = merge_hyphenated_tokens(doc)
+
+    with stage('intent'):
+        return extract_entities(doc, user_input)
+
+
+def freeze_entities(entities):
+    """Copy of an entities dict with tuples instead of lists, safe to share between contexts."""
+    return {key: tuple(value) if isinstance(value, list) else value for key, value in entities.items()}
+
+
+def entities_size(key, entities):
+    """
+    Estimated bytes one entity cache entry holds. The standardized values are shared with the
+    matcher, so only the key and the containers count.
+
+    Args:
+        key (tuple): (mappings version, message text) cache key.
+        entities (dict): Frozen entities (see freeze_entities).
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    size = ENTITY_CACHE_ENTRY_OVERHEAD + sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+    size += sys.getsizeof(entities) + sum(sys.getsizeof(value) for value in entities.values() if isinstance(value, tuple))
+    return size
+
+
+def detect_intent_spacy(user_input, context, nlp, doc=None, entities=None, gazetteer=None):
+    """
+    Detects user intent using spaCy for more advanced NLU and updates the context.
+
+    Args:
+        user_input (str): The user's input text.
+        context (dict): The conversation context, updated in place.
+        nlp (spacy.Language): The loaded spaCy pipeline.
+        doc (spacy.tokens.Doc, optional): user_input already processed by nlp (e.g. via nlp.pipe).
+        entities (dict, optional): Entities already extracted elsewhere (e.g. by the NlpExecutor
+            or taken from the entity cache); the message is then not parsed at all.
+        gazetteer (Gazetteer, optional): Countries, languages and demonyms of the loaded data. Matched
+            here rather than in extract_entities because they depend on the data, not only on
+            the message and the mappings.
+
+    Returns:
+        tuple: (detected_intents, context)
+    """
+    if entities is None:
+        entities = parse_entities(user_input, nlp, doc)
+
+    if gazetteer is not None:
+        with stage('gazetteer'):
+            places = gazetteer.find(user_input)
+        if places['intents']:
+            entities = dict(entities, countries=places['countries'], languages=places['languages'],
+                            cultures=places['cultures'],
+                            intents=list(entities['intents']) + places['intents'])
+
+    update_context(context, entities)
+
+    logger.debug("Intents: %s", entities['intents'])
+    return entities['intents'], context
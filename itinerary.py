@@ -0,0 +1,290 @@
+"""
+Visiting order of a destination's POIs, split into days.
+
+    distance_matrix   - great-circle distances between all points (one broadcast, no Python loop)
+    nearest_neighbour - greedy open path from a start point
+    two_opt           - improves the path by reversing segments; every pass evaluates the
+                        reversals that join near neighbours (as arrays, not loops) and applies
+                        the best non-overlapping improving ones together
+    split_days        - cuts the path into consecutive legs with balanced day lengths
+
+The path is open (it does not return to the start). Its free ends are a zero-distance dummy
+node: 2-opt keeps the first and last node of a path in place, and with the dummy there it
+still chooses which POIs the route starts and ends with.
+"""
+import numpy as np
+
+from spatial_index import EARTH_RADIUS_KM, haversine_km
+
+DEFAULT_TRAVEL_KMH = 30.0 # Mixed walking / public transport / driving within a destination
+DEFAULT_VISIT_MINUTES = 60.0
+DEFAULT_DAY_HOURS = 8.0
+DAY_SPLIT_PRECISION_HOURS = 1 / 60
+TWO_OPT_NEIGHBOURS = 16 # Candidate neighbours per point (all points for smaller sets)
+TWO_OPT_MAX_PASSES = 200
+TWO_OPT_MIN_GAIN_KM = 1e-9
+
+
+def distance_matrix(lat, lng):
+    """
+    Pairwise great-circle distances.
+
+    Args:
+        lat (np.ndarray): Latitudes (degrees).
+        lng (np.ndarray): Longitudes (degrees).
+
+    Returns:
+        np.ndarray: float64[n, n] distances in kilometres.
+    """
+    half_lat = np.radians(np.asarray(lat, dtype=np.float64)) / 2
+    half_lng = np.radians(np.asarray(lng, dtype=np.float64)) / 2
+    # sin(x - y) = sin x cos y - cos x sin y: n sines instead of n * n
+    sin_lat, cos_lat = np.sin(half_lat), np.cos(half_lat)
+    sin_lng, cos_lng = np.sin(half_lng), np.cos(half_lng)
+    # In-place from here on: few n * n temporaries
+    a = np.multiply.outer(sin_lat, cos_lat)
+    a -= np.multiply.outer(cos_lat, sin_lat)
+    np.square(a, out=a) # sin^2(dlat / 2)
+    term = np.multiply.outer(sin_lng, cos_lng)
+    term -= np.multiply.outer(cos_lng, sin_lng)
+    np.square(term, out=term) # sin^2(dlng / 2)
+    cos_full_lat = cos_lat ** 2 - sin_lat ** 2
+    term *= cos_full_lat[:, None]
+    term *= cos_full_lat
+    a += term
+    np.clip(a, 0.0, 1.0, out=a)
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+    return a
+
+
+def nearest_neighbour(distances, start):
+    """
+    Greedy path: from start, always go to the closest unvisited point.
+
+    Args:
+        distances (np.ndarray): Square distance matrix.
+        start (int): First point.
+
+    Returns:
+        np.ndarray: int64 visiting order of all points.
+    """
+    n = len(distances)
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for position in range(n):
+        order[position] = current
+        visited[current] = True
+        if position < n - 1:
+            current = int(np.argmin(np.where(visited, np.inf, distances[current])))
+    return order
+
+
+def path_length(distances, order):
+    """Length of the open path through order."""
+    return float(distances[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def nearest_others(distances, k, exclude=None):
+    """
+    Each point's k nearest other points (unordered), for the 2-opt candidate lists.
+
+    Args:
+        distances (np.ndarray): Square distance matrix.
+        k (int): Neighbours per point.
+        exclude (int, optional): Point that is nobody's neighbour (the dummy end).
+
+    Returns:
+        np.ndarray: int64[n, min(k, n - 1)] point numbers.
+    """
+    masked = distances.copy()
+    np.fill_diagonal(masked, np.inf)
+    others = len(distances) - 1
+    if exclude is not None:
+        masked[:, exclude] = np.inf
+        others -= 1
+    k = max(1, min(k, others))
+    if k >= len(distances) - 1:
+        return np.argsort(masked, axis=1)[:, :k]
+    return np.argpartition(masked, k - 1, axis=1)[:, :k]
+
+
+def two_opt(distances, tour, neighbours, max_passes=TWO_OPT_MAX_PASSES):
+    """
+    2-opt on a path with fixed ends. Reversing tour[i + 1:j + 1] replaces the edges (i, i + 1)
+    and (j, j + 1) with (i, j) and (i + 1, j + 1); tour[0] and tour[-1] never move.
+    Only reversals whose new edges join neighbours are tried (plus every reversal touching the
+    first or last edge, which is where a zero-distance dummy end sits); every pass evaluates
+    all of them at once and applies the best non-overlapping improving ones together.
+
+    Args:
+        distances (np.ndarray): Square distance matrix.
+        tour (np.ndarray): Node order.
+        neighbours (np.ndarray): Candidate neighbours per node (see nearest_others).
+        max_passes (int, optional): Upper bound on the number of passes.
+
+    Returns:
+        tuple: (improved tour, number of passes)
+    """
+    tour = tour.copy()
+    edges = len(tour) - 1
+    if edges < 3:
+        return tour, 0
+    k = neighbours.shape[1]
+    rows = np.arange(edges)
+    position = np.empty(len(distances), dtype=np.int64)
+    for passes in range(1, max_passes + 1):
+        position[tour] = np.arange(len(tour))
+        a, b = tour[:-1], tour[1:]
+        # Candidate j per i: new edge (a_i, a_j) or (b_i, b_j) to a neighbour, or an end edge
+        i = np.concatenate((np.repeat(rows, k), np.repeat(rows, k), np.zeros(edges, dtype=np.int64), rows))
+        j = np.concatenate((position[neighbours[a]].ravel(), position[neighbours[b]].ravel() - 1,
+                            rows, np.full(edges, edges - 1)))
+        i, j = np.minimum(i, j), np.maximum(i, j) # gain(i, j) is symmetric
+        valid = (i >= 0) & (j < edges) & (j >= i + 2) # j = i + 1 changes nothing
+        i, j = i[valid], j[valid]
+        # gain = new edges - old edges of reversing tour[i + 1:j + 1]
+        gain = distances[a[i], a[j]] + distances[b[i], b[j]] - distances[a[i], b[i]] - distances[a[j], b[j]]
+        improving = np.flatnonzero(gain < -TWO_OPT_MIN_GAIN_KM)
+        if len(improving) == 0:
+            return tour, passes
+        # Moves over disjoint edge ranges do not affect each other's gain: apply them together
+        taken = np.zeros(edges, dtype=bool)
+        for move in improving[np.argsort(gain[improving], kind='stable')]:
+            first, last = i[move], j[move]
+            if taken[first:last + 1].any():
+                continue
+            taken[first:last + 1] = True
+            tour[first + 1:last + 1] = tour[first + 1:last + 1][::-1]
+    return tour, max_passes
+
+
+def plan_route(lat, lng, start=None, max_passes=TWO_OPT_MAX_PASSES):
+    """
+    Short open path through all points.
+
+    Args:
+        lat (np.ndarray): Latitudes of the points (degrees).
+        lng (np.ndarray): Longitudes of the points (degrees).
+        start (tuple, optional): (lat, lng) the path starts from (hotel, station); not part of
+            the returned order. None = the path may start anywhere.
+        max_passes (int, optional): Upper bound on 2-opt passes.
+
+    Returns:
+        tuple: (order as int64 positions into lat / lng, leg_km float64[n] with the distance
+            from the previous point (or the start) to each point, stats dict with
+            'nearest_neighbour_km', 'km' and 'passes').
+    """
+    n = len(lat)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), {'nearest_neighbour_km': 0.0, 'km': 0.0, 'passes': 0}
+    if start is not None:
+        lat = np.append(lat, start[0])
+        lng = np.append(lng, start[1])
+    points = len(lat)
+    dummy = points
+    # The dummy node is 0 km from everything: a free end of the path
+    distances = np.zeros((points + 1, points + 1))
+    distances[:points, :points] = distance_matrix(lat, lng)
+    neighbours = nearest_others(distances, TWO_OPT_NEIGHBOURS, exclude=dummy)
+
+    if start is not None:
+        path = nearest_neighbour(distances[:points, :points], n)
+        tour, passes = two_opt(distances, np.append(path, dummy), neighbours, max_passes)
+        order = tour[1:-1]
+        legs_from = np.concatenate(([n], order[:-1]))
+    else:
+        # Without a start point, begin with the most remote point (largest total distance)
+        path = nearest_neighbour(distances[:n, :n], int(np.argmax(distances[:n, :n].sum(axis=1))))
+        tour, passes = two_opt(distances, np.concatenate(([dummy], path, [dummy])), neighbours, max_passes)
+        order = tour[1:-1]
+        legs_from = np.concatenate(([order[0]], order[:-1]))
+    initial_km = path_length(distances, path)
+    leg_km = distances[legs_from, order]
+    return order, leg_km, {'nearest_neighbour_km': initial_km, 'km': float(leg_km.sum()), 'passes': passes}
+
+
+def _day_starts(cost, travel, budget):
+    """Greedy cut: a new day starts when adding the next stop would exceed budget."""
+    starts = [0]
+    used = cost[0]
+    for position in range(1, len(cost)):
+        added = travel[position] + cost[position]
+        if used + added > budget:
+            starts.append(position)
+            used = cost[position]
+        else:
+            used += added
+    return starts
+
+
+def split_days(leg_hours, visit_hours, day_hours=DEFAULT_DAY_HOURS, days=None):
+    """
+    Cuts a visiting order into consecutive days. The travel to the first stop of a day is not
+    counted (it starts from the accommodation).
+
+    Args:
+        leg_hours (np.ndarray): Travel time to each stop from the previous one.
+        visit_hours (np.ndarray): Time spent at each stop.
+        day_hours (float, optional): Time available per day (without days).
+        days (int, optional): Number of days; the stops are then spread so that the longest
+            day is as short as possible, ignoring day_hours.
+
+    Returns:
+        list: Start positions of the days (the first is 0).
+    """
+    n = len(visit_hours)
+    if n == 0:
+        return []
+    leg_hours = np.asarray(leg_hours, dtype=np.float64)
+    visit_hours = np.asarray(visit_hours, dtype=np.float64)
+    if days is None:
+        return _day_starts(visit_hours.tolist(), leg_hours.tolist(), day_hours)
+    if days >= n:
+        return list(range(n))
+    # Binary search on the day length: the greedy cut is optimal for a given length
+    low = float(visit_hours.max())
+    high = float(visit_hours.sum() + leg_hours[1:].sum())
+    visit_hours, leg_hours = visit_hours.tolist(), leg_hours.tolist()
+    while high - low > DAY_SPLIT_PRECISION_HOURS:
+        middle = (low + high) / 2
+        if len(_day_starts(visit_hours, leg_hours, middle)) <= days:
+            high = middle
+        else:
+            low = middle
+    return _day_starts(visit_hours, leg_hours, high)
+
+
+def plan_itinerary(lat, lng, start=None, days=None, day_hours=DEFAULT_DAY_HOURS,
+                   visit_minutes=DEFAULT_VISIT_MINUTES, travel_kmh=DEFAULT_TRAVEL_KMH):
+    """
+    Visiting order of the points split into days.
+
+    Args:
+        lat (np.ndarray): Latitudes of the points (degrees).
+        lng (np.ndarray): Longitudes of the points (degrees).
+        start (tuple, optional): (lat, lng) every day starts from; None = anywhere.
+        days (int, optional): Number of days; None = as many as day_hours needs.
+        day_hours (float, optional): Time available per day.
+        visit_minutes (float, optional): Time spent at each point.
+        travel_kmh (float, optional): Average travel speed between points.
+
+    Returns:
+        dict: {'order': int64 positions, 'leg_km': float64 per stop (the first stop of a day from
+            the start point, or 0 without one), 'day_starts': list of positions into order, plus
+            the plan_route stats}.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    order, leg_km, stats = plan_route(lat, lng, start)
+    leg_hours = leg_km / travel_kmh if travel_kmh > 0 else np.zeros(len(leg_km))
+    visit_hours = np.full(len(order), max(0.0, visit_minutes) / 60)
+    day_starts = split_days(leg_hours, visit_hours, day_hours, days)
+    # Each day starts from the accommodation, not from where the previous day ended
+    # (unknown without a start point: then the first stop of a day has no leg)
+    starts = np.asarray(day_starts[1:], dtype=np.int64)
+    leg_km = leg_km.copy()
+    leg_km[starts] = haversine_km(start[0], start[1], lat[order[starts]], lng[order[starts]]) if start is not None else 0.0
+    return {'order': order, 'leg_km': leg_km, 'day_starts': day_starts, **stats}
@@ -0,0 +1,74 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher (Aho-Corasick automaton).
+
+    The automaton is compiled once from a list of keywords; afterwards every keyword
+    occurring anywhere in a text is found in a single left-to-right pass over the text,
+    no matter how many keywords there are.
+    """
+
+    def __init__(self, keywords):
+        """
+        Compiles the automaton.
+
+        Args:
+            keywords (iterable): (keyword, payload) pairs. Keywords are matched as plain,
+                case-sensitive substrings (just like `keyword in text`). The same keyword
+                may be added several times with different payloads.
+        """
+        self._goto = [{}]    # state -> {char: next_state}
+        self._fail = [0]     # state -> longest proper suffix state
+        self._output = [()]  # state -> payloads of keywords ending in this state
+
+        # --- Build the keyword trie ---
+        for keyword, payload in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (payload,)
+
+        # --- Compute failure links breadth-first (children of the root fail to the root) ---
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Keywords that are suffixes of this one end here too
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        Returns the payloads of all keywords that occur in the text.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            set: Payloads of every keyword found (overlapping matches included).
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
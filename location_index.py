@@ -0,0 +1,148 @@
+import gzip
+import json
+import numbers
+from collections import namedtuple
+
+import pandas as pd
+
+try: # Optional: brotli bodies are only offered when the package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# One immutable entry per destination row; `body` is the ready-to-send /location_details JSON,
+# `encoded` maps a content coding ('gzip', 'br') to the precompressed body, `etag` is the strong
+# validator of the identity body (see location_etag)
+LocationEntry = namedtuple('LocationEntry', ['row', 'location_id', 'name', 'body', 'encoded', 'etag'])
+
+MIN_COMPRESS_BYTES = 256 # Smaller bodies are sent uncompressed
+
+DEFAULT_DESCRIPTION = "Sorry, I couldn't find a description for this location."
+
+
+def describe_location(location_data):
+    """
+    Returns the description text for a location.
+
+    Args:
+        location_data (Mapping): Location fields (pd.Series or dict) with at least 'Description'.
+
+    Returns:
+        str: The description, or a generated fallback when the description is missing.
+    """
+    # Use .get with a default value, robust against missing column
+    description = location_data.get('Description', DEFAULT_DESCRIPTION)
+
+    # Check for actual NaN values using pandas function, or empty/whitespace strings
+    if pd.isna(description) or not isinstance(description, str) or not description.strip():
+        # Fallback if description is missing/invalid in the data
+        name = location_data.get('LocationName', 'This location')
+        country = location_data.get('Country', '')
+        loc_type = location_data.get('Type', '')
+        return f"Information for {name}{f' in {country}' if country else ''}{f' ({loc_type})' if loc_type else ''} is available, but a detailed description is missing."
+    # Return the description directly from the CSV
+    return description.strip()
+
+
+def normalize_location_name(name):
+    """Normalized form of a location name used as lookup key."""
+    return name.strip().lower()
+
+
+def encode_payload(payload):
+    """Serializes a response payload to a compact UTF-8 JSON body."""
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def compress_body(body):
+    """
+    Precompresses a response body with every available content coding.
+
+    Args:
+        body (bytes): The identity body.
+
+    Returns:
+        dict: Content coding -> compressed bytes, only for codings that make the body smaller.
+    """
+    if len(body) < MIN_COMPRESS_BYTES:
+        return {}
+    encoded = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)} # mtime=0: same bytes in every process
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=11)
+    return {coding: data for coding, data in encoded.items() if len(data) < len(body)}
+
+
+def location_etag(version, location_id):
+    """
+    Strong ETag (unquoted) of the identity /location_details/<id> body. Derived from the data
+    version, so it is the same in every process and changes whenever the source files change.
+    Compressed representations append '-<coding>'.
+
+    Args:
+        version (str): The data version (TravelData.version).
+        location_id (int): The LocationID.
+
+    Returns:
+        str: The ETag value.
+    """
+    return f"{version}-{location_id}"
+
+
+class LocationIndex:
+    """
+    Name and ID lookup tables over the destinations, built once at load time.
+    Every entry carries the prebuilt /location_details response body (description + POIs).
+    """
+
+    def __init__(self, destinations_df, poi_table, version=''):
+        """
+        Builds the index.
+
+        Args:
+            destinations_df (pd.DataFrame): The preprocessed destinations (Chatbot.df).
+            poi_table (PoiTable): The POIs of all destinations.
+            version (str, optional): Data version the ETags are derived from.
+        """
+        self.version = version
+        self.by_name = {}
+        self.by_id = {}
+        if destinations_df.empty or 'LocationName' not in destinations_df.columns:
+            return
+
+        for row, location in enumerate(destinations_df.to_dict('records')):
+            location_id = location.get('LocationID')
+            body = encode_payload({
+                "description": describe_location(location),
+                "points_of_interest": poi_table.for_location(location_id),
+            })
+            entry = LocationEntry(
+                row=row,
+                location_id=location_id,
+                name=location['LocationName'],
+                body=body,
+                encoded=compress_body(body),
+                etag=None if location_id is None or pd.isna(location_id) else location_etag(version, int(location_id)),
+            )
+            if isinstance(entry.name, str):
+                # First row wins for duplicate names, like the previous DataFrame lookup
+                self.by_name.setdefault(normalize_location_name(entry.name), entry)
+            if entry.location_id is not None and not pd.isna(entry.location_id):
+                self.by_id.setdefault(int(entry.location_id), entry)
+
+    def find_by_name(self, name):
+        """Returns the LocationEntry for a name (case-insensitive), or None."""
+        if not name or not isinstance(name, str):
+            return None
+        return self.by_name.get(normalize_location_name(name))
+
+    def find_by_id(self, location_id):
+        """
+        Returns the LocationEntry for a LocationID, or None. Only integers (not booleans) and
+        strings of digits are IDs; floats such as 1.9 are not truncated to one.
+        """
+        if isinstance(location_id, numbers.Integral) and not isinstance(location_id, bool):
+            return self.by_id.get(int(location_id))
+        if isinstance(location_id, str) and location_id.strip().isdecimal():
+            return self.by_id.get(int(location_id))
+        return None
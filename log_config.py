@@ -0,0 +1,128 @@
+"""
+Logging setup for the web app.
+
+Modules log through `logging.getLogger(__name__)`. setup_logging() routes all records through a
+QueueHandler: the request thread only formats the record and puts it on an in-memory queue,
+a background QueueListener thread does the (blocking) writes to stdout.
+
+Environment variables:
+    LOG_LEVEL               DEBUG / INFO / WARNING / ... (default INFO)
+    LOG_FORMAT              json (default) or text
+    LOG_DEBUG_SAMPLE_RATE   Fraction (0..1) of sampled DEBUG records (e.g. context dumps) that are kept
+                            (default 1.0 = all)
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+# Attributes every LogRecord has; anything else was passed via `extra` and goes into the JSON
+_STANDARD_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps only a fraction of DEBUG records that are marked with `extra={'sample': True}`
+    (large diagnostic dumps). All other records pass.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and getattr(record, 'sample', False):
+            return self.rate >= 1 or random.random() < self.rate
+        return True
+
+
+def setup_logging(level=None, log_format=None, debug_sample_rate=None, stream=None):
+    """
+    Configures the root logger with a non-blocking queue handler. Safe to call more than once
+    (later calls replace the previous configuration).
+
+    Args:
+        level (str or int, optional): Log level, defaults to LOG_LEVEL or INFO.
+        log_format (str, optional): 'json' or 'text', defaults to LOG_FORMAT or 'json'.
+        debug_sample_rate (float, optional): Defaults to LOG_DEBUG_SAMPLE_RATE or 1.0.
+        stream (file, optional): Output stream, defaults to sys.stdout.
+    """
+    global _listener
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'json')).lower()
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+    stop_logging()
+
+    if log_format == 'text':
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+    else:
+        formatter = JsonFormatter()
+
+    # The queue handler formats in the calling thread; the listener thread only writes the lines
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter('%(message)s'))
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(formatter)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+
+def stop_logging():
+    """Stops the background listener after writing out all queued records."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _pause_for_fork():
+    # Writes out the queue and stops the listener thread, so the child (serve.py workers) does
+    # not inherit queued records or a stream lock held by that thread
+    if _listener is not None:
+        _listener.stop()
+
+
+def _resume_after_fork():
+    if _listener is not None:
+        _listener.start()
+
+
+atexit.register(stop_logging)
+os.register_at_fork(before=_pause_for_fork, after_in_parent=_resume_after_fork, after_in_child=_resume_after_fork)
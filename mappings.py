@@ -98,4 +98,70 @@ suitable_for_synonyms_mapping = {
     'photography': ['photographer'],
     'music': ['classical music lover', 'music lover'],
     'wildlife_animals': ['wildlife enthusiast', 'birdwatcher']
-}
\ No newline at end of file
+}
+#place aliases (gazetteer.py): every country / language of the catalogue with its other names
+country_alias_mapping = {
+    'France': [], 'Italy': [], 'Spain': [], 'Germany': [], 'Greece': [],
+    'England': ['britain', 'great britain', 'united kingdom', 'uk'],
+    'Scotland': ['britain', 'great britain', 'united kingdom', 'uk'],
+    'Wales': ['britain', 'great britain', 'united kingdom', 'uk'],
+    'UK': ['britain', 'great britain', 'united kingdom'],
+    'Croatia': [], 'Portugal': [], 'Belgium': [], 'Switzerland': [], 'Poland': [], 'Austria': [],
+    'Netherlands': ['holland', 'the netherlands'], 'Finland': [], 'Romania': [], 'Slovakia': [], 'Bulgaria': [],
+    'Czech Republic': ['czechia'], 'Ireland': [], 'Slovenia': [], 'Montenegro': [], 'Denmark': [], 'Norway': [],
+    'Turkey': ['türkiye'], 'Sweden': [], 'Hungary': [], 'Lithuania': [], 'Latvia': [], 'Iceland': [], 'Estonia': [],
+    'Serbia': [], 'Cyprus': [], 'Malta': [], 'Albania': [], 'Luxembourg': [],
+}
+
+#demonyms: a softer preference than the country itself ("spanish food" is not "in spain")
+country_demonym_mapping = {
+    'France': ['french'],
+    'Italy': ['italian'],
+    'Spain': ['spanish'],
+    'Germany': ['german'],
+    'Greece': ['greek'],
+    'England': ['english', 'british'],
+    'Scotland': ['scottish', 'scots', 'british'],
+    'Wales': ['welsh', 'british'],
+    'UK': ['british'],
+    'Croatia': ['croatian'],
+    'Portugal': ['portuguese'],
+    'Belgium': ['belgian'],
+    'Switzerland': ['swiss'],
+    'Poland': ['polish'],
+    'Austria': ['austrian'],
+    'Netherlands': ['dutch'],
+    'Finland': ['finnish'],
+    'Romania': ['romanian'],
+    'Slovakia': ['slovak', 'slovakian'],
+    'Bulgaria': ['bulgarian'],
+    'Czech Republic': ['czech'],
+    'Ireland': ['irish'],
+    'Slovenia': ['slovenian', 'slovene'],
+    'Montenegro': ['montenegrin'],
+    'Denmark': ['danish'],
+    'Norway': ['norwegian'],
+    'Turkey': ['turkish'],
+    'Sweden': ['swedish'],
+    'Hungary': ['hungarian'],
+    'Lithuania': ['lithuanian'],
+    'Latvia': ['latvian'],
+    'Iceland': ['icelandic'],
+    'Estonia': ['estonian'],
+    'Serbia': ['serbian'],
+    'Cyprus': ['cypriot'],
+    'Malta': ['maltese'],
+    'Albania': ['albanian'],
+    'Luxembourg': ['luxembourger'],
+}
+
+language_alias_mapping = {
+    'French': [], 'Italian': [], 'German': [], 'English': [], 'Greek': [], 'Spanish': ['castilian'],
+    'Portuguese': [], 'Croatian': [], 'Polish': [], 'Romanian': [], 'Dutch': ['flemish'], 'Slovak': [],
+    'Bulgarian': [], 'Swedish': [], 'Irish': ['gaeilge', 'irish gaelic'], 'Czech': [], 'Catalan': ['català'],
+    'Slovenian': ['slovene'], 'Romansh': ['romansch', 'rumantsch'], 'Turkish': [], 'Scottish Gaelic': ['gaelic', 'gàidhlig'],
+    'Norwegian': [], 'Montenegrin': [], 'Finnish': [], 'Icelandic': [], 'Danish': [], 'Hungarian': [],
+    'Lithuanian': [], 'Serbian': [], 'Estonian': [], 'Valencian': [], 'Latvian': [], 'Scots': [], 'Maltese': [],
+    'Corsican': [], 'Faroese': [], 'Basque': ['euskara'], 'Albanian': [], 'Luxembourgish': [], 'Sami': ['sámi', 'saami'],
+    'Welsh': ['cymraeg'], 'Frisian': [],
+}
@@ -0,0 +1,237 @@
+"""
+Lightweight in-process metrics: counters, histograms and scrape-time gauges, rendered in the
+Prometheus text exposition format (GET /metrics).
+
+Stage timings in the chat path use `with stage('name'):`, which costs two perf_counter()
+calls and one locked bucket update. Metrics are per process; every serve.py worker reports
+its own values.
+"""
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Latency buckets in seconds (0.1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _format_labels(self.label_names, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                yield (self.name + '_bucket',
+                       _format_labels(self.label_names, label_values, [('le', _format_value(bound))]),
+                       cumulative)
+            labels = _format_labels(self.label_names, label_values)
+            yield self.name + '_sum', labels, series[-1]
+            yield self.name + '_count', labels, cumulative
+
+
+class Registry:
+    """Holds the metrics and the collectors that compute gauges at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def register_collector(self, collector):
+        """
+        Adds a scrape-time collector.
+
+        Args:
+            collector (callable): Returns (name, type, help, [(labels_dict, value), ...]) tuples.
+        """
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        for collector in self._collectors:
+            for name, kind, help_text, values in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'chatbot_stage_seconds', "Time spent per request processing stage.", ('stage',)
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    'http_requests_total', "HTTP requests by route, method and status.", ('route', 'method', 'status')
+)
+REQUEST_ERRORS_TOTAL = REGISTRY.counter(
+    'http_request_errors_total', "Requests that ended in an unhandled exception or a 5xx status.", ('route',)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', "HTTP request latency by route.", ('route',)
+)
+NLP_OFFLOAD_TOTAL = REGISTRY.counter(
+    'nlp_executor_messages_total', "Messages sent to the NLP worker processes, by outcome.", ('outcome',)
+)
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block into chatbot_stage_seconds{stage=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
+
+
+class RequestProfiler:
+    """
+    Profiles sampled requests and writes one file per request:
+        cprofile    - <dir>/<time>-<route>-<pid>.prof (open with pstats / snakeviz)
+        tracemalloc - <dir>/<time>-<route>-<pid>.tracemalloc (tracemalloc.Snapshot.load)
+    Only one request is profiled at a time per process.
+    """
+
+    MODES = ('cprofile', 'tracemalloc')
+
+    def __init__(self, mode, sample_rate, directory):
+        """
+        Args:
+            mode (str): One of MODES.
+            sample_rate (float): Fraction of requests to profile (0 = only forced requests).
+            directory (str): Output directory (created on first dump).
+        """
+        mode = mode.strip().lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Choose one of: {', '.join(self.MODES)}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._busy = threading.Lock()
+        self.dumps = 0
+
+    def should_profile(self, forced=False):
+        """True if this request should be profiled (sampled, or forced by the caller)."""
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self):
+        """Starts profiling the current request; returns a token for stop(), or None if busy."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        tracemalloc.start(25)
+        return 'tracemalloc'
+
+    def stop(self, token, label):
+        """Stops profiling and writes the result file; returns its path."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            safe_label = ''.join(char if char.isalnum() else '_' for char in label).strip('_') or 'request'
+            path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{os.getpid()}-{self.dumps}")
+            if self.mode == 'cprofile':
+                token.disable()
+                path += '.prof'
+                token.dump_stats(path)
+            else:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                path += '.tracemalloc'
+                snapshot.dump(path)
+            self.dumps += 1
+            return path
+        finally:
+            self._busy.release()
@@ -0,0 +1,281 @@
+"""
+Offloads spaCy parsing from the request threads to a pool of worker processes.
+
+Request threads put their message on a bounded queue and wait for a future. One dispatcher
+thread sends the waiting messages to the worker processes in micro-batches: whenever a worker
+is free, everything queued meanwhile (up to max_batch messages, optionally waiting up to
+batch_window_ms for more) becomes one batch.
+Every worker loads the pipeline once, parses the batch with nlp.pipe and returns only the small
+entities dicts (see intent_detection.extract_entities), so no Doc objects cross the process
+boundary and no request thread holds the GIL while parsing.
+
+The pool starts on first use in the process that uses it (or with start()). Its processes are
+forked, so they inherit the pipeline already loaded by the Chatbot instead of loading their
+own; spawned processes (platforms without fork) load the profile. A process forked from one
+with a running pool (serve.py workers) starts its own, because threads and pipes do not
+survive a fork.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import NLP_OFFLOAD_TOTAL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_WINDOW_MS = 0.0 # Extra wait for more messages; batches also grow while all workers are busy
+DEFAULT_MAX_BATCH = 32
+DEFAULT_QUEUE_DEPTH = 256
+DEFAULT_TIMEOUT_MS = 2000.0 # Longest wait for a worker before the caller parses the message itself
+BATCHES_IN_FLIGHT_PER_PROCESS = 1 # Batches handed to each worker process; more messages wait and batch up
+
+
+class NlpQueueFull(Exception):
+    """Raised when the message queue is full (the caller should parse the message itself)."""
+
+
+class NlpTimeout(Exception):
+    """Raised when no worker returned the entities in time (the caller should parse the message itself)."""
+
+
+# --- Worker process side ---
+_worker_nlp = None
+
+
+def _init_worker(profile, nlp):
+    global _worker_nlp
+    if nlp is None:
+        from nlp_pipeline import load_nlp
+        nlp = load_nlp(profile)
+    _worker_nlp = nlp
+
+
+def _extract_batch(texts):
+    from intent_detection import extract_entities_batch
+    return extract_entities_batch(texts, _worker_nlp, batch_size=len(texts))
+
+
+def _warm_up():
+    return os.getpid()
+
+
+# --- Request side ---
+class NlpExecutor:
+    """Micro-batching front end of a process pool with one warm spaCy pipeline per process."""
+
+    def __init__(self, profile, processes, batch_window_ms=DEFAULT_BATCH_WINDOW_MS,
+                 max_batch=DEFAULT_MAX_BATCH, queue_depth=DEFAULT_QUEUE_DEPTH, timeout_ms=DEFAULT_TIMEOUT_MS, nlp=None):
+        """
+        Args:
+            profile (str): spaCy pipeline profile of the workers (see nlp_pipeline).
+            processes (int): Number of worker processes.
+            batch_window_ms (float, optional): How long a batch waits for more messages once a worker is free.
+            max_batch (int, optional): Messages per batch.
+            queue_depth (int, optional): Messages that may wait for a worker; beyond it extract()
+                raises NlpQueueFull.
+            timeout_ms (float, optional): How long extract() waits for a worker before raising
+                NlpTimeout; 0 waits forever.
+            nlp (spacy.Language, optional): Loaded pipeline of that profile, inherited by forked workers.
+        """
+        self.profile = profile
+        self.nlp = nlp
+        self.processes = max(1, int(processes))
+        self.batch_window = max(0.0, batch_window_ms) / 1000
+        self.max_batch = max(1, int(max_batch))
+        self.queue_depth = max(1, int(queue_depth))
+        self.timeout = timeout_ms / 1000 if timeout_ms and timeout_ms > 0 else None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._queue = None
+        self._dispatcher = None
+
+    def start(self, wait=False):
+        """
+        Starts the worker processes and the dispatcher thread (no-op if already running in this
+        process).
+
+        Args:
+            wait (bool, optional): Block until every worker has loaded its pipeline.
+        """
+        with self._lock:
+            warm_up = self._start_locked()
+        if wait and warm_up:
+            start = time.perf_counter()
+            for future in warm_up:
+                future.result()
+            logger.info("NLP workers ready in %.2fs.", time.perf_counter() - start)
+
+    def _start_locked(self):
+        """Starts the pool unless it runs in this process (caller holds _lock); returns the warm-up futures."""
+        if self._pid == os.getpid():
+            return []
+        # Anything inherited through fork belongs to the parent process
+        fork = 'fork' in multiprocessing.get_all_start_methods()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=multiprocessing.get_context('fork' if fork else 'spawn'),
+            initializer=_init_worker, initargs=(self.profile, self.nlp if fork else None)
+        )
+        # Fork every worker now, before the dispatcher thread exists
+        warm_up = [self._pool.submit(_warm_up) for _ in range(self.processes)]
+        self._queue = queue.Queue(self.queue_depth)
+        in_flight = threading.BoundedSemaphore(self.processes * BATCHES_IN_FLIGHT_PER_PROCESS)
+        self._dispatcher = threading.Thread(target=self._dispatch, args=(self._queue, self._pool, in_flight),
+                                            name="nlp-dispatcher", daemon=True)
+        self._dispatcher.start()
+        self._pid = os.getpid()
+        logger.info("NLP executor started: %d processes (profile '%s'), batches of up to %d within %.1f ms.",
+                    self.processes, self.profile, self.max_batch, self.batch_window * 1000)
+        return warm_up
+
+    def stop(self):
+        """Stops the dispatcher and the worker processes of this process."""
+        with self._lock:
+            running = self._pid == os.getpid()
+            pool, messages, dispatcher = self._pool, self._queue, self._dispatcher
+            self._pid = self._pool = self._queue = self._dispatcher = None
+        if not running:
+            return
+        messages.put(None)
+        dispatcher.join()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    def extract(self, text, timeout=None):
+        """
+        Extracts the entities of one normalized message in a worker process.
+
+        Args:
+            text (str): The message (stripped, lowercased).
+            timeout (float, optional): Seconds to wait for the result; defaults to timeout_ms.
+
+        Returns:
+            dict: Entities as returned by intent_detection.extract_entities.
+
+        Raises:
+            NlpQueueFull: Too many messages are already waiting.
+            NlpTimeout: No worker returned the entities in time.
+        """
+        future = Future()
+        # Queued under the lock, so a concurrent stop() either sees the message (and fails it)
+        # or happens before and this call starts a new pool
+        with self._lock:
+            self._start_locked()
+            try:
+                self._queue.put_nowait((text, future))
+                full = False
+            except queue.Full:
+                full = True
+        if full:
+            NLP_OFFLOAD_TOTAL.inc('queue_full')
+            raise NlpQueueFull(f"{self.queue_depth} messages are already waiting for an NLP worker")
+        try:
+            result = future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel() # Not parsed at all if it is still queued
+            NLP_OFFLOAD_TOTAL.inc('timeout')
+            raise NlpTimeout(f"no NLP worker answered within {self.timeout if timeout is None else timeout:.3f}s") from None
+        except Exception:
+            NLP_OFFLOAD_TOTAL.inc('error')
+            raise
+        NLP_OFFLOAD_TOTAL.inc('offloaded')
+        return result
+
+    def stats(self):
+        """Configuration and current queue length."""
+        running = self._pid == os.getpid()
+        messages = self._queue
+        return {
+            'running': running,
+            'processes': self.processes,
+            'profile': self.profile,
+            'batch_window_ms': self.batch_window * 1000,
+            'max_batch': self.max_batch,
+            'queue_depth': self.queue_depth,
+            'queued': messages.qsize() if running and messages is not None else 0,
+        }
+
+    def _dispatch(self, messages, pool, in_flight):
+        """
+        Dispatcher thread: waits for a free worker slot, then sends everything queued meanwhile
+        (up to max_batch, plus what arrives within the batch window) as one batch. Under load
+        the batches grow by themselves; an idle pool gets single messages without delay.
+        Messages still queued when it stops are failed, so no caller waits forever.
+        """
+        stopping = False
+        while not stopping:
+            item = messages.get()
+            if item is None:
+                break
+            in_flight.acquire() # Back-pressure: wait for a worker instead of queueing inside the pool
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = messages.get(timeout=remaining) if remaining > 0 else messages.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Callers that timed out meanwhile cancelled their future: skip those messages
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                in_flight.release()
+                continue
+            futures = [future for _, future in batch]
+            try:
+                pool_future = pool.submit(_extract_batch, [text for text, _ in batch])
+            except (BrokenProcessPool, RuntimeError) as e:
+                in_flight.release()
+                self._fail(pool, futures, e)
+                if self._pool is not pool:
+                    break # Retired (stopped or broken): fail the rest below
+                continue
+            pool_future.add_done_callback(lambda done, futures=futures: self._resolve(pool, done, futures, in_flight))
+
+        stopped = RuntimeError("NLP executor stopped")
+        while True:
+            try:
+                item = messages.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(stopped)
+
+    def _resolve(self, pool, done, futures, in_flight):
+        in_flight.release()
+        if done.cancelled(): # Pending batch cancelled by pool.shutdown(cancel_futures=True)
+            self._fail(pool, futures, RuntimeError("NLP executor stopped before the batch ran"))
+            return
+        error = done.exception()
+        if error is not None:
+            self._fail(pool, futures, error)
+            return
+        for future, entities in zip(futures, done.result()):
+            future.set_result(entities)
+
+    def _fail(self, pool, futures, error):
+        logger.error("NLP worker batch failed: %s", error)
+        for future in futures:
+            future.set_exception(error)
+        if not isinstance(error, BrokenProcessPool):
+            return
+        # A worker died and the pool is unusable: retire it, the next extract() starts a new one
+        with self._lock:
+            if self._pool is not pool:
+                return
+            messages = self._queue
+            self._pid = self._pool = self._queue = self._dispatcher = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            messages.put_nowait(None) # Stops the old dispatcher once it has failed what was queued
+        except queue.Full:
+            pass
@@ -0,0 +1,80 @@
+import os
+import spacy
+from spacy.language import Language
+
+from spacy_merger import HYPHEN_MERGER_NAME
+
+
+# --- Pipeline profiles ---
+# Intent detection only needs tokens, lemmas and the IS_ALPHA / IS_PUNCT flags, so the default
+# profile does not load the tagger, parser, NER or the word vectors of en_core_web_lg.
+#   lookup     - blank English tokenizer + lookup lemmatizer (needs spacy-lookups-data, no model download)
+#   lemmatizer - en_core_web_lg without parser/NER (same lemmas as 'full', vectors still loaded)
+#   full       - en_core_web_lg with every component (opt-in)
+#   stub       - blank English tokenizer, lemma = lowercased text (no extra data at all; for
+#                benchmarks / CI machines, intent detection misses inflected forms)
+# Every profile ends with the hyphen merger component, so docs come out of nlp()/nlp.pipe
+# with "budget-friendly" etc. already merged into one token.
+NLP_PROFILES = ('lookup', 'lemmatizer', 'full', 'stub')
+DEFAULT_NLP_PROFILE = 'lookup'
+FULL_MODEL_NAME = "en_core_web_lg"
+
+
+@Language.component("lowercase_lemmas")
+def lowercase_lemmas(doc):
+    """Stub lemmatizer for the 'stub' profile: every lemma is the lowercased token text."""
+    for token in doc:
+        token.lemma_ = token.lower_
+    return doc
+
+
+def get_nlp_profile(profile=None):
+    """
+    Resolves the pipeline profile to use.
+
+    Args:
+        profile (str, optional): Explicit profile name. Falls back to the NLP_PROFILE
+            environment variable and then to DEFAULT_NLP_PROFILE.
+
+    Returns:
+        str: A valid profile name.
+    """
+    profile = (profile or os.environ.get('NLP_PROFILE') or DEFAULT_NLP_PROFILE).strip().lower()
+    if profile not in NLP_PROFILES:
+        raise ValueError(f"Unknown NLP profile '{profile}'. Choose one of: {', '.join(NLP_PROFILES)}")
+    return profile
+
+
+def load_nlp(profile=None):
+    """
+    Loads the spaCy pipeline for the given profile.
+
+    Args:
+        profile (str, optional): One of NLP_PROFILES (see get_nlp_profile).
+
+    Returns:
+        spacy.Language: The loaded pipeline, with the hyphen merger as last component.
+
+    Raises:
+        OSError: If the model or lookup tables needed by the profile are not installed.
+    """
+    profile = get_nlp_profile(profile)
+
+    if profile == 'lookup':
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lemmatizer", config={"mode": "lookup"})
+        try:
+            nlp.initialize() # Loads the lookup tables from spacy-lookups-data
+        except ValueError as e:
+            raise OSError(f"Lookup lemmatizer tables not available ({e}). Run: pip install spacy-lookups-data") from e
+    elif profile == 'stub':
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lowercase_lemmas")
+    elif profile == 'lemmatizer':
+        nlp = spacy.load(FULL_MODEL_NAME, exclude=["parser", "ner", "senter"])
+    else:
+        nlp = spacy.load(FULL_MODEL_NAME)
+
+    # Last, like the former merge after nlp(): lemmas are assigned to the unmerged tokens
+    nlp.add_pipe(HYPHEN_MERGER_NAME, last=True)
+    return nlp
@@ -0,0 +1,236 @@
+"""
+Scored top-k ranking of destinations.
+
+Every precomputed filter of the DestinationIndex (each type, budget, style and suitable_for
+value) is one row of a feature matrix (features x destinations, uint8); the requested months
+are matched against the per-destination month masks with one bitwise AND. Country and language
+constraints are hard: only the rows of their posting lists are scored. A culture (a country
+named by its demonym, "spanish food") is a preference like the others, matched against the
+country's posting list. A context becomes a
+weight per active feature; the score of every destination is one matrix-vector product over
+the active feature rows, and the best k come from np.argpartition. Destinations that match
+only some preferences are still ranked, so an over-constrained context returns the closest
+matches instead of nothing.
+"""
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from seasons import mask_of_names, month_names
+
+# Weight of one matched preference per context field
+FEATURE_WEIGHTS = {
+    'type': 3.0,
+    'budget': 2.0,
+    'style': 1.0,
+    'suitable_for': 1.0,
+    'season': 2.0,
+    'culture': 2.0,
+}
+
+# Context field -> (DestinationIndex text column, intent) for the list fields
+_LIST_FIELDS = {
+    'style': ('Travel Style', 'recommend_style'),
+    'suitable_for': ('Suitable For', 'recommend_suitable_for'),
+}
+
+# Destinations kept for the random draw among ties at the cutoff (a uniform sample when more
+# are tied, e.g. every destination for a context without preferences)
+MAX_TIED_ROWS = 4096
+
+# The deterministic part of a ranking (cacheable): destinations above the top-k cutoff score,
+# best first, and the destinations tied at the cutoff (the remaining places are drawn from them)
+Shortlist = namedtuple('Shortlist', ['best_rows', 'best_scores', 'tied_rows', 'cutoff', 'max_score'])
+
+
+def _normalize(field, value):
+    return value if field in ('budget', 'culture') else value.lower()
+
+
+def context_features(context):
+    """
+    The preferences of a context that take part in ranking: the fields of its active
+    recommendation intents.
+
+    Args:
+        context (dict): The conversation context.
+
+    Returns:
+        list: (field, value) pairs, values normalized like the DestinationIndex keys; the value
+            of 'season' is the 12-bit mask of the requested months, the values of 'culture'
+            are country names.
+    """
+    intents = context['intents']
+    features = []
+    if "recommend_type" in intents and context.get('type'):
+        features.append(('type', _normalize('type', context['type'])))
+    if "recommend_budget" in intents and context.get('budget'):
+        features.append(('budget', context['budget']))
+    for field, (_, intent) in _LIST_FIELDS.items():
+        if intent in intents:
+            features += [(field, value) for value in dict.fromkeys(_normalize(field, value) for value in context[field])]
+    if "recommend_season" in intents:
+        months = mask_of_names(context.get('months') or ())
+        if months:
+            features.append(('season', months))
+    if "recommend_culture" in intents:
+        features += [('culture', value) for value in sorted(set(context.get('cultures') or ()))]
+    return features
+
+
+def context_places(context):
+    """
+    The country and language constraints of a context (for its active intents).
+
+    Args:
+        context (dict): The conversation context.
+
+    Returns:
+        tuple: (countries, languages), sorted tuples of names; empty without a constraint.
+    """
+    intents = context['intents']
+    countries = tuple(sorted(set(context.get('countries') or ()))) if "recommend_country" in intents else ()
+    languages = tuple(sorted(set(context.get('languages') or ()))) if "recommend_language" in intents else ()
+    return countries, languages
+
+
+def feature_label(field, value):
+    """Readable feature, e.g. "style: romantic" or "season: June, July"."""
+    if field == 'season':
+        value = ', '.join(month_names(value))
+    return f"{field}: {value}"
+
+
+class DestinationRanker:
+    """Feature matrix over the destinations of a DestinationIndex, built once at load time."""
+
+    def __init__(self, destination_index):
+        """
+        Builds the feature matrix.
+
+        Args:
+            destination_index (DestinationIndex): Precomputed row masks over the destinations.
+        """
+        self.destination_index = destination_index
+        self.size = destination_index.size
+        self.feature_names = []
+        masks = []
+        for field, value, mask in destination_index.feature_masks():
+            self.feature_names.append((field, _normalize(field, value)))
+            masks.append(mask)
+        self.feature_ids = {name: position for position, name in enumerate(self.feature_names)}
+        # One contiguous row per feature: gathering the active features copies whole rows
+        self.features = np.stack(masks).view(np.uint8) if masks else np.zeros((0, self.size), dtype=np.uint8)
+
+    def feature_vector(self, field, value):
+        """uint8 row of one feature; values without a precomputed row are matched on demand."""
+        position = self.feature_ids.get((field, value))
+        if position is not None:
+            return self.features[position]
+        index = self.destination_index
+        if field == 'season':
+            mask = index.month_mask(value)
+        elif field == 'type':
+            mask = index.type_mask(value)
+        elif field == 'budget':
+            mask = index.budget_mask(value)
+        elif field == 'culture':
+            mask = index.country_mask(value)
+        else:
+            mask = index.contains_mask(_LIST_FIELDS[field][0], value)
+        return mask.view(np.uint8)
+
+    def scores(self, features, rows=None):
+        """
+        Scores the destinations: sum of the weights of the matched features.
+
+        Args:
+            features (list): (field, value) pairs from context_features.
+            rows (np.ndarray, optional): Only score these rows (e.g. a place posting list).
+
+        Returns:
+            np.ndarray: float32 score per destination row (per entry of rows, if given).
+        """
+        size = self.size if rows is None else len(rows)
+        if not features:
+            return np.zeros(size, dtype=np.float32)
+        weights = np.array([FEATURE_WEIGHTS[field] for field, _ in features], dtype=np.float32)
+        vectors = [self.feature_vector(field, value) for field, value in features]
+        if rows is not None:
+            vectors = [vector[rows] for vector in vectors]
+        return weights @ np.stack(vectors).astype(np.float32)
+
+    def shortlist(self, features, k, rows=None):
+        """
+        Scores the destinations and splits off the top k.
+
+        Args:
+            features (list): (field, value) pairs from context_features.
+            k (int): Number of recommendations.
+            rows (np.ndarray, optional): Sorted candidate rows (see DestinationIndex.place_rows);
+                all destinations by default.
+
+        Returns:
+            Shortlist: Read-only arrays, safe to share through a cache.
+        """
+        max_score = float(sum(FEATURE_WEIGHTS[field] for field, _ in features))
+        size = self.size if rows is None else len(rows)
+        if not size or k <= 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return Shortlist(empty, np.zeros(0, dtype=np.float32), empty, 0.0, max_score)
+        scores = self.scores(features, rows)
+        top = scores.max()
+        if k >= size:
+            cutoff = scores.min()
+        elif np.count_nonzero(scores == top) >= k:
+            cutoff = top # Common for loose contexts: enough destinations share the best score
+        else:
+            cutoff = scores[np.argpartition(scores, size - k)[size - k]] # k-th highest score
+        best = np.flatnonzero(scores > cutoff) if cutoff < top else np.zeros(0, dtype=np.int64)
+        best = best[np.argsort(-scores[best], kind='stable')]
+        tied = np.flatnonzero(scores == cutoff)
+        if len(tied) > MAX_TIED_ROWS:
+            tied = np.sort(tied[random.sample(range(len(tied)), MAX_TIED_ROWS)])
+        best_rows, tied_rows = (best, tied) if rows is None else (rows[best].astype(np.int64), rows[tied].astype(np.int64))
+        shortlist = Shortlist(best_rows, scores[best], tied_rows, float(cutoff), max_score)
+        for array in shortlist[:3]:
+            array.setflags(write=False)
+        return shortlist
+
+    def pick(self, shortlist, k):
+        """
+        Final top k: the destinations above the cutoff, then a random draw from the ties.
+
+        Returns:
+            tuple: (rows, scores) arrays, best first.
+        """
+        needed = k - len(shortlist.best_rows)
+        tied = shortlist.tied_rows
+        if needed <= 0:
+            tied = tied[:0]
+        elif len(tied) > needed:
+            tied = tied[random.sample(range(len(tied)), needed)]
+        else:
+            tied = np.random.permutation(tied)
+        rows = np.concatenate([shortlist.best_rows[:k], tied])
+        scores = np.concatenate([shortlist.best_scores[:k], np.full(len(tied), shortlist.cutoff, dtype=np.float32)])
+        return rows, scores
+
+    def recommendations(self, features, rows, scores, max_score):
+        """
+        Recommendation dicts for ranked rows, with the matched features that explain each one.
+
+        Returns:
+            list: Copies of the DestinationIndex records plus 'score', 'matched' (e.g.
+                ["type: city", "style: romantic"]) and 'full_match' (all preferences matched).
+        """
+        vectors = [self.feature_vector(field, value) for field, value in features]
+        results = []
+        for row, score in zip(rows, scores):
+            recommendation = dict(self.destination_index.records[row])
+            recommendation['score'] = round(float(score), 3)
+            recommendation['matched'] = [feature_label(field, value) for (field, value), vector in zip(features, vectors) if vector[row]]
+            recommendation['full_match'] = bool(score >= max_score)
+            results.append(recommendation)
+        return results
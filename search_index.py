@@ -0,0 +1,304 @@
+"""
+Full-text search over destinations and POIs (BM25).
+
+Every destination (name, country, type, travel style, description, main attractions) and every
+POI (name, type, description) is one document; names count twice. The inverted index is a few
+flat arrays:
+
+    terms         - sorted, fixed-width byte strings; a term's ID is its position, so all
+                    terms with a common prefix are one contiguous ID range (np.searchsorted)
+    term_offsets  - postings of term t are postings_docs / postings_tf[term_offsets[t]:term_offsets[t + 1]]
+    postings_docs - document IDs (destination rows first, then POI rows), ascending per term
+    postings_tf   - term frequency in the document
+
+A query touches only the postings of its terms; matching documents are scored in bulk with
+NumPy and the best k come from np.argpartition. The arrays are stored in the data snapshot
+(python dataset.py build) and memory-mapped at startup; without a snapshot the index is built
+while the data is loaded.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from spacy.lang.en.stop_words import STOP_WORDS
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+NAME_WEIGHT = 2 # Name tokens are counted this many times
+MAX_TERM_BYTES = 24 # Longer terms are truncated (fixed-width term array)
+MIN_PREFIX_LENGTH = 2 # Shorter last words are only matched exactly
+MAX_PREFIX_TERMS = 64 # Most frequent completions used for a prefix
+MAX_PREFIX_POSTINGS = 1000000 # Postings read for the completions of a prefix (at least one completion)
+PREFIX_WEIGHT = 0.3 # Score factor of a completion, so exact matches of the word rank first
+# Queries touching at least 1/ratio postings per document accumulate into a dense array
+DENSE_ACCUMULATION_RATIO = 8
+
+DOCUMENT_KINDS = ('destination', 'poi')
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Search terms of a text: accents removed, lowercased, split on non-alphanumerics, without
+    stop words and single characters.
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    return [token[:MAX_TERM_BYTES] for token in TOKEN_PATTERN.findall(text) if len(token) > 1 and token not in STOP_WORDS]
+
+
+def _document_terms(name, *texts):
+    terms = tokenize(name) * NAME_WEIGHT
+    for text in texts:
+        terms += tokenize(text)
+    return terms
+
+
+def _destination_documents(locations_df):
+    columns = ['LocationName', 'Country', 'Type', 'Travel Style', 'Description', 'Keywords/Main Attractions']
+    present = [column for column in columns if column in locations_df.columns]
+    for location in locations_df[present].itertuples(index=False, name=None):
+        values = dict(zip(present, location))
+        yield _document_terms(values.get('LocationName'), *[values.get(column) for column in columns[1:]])
+
+
+def _poi_documents(poi_table):
+    for row in range(len(poi_table)):
+        description = poi_table.description[row] if poi_table.description is not None else None
+        yield _document_terms(poi_table.name[row], poi_table.type[row], description)
+
+
+def _category_codes(categories, names):
+    """Codes of the given names in a tuple of categories (case-insensitive); None = no filter."""
+    if not names:
+        return None
+    lookup = {category.lower(): code for code, category in enumerate(categories)}
+    return np.array([lookup[name.lower()] for name in names if name.lower() in lookup], dtype=np.int32)
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking, prefix matching and POI type / country filters."""
+
+    def __init__(self, arrays, countries, poi_types, n_destinations):
+        """
+        Args:
+            arrays (dict): terms, term_offsets, postings_docs, postings_tf, doc_lengths,
+                doc_country and doc_poi_type arrays (see build / arrays).
+            countries (tuple): Country names for the doc_country codes.
+            poi_types (tuple): POI type names for the doc_poi_type codes.
+            n_destinations (int): Documents below this ID are destination rows, the rest POI rows.
+        """
+        self.terms = arrays['terms']
+        self.term_offsets = arrays['term_offsets']
+        self.postings_docs = arrays['postings_docs']
+        self.postings_tf = arrays['postings_tf']
+        self.doc_lengths = arrays['doc_lengths']
+        self.doc_country = arrays['doc_country']
+        self.doc_poi_type = arrays['doc_poi_type']
+        self.countries = tuple(countries)
+        self.poi_types = tuple(poi_types)
+        self.n_destinations = int(n_destinations)
+
+        n_docs = len(self.doc_lengths)
+        document_frequency = np.diff(self.term_offsets).astype(np.float64)
+        self.idf = np.log1p((n_docs - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(np.mean(self.doc_lengths)) if n_docs else 1.0
+        # Length part of the BM25 denominator, per document
+        self.doc_norm = (BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(self.doc_lengths, dtype=np.float32) / max(average_length, 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, locations_df, poi_table):
+        """
+        Indexes all destination rows and POI rows.
+
+        Args:
+            locations_df (pd.DataFrame): Destinations (document IDs = row numbers).
+            poi_table (PoiTable): POIs (document IDs = n_destinations + row).
+
+        Returns:
+            SearchIndex: The index.
+        """
+        n_destinations = len(locations_df)
+        n_docs = n_destinations + len(poi_table)
+        term_ids = {}
+        docs, term_list, tfs = [], [], []
+        doc_lengths = np.zeros(n_docs, dtype=np.int32)
+        documents = _destination_documents(locations_df) if n_destinations else iter(())
+        for doc, terms in enumerate(documents):
+            doc_lengths[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                docs.append(doc)
+                term_list.append(term_ids.setdefault(term, len(term_ids)))
+                tfs.append(tf)
+        for row, terms in enumerate(_poi_documents(poi_table)):
+            doc = n_destinations + row
+            doc_lengths[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                docs.append(doc)
+                term_list.append(term_ids.setdefault(term, len(term_ids)))
+                tfs.append(tf)
+
+        # Renumber the terms in sorted order, then group the postings by term
+        vocabulary = sorted(term_ids)
+        sorted_id = np.empty(len(vocabulary), dtype=np.int64)
+        sorted_id[[term_ids[term] for term in vocabulary]] = np.arange(len(vocabulary))
+        term_list = sorted_id[np.array(term_list, dtype=np.int64)]
+        docs = np.array(docs, dtype=np.int64)
+        order = np.lexsort((docs, term_list))
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_list, minlength=len(vocabulary)), out=term_offsets[1:])
+
+        # Country per document: POIs take the country of their parent destination
+        countries, doc_country = (), np.full(n_docs, -1, dtype=np.int32)
+        if n_destinations and 'Country' in locations_df.columns:
+            values = locations_df['Country'].astype(object).where(locations_df['Country'].notna(), None)
+            countries = tuple(sorted({str(value) for value in values if value is not None}))
+            code = {country: position for position, country in enumerate(countries)}
+            destination_codes = np.array([code.get(str(value), -1) if value is not None else -1 for value in values], dtype=np.int32)
+            doc_country[:n_destinations] = destination_codes
+            if len(poi_table):
+                location_ids = locations_df['LocationID'].to_numpy(dtype=np.int64)
+                first_row = {int(location_id): row for row, location_id in reversed(list(enumerate(location_ids)))}
+                parents = poi_table.parent_ids(np.arange(len(poi_table)))
+                parent_rows = np.array([first_row.get(int(parent), -1) for parent in parents], dtype=np.int64)
+                doc_country[n_destinations:] = np.where(parent_rows >= 0, destination_codes[parent_rows], -1)
+
+        doc_poi_type = np.full(n_docs, -1, dtype=np.int32)
+        doc_poi_type[n_destinations:] = poi_table.type.codes
+        arrays = {
+            'terms': np.array(vocabulary, dtype=f"S{max([len(term) for term in vocabulary] or [1])}"),
+            'term_offsets': term_offsets,
+            'postings_docs': docs[order].astype(np.int32 if n_docs < 2 ** 31 else np.int64),
+            'postings_tf': np.minimum(np.array(tfs, dtype=np.int64)[order], np.iinfo(np.uint16).max).astype(np.uint16),
+            'doc_lengths': doc_lengths,
+            'doc_country': doc_country,
+            'doc_poi_type': doc_poi_type,
+        }
+        return cls(arrays, countries, poi_table.type.categories, n_destinations)
+
+    def arrays(self):
+        """The arrays to persist (constructor input)."""
+        return {
+            'terms': self.terms, 'term_offsets': self.term_offsets, 'postings_docs': self.postings_docs,
+            'postings_tf': self.postings_tf, 'doc_lengths': self.doc_lengths, 'doc_country': self.doc_country,
+            'doc_poi_type': self.doc_poi_type,
+        }
+
+    def meta(self):
+        """The non-array constructor arguments (JSON-serializable)."""
+        return {'countries': list(self.countries), 'poi_types': list(self.poi_types), 'n_destinations': self.n_destinations}
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _term_range(self, term, prefix):
+        """[start, end) term IDs matching a term exactly or as a prefix."""
+        key = term.encode('ascii')
+        start = int(np.searchsorted(self.terms, key))
+        if prefix:
+            return start, int(np.searchsorted(self.terms, key + b'\xff'))
+        end = start + 1 if start < len(self.terms) and self.terms[start] == key else start
+        return start, end
+
+    def _term_scores(self, term_id):
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        docs = np.asarray(self.postings_docs[start:end])
+        tf = self.postings_tf[start:end].astype(np.float32)
+        return docs, self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self.doc_norm[docs])
+
+    def _word_scores(self, term, prefix):
+        """
+        (docs, scores) parts of one query word. A prefix adds its completions (most frequent
+        first, within MAX_PREFIX_TERMS / MAX_PREFIX_POSTINGS) at PREFIX_WEIGHT.
+        """
+        start, end = self._term_range(term, prefix)
+        if end == start:
+            return []
+        exact_start, exact_end = self._term_range(term, False) if prefix else (start, end)
+        exact = exact_start if exact_end > exact_start else -1
+        if end - start == 1:
+            docs, scores = self._term_scores(start)
+            return [(docs, scores if start == exact else scores * PREFIX_WEIGHT)]
+        term_ids = np.arange(start, end)
+        frequency = self.term_offsets[start + 1:end + 1] - self.term_offsets[start:end]
+        order = np.argsort(-frequency, kind='stable')[:MAX_PREFIX_TERMS]
+        within_budget = np.cumsum(frequency[order]) <= MAX_PREFIX_POSTINGS
+        within_budget[0] = True
+        parts = []
+        for term_id in term_ids[order[within_budget]]:
+            docs, scores = self._term_scores(term_id)
+            parts.append((docs, scores if term_id == exact else scores * PREFIX_WEIGHT))
+        if exact >= 0 and exact not in term_ids[order[within_budget]]:
+            parts.append(self._term_scores(exact))
+        return parts
+
+    def _accumulate(self, parts):
+        """Sums the scores per document: dense bincount for large posting sets, sorting otherwise."""
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        docs = np.concatenate([part[0] for part in parts])
+        scores = np.concatenate([part[1] for part in parts])
+        if len(docs) * DENSE_ACCUMULATION_RATIO >= len(self.doc_lengths):
+            totals = np.bincount(docs, weights=scores, minlength=len(self.doc_lengths))
+            docs = np.flatnonzero(totals)
+            return docs, totals[docs].astype(np.float32)
+        order = np.argsort(docs, kind='stable')
+        docs, scores = docs[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+        return docs[starts], np.add.reduceat(scores, starts)
+
+    def search(self, query, k, offset=0, kinds=None, poi_types=None, countries=None, prefix=True):
+        """
+        Ranks the documents matching any query word by BM25.
+
+        Args:
+            query (str): Free text.
+            k (int): Number of results.
+            offset (int, optional): Results to skip (paging).
+            kinds (list, optional): 'destination' and / or 'poi'; None = both.
+            poi_types (list, optional): Only POIs of these types (case-insensitive); excludes destinations.
+            countries (list, optional): Only destinations / POIs in these countries (case-insensitive).
+            prefix (bool, optional): Also match words starting with the last query word
+                (search as you type), if it has at least MIN_PREFIX_LENGTH characters.
+
+        Returns:
+            tuple: (docs, scores, total) - the requested page of document IDs and scores, best
+                first, and the number of all matching documents.
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), 0
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or k <= 0 or not len(self.terms):
+            return empty
+        parts = []
+        for position, word in enumerate(words):
+            parts += self._word_scores(word, prefix and position == len(words) - 1 and len(word) >= MIN_PREFIX_LENGTH)
+        docs, scores = self._accumulate(parts)
+
+        # --- Filters ---
+        keep = np.ones(len(docs), dtype=bool)
+        if kinds is not None:
+            is_poi = docs >= self.n_destinations
+            keep &= (is_poi & ('poi' in kinds)) | (~is_poi & ('destination' in kinds))
+        type_codes = _category_codes(self.poi_types, poi_types)
+        if type_codes is not None:
+            keep &= np.isin(self.doc_poi_type[docs], type_codes)
+        country_codes = _category_codes(self.countries, countries)
+        if country_codes is not None:
+            keep &= np.isin(self.doc_country[docs], country_codes)
+        docs, scores = docs[keep], scores[keep]
+
+        total = len(docs)
+        end = min(total, offset + k)
+        if end <= offset:
+            return empty[0], empty[1], total
+        if end < total:
+            top = np.argpartition(-scores, end - 1)[:end]
+            docs, scores = docs[top], scores[top]
+        order = np.lexsort((docs, -scores))[offset:end] # Ties: lower document ID first
+        return docs[order], scores[order], total
+
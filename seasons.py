@@ -0,0 +1,133 @@
+"""
+Months and seasons as 12-bit masks (bit 0 = January ... bit 11 = December).
+
+The "Best Time to Visit" column is parsed into one mask per destination at load time
+(DestinationIndex.month_masks); months and seasons named in a message become a mask of the
+same kind, so checking every destination against the requested time of year is a single
+bitwise AND. Seasons are the meteorological ones of the northern hemisphere, where all
+destinations of the catalogue lie.
+"""
+import re
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+          'October', 'November', 'December')
+ALL_MONTHS = (1 << len(MONTHS)) - 1
+
+# Season -> month numbers (1-12), in order
+SEASON_MONTHS = {
+    'spring': (3, 4, 5),
+    'summer': (6, 7, 8),
+    'autumn': (9, 10, 11),
+    'fall': (9, 10, 11),
+    'winter': (12, 1, 2),
+}
+
+# Qualifier -> which months of a season it keeps ("Early Autumn" = September)
+SEASON_PARTS = {
+    'early': slice(0, 1),
+    'mid': slice(1, 2),
+    'late': slice(2, 3),
+}
+
+# Word (lowercase) -> month numbers, for the words of a message
+MONTH_WORDS = {name.lower(): (number,) for number, name in enumerate(MONTHS, start=1)}
+MONTH_WORDS.update({name[:3].lower(): (number,) for number, name in enumerate(MONTHS, start=1)})
+MONTH_WORDS['sept'] = (9,)
+MONTH_WORDS.update(SEASON_MONTHS)
+
+# Words that are months or seasons only after a time preposition ("in may" but not "may i",
+# "this fall" but not "fall in love")
+AMBIGUOUS_MONTH_WORDS = frozenset(['may', 'fall', 'mar'])
+TIME_PREPOSITIONS = frozenset(['in', 'during', 'for', 'of', 'until', 'till', 'from', 'to', 'through', 'and', 'or',
+                               'this', 'next', 'early', 'mid', 'late'])
+
+# "Year-round", "all year" and the like in Best Time to Visit
+_ALL_YEAR = re.compile(r'year[\s-]*round|all[\s-]*year')
+_PARENTHESES = re.compile(r'\([^)]*\)')
+_SEPARATORS = re.compile(r'[,/;&]|\band\b')
+
+
+def months_mask(months):
+    """
+    Mask of month numbers.
+
+    Args:
+        months (iterable): Month numbers (1-12).
+
+    Returns:
+        int: The 12-bit mask.
+    """
+    mask = 0
+    for month in months:
+        mask |= 1 << (month - 1)
+    return mask
+
+
+def mask_of_names(names):
+    """Mask of month names as stored in a context (see MONTHS); unknown names are ignored."""
+    return months_mask(MONTHS.index(name) + 1 for name in names if name in MONTHS)
+
+
+def month_names(mask):
+    """Names of the months in a mask, January first."""
+    return [name for position, name in enumerate(MONTHS) if mask >> position & 1]
+
+
+def _part_months(words):
+    """Months of one part of a Best Time to Visit value, e.g. ['late', 'spring'] -> (5,)."""
+    months = ()
+    for position, word in enumerate(words):
+        months = MONTH_WORDS.get(word, ())
+        if months:
+            qualifier = words[position - 1] if position else None
+            if qualifier in SEASON_PARTS and word in SEASON_MONTHS:
+                months = months[SEASON_PARTS[qualifier]]
+            break
+    return months
+
+
+def parse_best_time(text):
+    """
+    Parses a Best Time to Visit value, e.g. "Late Spring, Summer, Early Autumn" or
+    "Summer, Winter (Northern Lights)".
+
+    Args:
+        text (str): The column value.
+
+    Returns:
+        int: Mask of the months it names (0 for an empty or unrecognized value).
+    """
+    if not isinstance(text, str):
+        return 0
+    text = text.lower()
+    if _ALL_YEAR.search(text):
+        return ALL_MONTHS
+    mask = 0
+    for part in _SEPARATORS.split(_PARENTHESES.sub(' ', text)):
+        mask |= months_mask(_part_months(re.findall(r'[a-z]+', part)))
+    return mask
+
+
+def message_months(words):
+    """
+    Months and seasons named in a message.
+
+    Args:
+        words (list): Lowercased words (tokens) of the message, in order; None for words that
+            must not be read as a month or season.
+
+    Returns:
+        list: Names of the months (see MONTHS), January first; empty if there are none.
+    """
+    mask = 0
+    for position, word in enumerate(words):
+        months = MONTH_WORDS.get(word)
+        if not months:
+            continue
+        previous = words[position - 1] if position else None
+        if word in AMBIGUOUS_MONTH_WORDS and previous not in TIME_PREPOSITIONS:
+            continue
+        if previous in SEASON_PARTS and word in SEASON_MONTHS:
+            months = months[SEASON_PARTS[previous]]
+        mask |= months_mask(months)
+    return month_names(mask)
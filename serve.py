@@ -0,0 +1,259 @@
+"""
+Production entry point: a pre-fork server whose workers share one loaded Chatbot.
+
+    python serve.py [--host 0.0.0.0] [--port 5001] [--workers N] [--threads] [--access-log]
+
+The master process imports app.py once (spaCy pipeline + destination data), freezes the
+garbage collector, binds the listening socket and forks the workers. The workers share the
+master's memory pages copy-on-write; gc.freeze() moves every loaded object out of the
+collected generations, so collections in the workers do not write to (and un-share) them.
+A worker that dies is replaced.
+
+Signals to the master:
+    SIGTERM / SIGINT   graceful shutdown (workers finish the request they are handling)
+    SIGHUP             reload the data in the master, then replace the workers one by one
+
+Environment variables: SERVE_HOST, SERVE_PORT, SERVE_WORKERS (default: number of CPUs),
+SERVE_THREADS (1 = threaded workers). DATA_WATCH_INTERVAL is applied per worker, and so is
+NLP_EXECUTOR_PROCESSES: every threaded worker gets its own pool of NLP processes.
+With more than one worker CONTEXT_STORE defaults to 'sqlite' (shared by the workers).
+
+POST /admin/reload_data reloads only the worker that handles it; use SIGHUP to reload
+all workers.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# --- Defaults ---
+DEFAULT_HOST = os.environ.get('SERVE_HOST', '0.0.0.0')
+DEFAULT_PORT = int(os.environ.get('SERVE_PORT', 5001))
+DEFAULT_WORKERS = int(os.environ.get('SERVE_WORKERS', 0)) or os.cpu_count() or 1
+DEFAULT_THREADED = os.environ.get('SERVE_THREADS', '0').lower() in ('1', 'true', 'yes')
+
+GRACEFUL_TIMEOUT = 30 # Seconds workers get to finish before they are killed
+MIN_WORKER_LIFETIME = 1.0 # Workers dying faster than this are respawned with a delay (crash loop)
+MAX_RESPAWN_DELAY = 30.0
+POLL_INTERVAL = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+def create_listener(host, port, backlog=2048):
+    """Binds the listening socket shared by all workers."""
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def freeze_heap():
+    """Collects garbage once, then moves all surviving objects to the permanent generation."""
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+class PreforkServer:
+    """Master process: forks, supervises and replaces the workers."""
+
+    def __init__(self, web, sock, workers, threaded=False):
+        """
+        Args:
+            web (module): The imported app module (provides `app`, `chatbot`, `DATA_WATCH_INTERVAL`).
+            sock (socket.socket): Bound, listening socket.
+            workers (int): Number of worker processes.
+            threaded (bool): Handle each request of a worker in its own thread.
+        """
+        self.web = web
+        self.sock = sock
+        self.worker_count = max(1, workers)
+        self.threaded = threaded
+        self.workers = {} # pid -> start time
+        self.retiring = set() # pids asked to exit during a rolling restart
+        self.respawn_delay = 0.0
+        self.running = False
+        self.reload_requested = False
+
+    # --- Worker side ---
+    def _run_worker(self):
+        from werkzeug.serving import make_server
+
+        gc.enable()
+        signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C reaches the whole group; the master decides
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        server = make_server(self.sock.getsockname()[0], self.sock.getsockname()[1], self.web.app,
+                             threaded=self.threaded, fd=self.sock.fileno())
+        # shutdown() blocks until serve_forever returns, so it cannot run in the signal handler itself
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+
+        if self.web.chatbot is not None:
+            self.web.chatbot.start_data_watcher(self.web.DATA_WATCH_INTERVAL)
+            if self.web.chatbot.nlp_executor is not None:
+                self.web.chatbot.nlp_executor.start(wait=True)
+        logger.info("Worker %d serving.", os.getpid())
+        server.serve_forever()
+        if self.web.chatbot is not None:
+            self.web.chatbot.stop_nlp_executor()
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                logger.exception("Worker %d failed.", os.getpid())
+                exit_code = 1
+            finally:
+                from log_config import stop_logging
+                stop_logging()
+                os._exit(exit_code) # Never return into the master's code
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    # --- Master side ---
+    def _handle_stop(self, signum, frame):
+        self.running = False
+
+    def _handle_hup(self, signum, frame):
+        self.reload_requested = True
+
+    def _reap(self):
+        """Collects exited workers and starts replacements for unexpected exits."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if started is None or not self.running:
+                continue
+
+            logger.warning("Worker %d exited unexpectedly (%s), starting a replacement.", pid, _describe_status(status))
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                self.respawn_delay = min(MAX_RESPAWN_DELAY, max(1.0, self.respawn_delay * 2))
+                logger.warning("Worker crashed right after start, waiting %.0fs before respawning.", self.respawn_delay)
+                time.sleep(self.respawn_delay)
+            else:
+                self.respawn_delay = 0.0
+            self.spawn_worker()
+
+    def _rolling_restart(self):
+        """Reloads the data in the master, then swaps every worker for a fresh fork."""
+        self.reload_requested = False
+        chatbot = self.web.chatbot
+        if chatbot is not None:
+            chatbot.reload_data(wait=True)
+            if chatbot.reload_status['last_result'] != 'ok':
+                logger.error("Data reload failed, keeping the current workers.")
+                return
+        freeze_heap()
+        for pid in list(self.workers):
+            self.spawn_worker() # New worker first, so capacity does not drop
+            self.retiring.add(pid)
+            _signal_worker(pid, signal.SIGTERM)
+        logger.info("Workers replaced with reloaded data (version %s).", chatbot.data.version if chatbot else None)
+
+    def _stop_workers(self):
+        for pid in self.workers:
+            _signal_worker(pid, signal.SIGTERM)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(POLL_INTERVAL)
+        for pid in self.workers:
+            logger.warning("Worker %d did not stop in time, killing it.", pid)
+            _signal_worker(pid, signal.SIGKILL)
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            self.workers.pop(pid, None)
+
+    def run(self):
+        """Starts the workers and supervises them until SIGTERM / SIGINT."""
+        self.running = True
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_hup)
+
+        freeze_heap()
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+        host, port = self.sock.getsockname()[:2]
+        logger.info("Master %d serving on http://%s:%d with %d %s workers.",
+                    os.getpid(), host, port, self.worker_count, "threaded" if self.threaded else "sync")
+
+        while self.running:
+            self._reap()
+            if self.reload_requested:
+                self._rolling_restart()
+            time.sleep(POLL_INTERVAL)
+
+        logger.info("Shutting down %d workers...", len(self.workers))
+        self._stop_workers()
+        self.sock.close()
+
+
+def _signal_worker(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _describe_status(status):
+    if os.WIFSIGNALED(status):
+        return f"signal {os.WTERMSIG(status)}"
+    return f"exit code {os.waitstatus_to_exitcode(status)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the travel chatbot.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--threads', action='store_true', default=DEFAULT_THREADED, help="Threaded workers")
+    parser.add_argument('--access-log', action='store_true', help="Log every request (werkzeug)")
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit("serve.py needs os.fork (Linux / macOS). Use 'python app.py' on this platform.")
+
+    # Every worker has its own memory, so contexts must live in a store shared by all workers
+    if args.workers > 1:
+        os.environ.setdefault('CONTEXT_STORE', 'sqlite')
+
+    # No collections while the model and data are loaded; the heap is frozen before forking
+    gc.disable()
+    import app as web
+
+    if not args.access_log:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if web.chatbot is None:
+        logger.critical("APPLICATION FAILED TO START: Chatbot could not be initialized. Check logs above.")
+        sys.exit(1)
+    # The master only supervises; every worker runs its own watcher after the fork
+    web.chatbot.stop_data_watcher()
+
+    sock = create_listener(args.host, args.port)
+    PreforkServer(web, sock, args.workers, threaded=args.threads).run()
+
+
+if __name__ == '__main__':
+    main()
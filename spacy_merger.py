@@ -1,9 +1,54 @@
+from spacy.language import Language
 from spacy.matcher import Matcher
-import spacy
+
+# Name of the pipeline component registered below
+HYPHEN_MERGER_NAME = "merge_hyphenated"
+
+HYPHENATED_PATTERN = [
+    {"IS_ALPHA": True}, # Token 1: Alphabetical character
+    {"IS_PUNCT": True, "TEXT": "-"}, # Token 2: Hyphen
+    {"IS_ALPHA": True}, # Token 3: Alphabetical character
+]
+
+
+class HyphenMerger:
+    """
+    Pipeline component that merges hyphenated words ("budget-friendly") into single tokens.
+    The Matcher is compiled once when the pipeline is built.
+    """
+
+    def __init__(self, vocab):
+        self.matcher = Matcher(vocab)
+        self.matcher.add("hyphenated", [HYPHENATED_PATTERN])
+
+    def __call__(self, doc):
+        if "-" not in doc.text:
+            return doc # Nothing to merge, skip matching and retokenization
+
+        spans_to_merge = [doc[start:end] for match_id, start, end in self.matcher(doc)]
+        if not spans_to_merge:
+            return doc
+
+        with doc.retokenize() as retokenizer:
+            for span in spans_to_merge:
+                try:
+                    retokenizer.merge(span)
+                except ValueError:
+                    pass # Overlapping match ("a-b-c"), first one wins
+        return doc
+
+
+@Language.factory(HYPHEN_MERGER_NAME)
+def create_hyphen_merger(nlp, name):
+    """spaCy factory, used via nlp.add_pipe(HYPHEN_MERGER_NAME)."""
+    return HyphenMerger(nlp.vocab)
+
 
 def merge_hyphenated_tokens(doc):
     """
     Merges tokens in a spaCy Doc that are part of hyphenated words into single tokens.
+    For docs from pipelines without the HYPHEN_MERGER_NAME component; compiles a new
+    Matcher on every call.
 
     Args:
         doc (spacy.tokens.Doc): The spaCy Doc object.
@@ -11,24 +56,4 @@ def merge_hyphenated_tokens(doc):
     Returns:
         spacy.tokens.Doc: The Doc object with merged hyphenated tokens.
     """
-    matcher = Matcher(doc.vocab)
-    pattern = [
-        {"IS_ALPHA": True}, # Token 1: Alphabetical character
-        {"IS_PUNCT": True, "TEXT": "-"}, # Token 2: Hyphen
-        {"IS_ALPHA": True}, # Token 3: Alphabetical character
-    ]
-    matcher.add("hyphenated", [pattern])
-    matches = matcher(doc)
-    spans_to_merge = []
-    for match_id, start, end in matches:
-        span = doc[start:end]
-        spans_to_merge.append(span)
-
-    with doc.retokenize() as retokenizer:
-        for span in spans_to_merge:
-            try:
-                retokenizer.merge(span) 
-            except ValueError:
-                pass 
-
-    return doc
\ No newline at end of file
+    return HyphenMerger(doc.vocab)(doc)
@@ -0,0 +1,266 @@
+"""
+Spatial lookups over POI and destination coordinates.
+
+Points are bucketed into a fixed latitude / longitude grid (CELL_DEGREES cells) and stored
+sorted by cell ID, so the points of a run of neighbouring cells in one grid row are one
+contiguous slice found with np.searchsorted. Queries only touch the cells that overlap the
+search area:
+
+    nearest - k nearest points to a coordinate (great-circle distance); the searched square
+              grows until no point outside it can be closer than the k-th result
+    within  - points inside a map viewport, also across the antimeridian
+
+Building is one argsort over the points; memory is a few arrays of n values.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEGREES = 0.25 # ~28 km at the equator
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """
+    Great-circle distances from one point to many.
+
+    Args:
+        lat (float): Latitude of the origin (degrees).
+        lng (float): Longitude of the origin (degrees).
+        lats (np.ndarray): Latitudes (degrees).
+        lngs (np.ndarray): Longitudes (degrees).
+
+    Returns:
+        np.ndarray: Distances in kilometres.
+    """
+    lat = math.radians(lat)
+    lats = np.radians(lats)
+    half_dlat = (lats - lat) / 2
+    half_dlng = np.radians(lngs - lng) / 2
+    a = np.sin(half_dlat) ** 2 + math.cos(lat) * np.cos(lats) * np.sin(half_dlng) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _concat_ranges(starts, ends):
+    """Concatenation of np.arange(start, end) for all pairs, without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    nonempty = lengths > 0
+    starts, lengths = starts[nonempty], lengths[nonempty]
+    # Each output position = its range start + its offset within the range
+    range_offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - range_offsets, lengths) + np.arange(total)
+
+
+class SpatialIndex:
+    """
+    Grid index over (lat, lng) points with optional per-point category codes.
+    Queries return row numbers of the original arrays.
+    """
+
+    def __init__(self, lat, lng, category_codes=None, categories=(), cell_degrees=CELL_DEGREES):
+        """
+        Builds the index. Points with a missing coordinate are left out.
+
+        Args:
+            lat (np.ndarray): Latitudes (degrees).
+            lng (np.ndarray): Longitudes (degrees).
+            category_codes (np.ndarray, optional): int codes into categories (-1 = none).
+            categories (tuple, optional): Category names for the codes.
+            cell_degrees (float, optional): Grid cell size.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self.n_rows = int(math.ceil(180 / cell_degrees))
+        self.n_cols = int(math.ceil(360 / cell_degrees))
+        self.categories = tuple(categories)
+        self._category_lookup = {category.lower(): code for code, category in enumerate(self.categories)}
+
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lng) & (np.abs(lat) <= 90))
+        lat, lng = lat[rows], (lng[rows] + 180) % 360 - 180 # Longitudes normalized to [-180, 180)
+        cells = self._cell_row(lat) * self.n_cols + self._cell_col(lng)
+        order = np.argsort(cells, kind='stable')
+
+        # int32 where it fits: halves the memory of the two largest arrays
+        self._cells = cells[order].astype(np.int32 if self.n_rows * self.n_cols < 2 ** 31 else np.int64)
+        self.rows = rows[order].astype(np.int32 if len(lat) < 2 ** 31 else np.int64)
+        self.lat = lat[order]
+        self.lng = lng[order]
+        self.codes = None if category_codes is None else np.asarray(category_codes)[rows][order]
+
+    @classmethod
+    def for_pois(cls, poi_table):
+        """Index over all POIs of a PoiTable; categories are the POI types."""
+        return cls(poi_table.lat, poi_table.lng, poi_table.type.codes, poi_table.type.categories)
+
+    @classmethod
+    def for_destinations(cls, destinations_df):
+        """Index over the destination rows (Latitude / Longitude); categories are the types."""
+        if destinations_df.empty or 'Latitude' not in destinations_df.columns:
+            return cls(np.zeros(0), np.zeros(0))
+        codes, categories = None, ()
+        if 'Type' in destinations_df.columns:
+            codes, categories = pd.factorize(destinations_df['Type'].astype(object), use_na_sentinel=True)
+        return cls(
+            pd.to_numeric(destinations_df['Latitude'], errors='coerce').to_numpy(dtype=np.float64),
+            pd.to_numeric(destinations_df['Longitude'], errors='coerce').to_numpy(dtype=np.float64),
+            codes, [str(category) for category in categories]
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _cell_row(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_degrees).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cell_col(self, lng):
+        return np.floor((np.asarray(lng) + 180) / self.cell_degrees).astype(np.int64) % self.n_cols
+
+    def category_codes(self, names):
+        """
+        Maps category names (case-insensitive) to codes for the `categories` query argument.
+
+        Returns:
+            np.ndarray or None: The codes (unknown names are dropped), or None when no names
+                were given (= no filter).
+        """
+        if not names:
+            return None
+        return np.array([self._category_lookup[name.lower()] for name in names if name.lower() in self._category_lookup], dtype=np.int64)
+
+    def _gather(self, row_start, row_end, col_start, col_count):
+        """Positions (into the sorted arrays) of all points in a block of cells; columns wrap."""
+        grid_rows = np.arange(row_start, row_end + 1, dtype=np.int64) * self.n_cols
+        if col_count >= self.n_cols:
+            spans = [(0, self.n_cols)]
+        else:
+            col_start %= self.n_cols
+            col_end = col_start + col_count
+            spans = [(col_start, min(col_end, self.n_cols))]
+            if col_end > self.n_cols:
+                spans.append((0, col_end - self.n_cols))
+        starts = np.concatenate([grid_rows + first for first, _ in spans])
+        ends = np.concatenate([grid_rows + last for _, last in spans])
+        # Same dtype as the sorted cells, so searchsorted does not convert the whole array
+        starts, ends = starts.astype(self._cells.dtype), ends.astype(self._cells.dtype)
+        return _concat_ranges(np.searchsorted(self._cells, starts), np.searchsorted(self._cells, ends))
+
+    def _filter_categories(self, positions, categories):
+        if categories is None or self.codes is None:
+            return positions
+        return positions[np.isin(self.codes[positions], categories)]
+
+    def nearest(self, lat, lng, k, categories=None, max_km=None, offset=0):
+        """
+        The nearest points to a coordinate, closest first.
+
+        Args:
+            lat (float): Latitude (degrees).
+            lng (float): Longitude (degrees).
+            k (int): Number of results.
+            categories (np.ndarray, optional): Allowed category codes (see category_codes).
+            max_km (float, optional): Only points within this distance.
+            offset (int, optional): Results to skip (paging).
+
+        Returns:
+            tuple: (rows, distances_km) arrays of up to k entries.
+        """
+        need = offset + k
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0)
+        if k <= 0 or not len(self) or (categories is not None and not len(categories)):
+            return empty
+        lng = (lng + 180) % 360 - 180
+        lat_rad = math.radians(lat)
+        center_row, center_col = int(self._cell_row(lat)), int(self._cell_col(lng))
+
+        radius = 1
+        while True:
+            row_start, row_end = max(0, center_row - radius), min(self.n_rows - 1, center_row + radius)
+            col_count = 2 * radius + 1
+            positions = self._filter_categories(self._gather(row_start, row_end, center_col - radius, col_count), categories)
+            distances = haversine_km(lat, lng, self.lat[positions], self.lng[positions])
+
+            # Lower bound for the distance of any point outside the searched block: it lies
+            # either outside its latitude band or outside its longitude band
+            bound = math.inf
+            if row_start > 0:
+                bound = min(bound, lat - (row_start * self.cell_degrees - 90))
+            if row_end < self.n_rows - 1:
+                bound = min(bound, (row_end + 1) * self.cell_degrees - 90 - lat)
+            bound = math.radians(bound) if bound != math.inf else bound
+            if col_count < self.n_cols:
+                west = (center_col - radius) * self.cell_degrees - 180
+                east = (center_col + radius + 1) * self.cell_degrees - 180
+                delta_lng = math.radians(min(lng - west, east - lng, 90))
+                # Distance to the great circle through the nearest boundary meridian
+                bound = min(bound, math.asin(min(1.0, math.cos(lat_rad) * math.sin(delta_lng))))
+            bound_km = bound * EARTH_RADIUS_KM
+
+            if max_km is not None:
+                within = distances <= max_km
+                positions, distances = positions[within], distances[within]
+            if bound_km == math.inf or (max_km is not None and bound_km >= max_km):
+                break
+            if len(distances) >= need and np.partition(distances, need - 1)[need - 1] <= bound_km:
+                break
+            radius *= 2
+
+        if len(distances) > need:
+            top = np.argpartition(distances, need - 1)[:need]
+            positions, distances = positions[top], distances[top]
+        order = np.lexsort((self.rows[positions], distances))[offset:need] # Ties: lower row first
+        return self.rows[positions[order]], distances[order]
+
+    def within(self, south, west, north, east, categories=None, offset=0, limit=None):
+        """
+        Points inside a viewport, closest to its centre first. A west edge greater than the
+        east edge means the viewport crosses the antimeridian.
+
+        Args:
+            south (float): Southern edge latitude.
+            west (float): Western edge longitude.
+            north (float): Northern edge latitude.
+            east (float): Eastern edge longitude.
+            categories (np.ndarray, optional): Allowed category codes (see category_codes).
+            offset (int, optional): Results to skip (paging).
+            limit (int, optional): Maximum number of results; None = all.
+
+        Returns:
+            tuple: (rows, total) - the requested page of matching rows and the number of all
+                matches in the viewport.
+        """
+        south, north = max(-90.0, south), min(90.0, north)
+        if not len(self) or south > north or (categories is not None and not len(categories)):
+            return np.zeros(0, dtype=np.int64), 0
+        span = east - west if east >= west else east - west + 360
+        full_circle = span >= 360
+        west = (west + 180) % 360 - 180
+        east = (east + 180) % 360 - 180
+
+        col_start = int(self._cell_col(west))
+        col_count = self.n_cols if full_circle else (int(self._cell_col(east)) - col_start) % self.n_cols + 1
+        positions = self._gather(int(self._cell_row(south)), int(self._cell_row(north)), col_start, col_count)
+
+        lats, lngs = self.lat[positions], self.lng[positions]
+        inside = (lats >= south) & (lats <= north)
+        if not full_circle:
+            inside &= ((lngs >= west) & (lngs <= east)) if west <= east else ((lngs >= west) | (lngs <= east))
+        positions = self._filter_categories(positions[inside], categories)
+
+        center_lat = (south + north) / 2
+        center_lng = west + span / 2
+        distances = haversine_km(center_lat, center_lng, self.lat[positions], self.lng[positions])
+        total = len(positions)
+        end = total if limit is None else min(total, offset + limit)
+        if end < total:
+            # Only the requested page is sorted; points tied with the last one on it (same
+            # distance) are all kept so the row tie-break below stays exact
+            cutoff = np.partition(distances, end - 1)[end - 1] if end else -1.0
+            keep = distances <= cutoff
+            positions, distances = positions[keep], distances[keep]
+        order = np.lexsort((self.rows[positions], distances))[offset:end]
+        return self.rows[positions[order]], total
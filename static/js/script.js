@@ -5,14 +5,24 @@ let AdvancedMarkerElement;
 let PinElement;
 let LatLngBounds;
 let InfoWindow; // Added for hover popups
+let Polyline; // Itinerary route lines
 
 // Map state variables
 let currentMapMarker = null; // Holds the marker for the main selected location
 let currentPOIMarkers = []; // Holds markers for the displayed POIs
+let currentRouteLines = []; // Polylines of the displayed itinerary (one per day)
 let infoWindowInstance = null; // Single InfoWindow instance
 
 // Constants
 const LOCATIONS_PER_PAGE = 5; // How many location buttons to show at once
+const VIEWPORT_POI_MIN_ZOOM = 10; // POIs of the visible map area are loaded from this zoom level on
+const VIEWPORT_POI_LIMIT = 200; // Max POIs per viewport request (closest to the map centre first)
+const VIEWPORT_POI_DELAY_MS = 300; // Wait after panning / zooming stops before fetching
+const ROUTE_DAY_COLORS = ['#1A73E8', '#E8710A', '#188038', '#A142F4', '#D93025']; // Cycled per itinerary day
+
+// Viewport POI loading state
+let viewportPOITimer = null;
+let viewportPOIRequest = null; // AbortController of the request in flight
 
 // DOM Elements (initialized in initializeChat)
 let chatLog;
@@ -47,6 +57,7 @@ async function initMap() {
         // Assign constructors/classes to variables
         const Map = mapsLibrary.Map;
         InfoWindow = mapsLibrary.InfoWindow;
+        Polyline = mapsLibrary.Polyline;
         AdvancedMarkerElement = markerLibrary.AdvancedMarkerElement;
         PinElement = markerLibrary.PinElement;
         LatLngBounds = coreLibrary.LatLngBounds;
@@ -86,6 +97,9 @@ async function initMap() {
         });
         console.log("Map click listener added to close InfoWindows.");
 
+        // Load the POIs of the visible area whenever the map settles after panning / zooming
+        map.addListener('idle', scheduleViewportPOIs);
+
 
     } catch (error) {
         console.error("Error during Google Map library import or instantiation:", error);
@@ -201,8 +215,9 @@ async function showSingleLocationOnMap(lat, lng, name) {
 
 /**
  * Displays markers for POIs with custom icons and info windows on click.
+ * With fitToMarkers (default) the map zooms to the POIs; viewport updates keep the view.
  */
-async function displayPOIMarkers(pois) {
+async function displayPOIMarkers(pois, fitToMarkers = true) {
     if (!map || !AdvancedMarkerElement || !PinElement || !LatLngBounds || !infoWindowInstance) {
         console.error("displayPOIMarkers: Map components not ready."); return;
     }
@@ -277,20 +292,86 @@ async function displayPOIMarkers(pois) {
     console.log(`Finished loop. Added ${validPoisAdded} valid POI markers.`);
 
     // Adjust map view
+    if (!fitToMarkers) { return; }
     if (validPoisAdded > 0 && !bounds.isEmpty()) {
         if (bounds.getNorthEast().equals(bounds.getSouthWest())) { map.setCenter(bounds.getCenter()); map.setZoom(14); }
         else { map.fitBounds(bounds, 50); }
     } else if (currentMapMarker) { map.setCenter(currentMapMarker.position); map.setZoom(12); }
 }
 
+/** Debounces viewport POI loading while the user keeps panning / zooming. */
+function scheduleViewportPOIs() {
+    clearTimeout(viewportPOITimer);
+    viewportPOITimer = setTimeout(loadViewportPOIs, VIEWPORT_POI_DELAY_MS);
+}
+
+/** Fetches the POIs inside the visible map area (/pois/viewport) and shows them. */
+async function loadViewportPOIs() {
+    if (!map || map.getZoom() < VIEWPORT_POI_MIN_ZOOM) { return; } // Zoomed out: keep the current markers
+    const bounds = map.getBounds();
+    if (!bounds) { return; }
+    const ne = bounds.getNorthEast(), sw = bounds.getSouthWest();
+    const params = new URLSearchParams({
+        south: sw.lat(), west: sw.lng(), north: ne.lat(), east: ne.lng(), limit: VIEWPORT_POI_LIMIT,
+    });
+
+    if (viewportPOIRequest) { viewportPOIRequest.abort(); } // Only the latest viewport matters
+    const controller = viewportPOIRequest = new AbortController();
+    try {
+        const resp = await fetch(`/pois/viewport?${params}`, { signal: controller.signal });
+        if (!resp.ok) { console.warn(`Viewport POIs: HTTP ${resp.status}`); return; }
+        const data = await resp.json();
+        console.log(`Viewport POIs: showing ${data.results.length} of ${data.total}.`);
+        if (data.results.length > 0) { displayPOIMarkers(data.results, false); }
+    } catch (err) {
+        if (err.name !== 'AbortError') { console.error('Viewport POIs error:', err); }
+    } finally {
+        if (viewportPOIRequest === controller) { viewportPOIRequest = null; }
+    }
+}
+
 /** Clears all POI markers */
 function clearPOIMarkers() {
     if (currentPOIMarkers.length > 0) { for (let marker of currentPOIMarkers) { marker.map = null; } currentPOIMarkers = []; }
 }
 
-/** Clears all markers (main location and POIs) */
+/** Clears all markers (main location and POIs) and the itinerary route */
 function clearAllMarkers() {
-     if (currentMapMarker) { currentMapMarker.map = null; currentMapMarker = null; } clearPOIMarkers();
+     if (currentMapMarker) { currentMapMarker.map = null; currentMapMarker = null; } clearPOIMarkers(); clearRoute();
+}
+
+/** Removes the itinerary route lines */
+function clearRoute() {
+    for (const line of currentRouteLines) { line.setMap(null); }
+    currentRouteLines = [];
+}
+
+/**
+ * Fetches a suggested visiting order of a destination's POIs (/itinerary), draws it on the
+ * map (one colour per day) and lists it in the chat.
+ */
+async function showItinerary(locationId) {
+    if (!map || !Polyline) { return; }
+    try {
+        const resp = await fetch(`/itinerary?location_id=${encodeURIComponent(locationId)}`);
+        if (!resp.ok) { console.warn(`Itinerary: HTTP ${resp.status}`); return; }
+        const plan = await resp.json();
+        if (!plan.days || plan.days.length === 0) { return; }
+        clearRoute();
+        const lines = [];
+        plan.days.forEach((day, position) => {
+            const path = day.stops.map(stop => ({ lat: stop.lat, lng: stop.lng }));
+            currentRouteLines.push(new Polyline({
+                map: map, path: path, strokeColor: ROUTE_DAY_COLORS[position % ROUTE_DAY_COLORS.length],
+                strokeOpacity: 0.8, strokeWeight: 3,
+            }));
+            const label = plan.days.length > 1 ? `Day ${day.day}: ` : '';
+            lines.push(`${label}${day.stops.map(stop => stop.name).join(' → ')} (${day.distance_km.toFixed(1)} km)`);
+        });
+        displayMessage({ response: `Suggested route:\n${lines.join('\n')}` }, 'ai');
+    } catch (err) {
+        console.error('Itinerary error:', err);
+    }
 }
 
 
@@ -331,6 +412,7 @@ function initializeChat() {
             const lat = target.dataset.lat;
             const lng = target.dataset.lng;
             const name = target.dataset.name;
+            const id = target.dataset.id;
             if (!name || !lat || !lng) { console.error("Button data missing.", target); return; }
             console.log(`Location button clicked: ${name}`);
 
@@ -343,11 +425,15 @@ function initializeChat() {
             // *** End Added Code ***
 
             // Fetch location details from the backend
-            fetch('/location_details', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', },
-                body: JSON.stringify({ location_name: name }), // Send name to identify
-            })
+            // By ID: cacheable GET (browser cache + ETag revalidation); otherwise fall back to the name
+            const detailsRequest = id
+                ? fetch(`/location_details/${encodeURIComponent(id)}`)
+                : fetch('/location_details', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', },
+                    body: JSON.stringify({ location_name: name }),
+                });
+            detailsRequest
             .then(response => { // Handle HTTP errors
                 if (!response.ok) {
                     // Try to parse JSON error from backend, else use status text
@@ -374,6 +460,7 @@ function initializeChat() {
                         // Display POIs
                         if (data.points_of_interest && Array.isArray(data.points_of_interest)) {
                             displayPOIMarkers(data.points_of_interest);
+                            if (id && data.points_of_interest.length > 1) { showItinerary(id); }
                         } else {
                             console.log("No POIs provided in details response.");
                             clearPOIMarkers(); 
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from context_store import ContextCodec, ContextStore, MemoryContextStore, SQLiteContextStore
+from intent_detection import CONTEXT_LIST_KEYS, CONTEXT_VALUE_KEYS, CONTEXT_VOCABULARIES
+
+CODEC = ContextCodec()
+
+
+def as_sets(context):
+    """Lists are sets for recommendations: the codec keeps their values, not their order."""
+    return {key: set(value) if key in CONTEXT_LIST_KEYS else value for key, value in context.items()}
+
+
+def random_context(rng):
+    context = {key: rng.sample(CONTEXT_VOCABULARIES[key], rng.randint(0, min(4, len(CONTEXT_VOCABULARIES[key]))))
+               for key in CONTEXT_LIST_KEYS}
+    context.update({key: rng.choice((None,) + CONTEXT_VOCABULARIES[key]) for key in CONTEXT_VALUE_KEYS})
+    return context
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_round_trip(seed):
+    context = random_context(random.Random(seed))
+    payload = CODEC.encode(context)
+    assert payload[0] == 1 # Coded, not the JSON fallback
+    assert as_sets(CODEC.decode(payload)) == as_sets(context)
+
+
+def test_empty_context_is_small():
+    context = {key: [] for key in CONTEXT_LIST_KEYS}
+    context.update({key: None for key in CONTEXT_VALUE_KEYS})
+    payload = CODEC.encode(context)
+    assert len(payload) == 1 + len(CONTEXT_VALUE_KEYS) + len(CONTEXT_LIST_KEYS)
+    assert CODEC.decode(payload) == context
+
+
+@pytest.mark.parametrize('change', [
+    {'style': ['Not a style']},
+    {'type': 'Spaceport'},
+    {'extra': 1},
+])
+def test_json_fallback(change):
+    context = random_context(random.Random(0))
+    context.update(change)
+    payload = CODEC.encode(context)
+    assert payload[0] == 2
+    assert CODEC.decode(payload) == context
+
+
+def test_fingerprint_follows_vocabularies():
+    vocabularies = dict(CONTEXT_VOCABULARIES, style=CONTEXT_VOCABULARIES['style'] + ('Stargazing',))
+    assert ContextCodec(vocabularies).fingerprint != CODEC.fingerprint
+    assert ContextCodec(dict(CONTEXT_VOCABULARIES)).fingerprint == CODEC.fingerprint
+
+
+@pytest.mark.parametrize('make_store', [
+    lambda tmp_path: MemoryContextStore(ttl=60),
+    lambda tmp_path: SQLiteContextStore(str(tmp_path / 'contexts.sqlite3'), ttl=60),
+])
+def test_store_save_load_delete(tmp_path, make_store):
+    store = make_store(tmp_path)
+    context = random_context(random.Random(1))
+    store.save('abc', context)
+    assert as_sets(store.load('abc')) == as_sets(context)
+    store.delete('abc')
+    assert store.load('abc') is None
+    assert store.stats()['load_misses'] == 1
+
+
+def test_incomplete_backend_fails_on_construction():
+    class NoCount(MemoryContextStore):
+        _count = ContextStore._count
+
+    with pytest.raises(TypeError):
+        ContextStore(ttl=60)
+    with pytest.raises(TypeError):
+        NoCount(ttl=60)
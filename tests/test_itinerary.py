@@ -0,0 +1,101 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from itinerary import distance_matrix, nearest_neighbour, path_length, plan_itinerary, plan_route, split_days
+from spatial_index import haversine_km
+
+SIZES = [1, 2, 3, 8, 40, 300]
+
+
+def random_points(n, seed):
+    """n points scattered over a city-sized area."""
+    rng = np.random.default_rng(seed)
+    return 48.85 + rng.normal(0, 0.05, n), 2.35 + rng.normal(0, 0.08, n)
+
+
+def test_distance_matrix_matches_haversine():
+    lat, lng = random_points(30, 0)
+    distances = distance_matrix(lat, lng)
+    expected = np.array([haversine_km(lat[i], lng[i], lat, lng) for i in range(len(lat))])
+    np.testing.assert_allclose(distances, expected, atol=1e-6)
+    np.testing.assert_allclose(np.diag(distances), 0.0, atol=1e-9)
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_route_without_start(n):
+    lat, lng = random_points(n, n)
+    order, leg_km, stats = plan_route(lat, lng)
+    assert sorted(order.tolist()) == list(range(n))
+    distances = distance_matrix(lat, lng)
+    assert stats['km'] == pytest.approx(path_length(distances, order))
+    assert leg_km[0] == 0.0
+    # Never longer than the nearest-neighbour path it starts from
+    assert stats['km'] <= stats['nearest_neighbour_km'] + 1e-9
+    first = int(np.argmax(distances.sum(axis=1)))
+    assert stats['nearest_neighbour_km'] == pytest.approx(path_length(distances, nearest_neighbour(distances, first)))
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_route_from_start(n):
+    lat, lng = random_points(n, 100 + n)
+    start = (48.86, 2.34)
+    order, leg_km, stats = plan_route(lat, lng, start)
+    assert sorted(order.tolist()) == list(range(n))
+    assert leg_km[0] == pytest.approx(haversine_km(start[0], start[1], lat[order[0]], lng[order[0]]))
+    assert stats['km'] == pytest.approx(leg_km[0] + path_length(distance_matrix(lat, lng), order))
+    assert stats['km'] <= stats['nearest_neighbour_km'] + 1e-9
+    distances = distance_matrix(np.append(lat, start[0]), np.append(lng, start[1]))
+    assert stats['nearest_neighbour_km'] == pytest.approx(path_length(distances, nearest_neighbour(distances, n)))
+
+
+def test_route_of_nothing():
+    order, leg_km, stats = plan_route(np.zeros(0), np.zeros(0))
+    assert len(order) == 0 and len(leg_km) == 0 and stats['km'] == 0.0
+
+
+def test_two_opt_improves_a_zigzag():
+    # Nearest neighbour from 0 zigzags (0.01, -0.015, -0.05, 0.03, 0.08); the best path goes
+    # left first and then sweeps right
+    lng = np.array([0.01, -0.015, 0.03, -0.05, 0.08])
+    lat = np.full(len(lng), 45.0)
+    order, _, stats = plan_route(lat, lng, start=(45.0, 0.0))
+    assert stats['km'] < stats['nearest_neighbour_km']
+    best = min(itertools.permutations(range(len(lng))),
+               key=lambda path: haversine_km(45.0, 0.0, lat[path[0]], lng[path[0]]) + path_length(distance_matrix(lat, lng), np.array(path)))
+    assert order.tolist() == list(best)
+
+
+def test_split_days_fits_the_day():
+    visit = np.full(10, 1.0)
+    legs = np.full(10, 0.5)
+    starts = split_days(legs, visit, day_hours=4.0)
+    assert starts[0] == 0 and starts == sorted(starts)
+    bounds = starts + [10]
+    for first, end in zip(bounds, bounds[1:]):
+        assert visit[first:end].sum() + legs[first + 1:end].sum() <= 4.0
+
+
+@pytest.mark.parametrize('days', [1, 2, 3, 7, 20])
+def test_split_days_by_count(days):
+    starts = split_days(np.full(12, 0.25), np.full(12, 1.0), days=days)
+    assert starts[0] == 0 and starts == sorted(set(starts))
+    assert len(starts) <= days
+    if days >= 12:
+        assert starts == list(range(12))
+
+
+def test_split_days_balances_the_days():
+    assert split_days(np.full(12, 0.25), np.full(12, 1.0), days=3) == [0, 4, 8]
+
+
+def test_itinerary_days_start_from_the_accommodation():
+    lat, lng = random_points(25, 5)
+    start = (48.86, 2.34)
+    plan = plan_itinerary(lat, lng, start=start, days=3)
+    assert sorted(plan['order'].tolist()) == list(range(25))
+    assert len(plan['day_starts']) <= 3
+    for position in plan['day_starts']:
+        stop = plan['order'][position]
+        assert plan['leg_km'][position] == pytest.approx(haversine_km(start[0], start[1], lat[stop], lng[stop]))
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from intent_detection import ENTITY_CATEGORIES, ENTITY_MATCHER
+from keyword_matcher import KeywordMatcher
+
+MESSAGES = [
+    "I want a cheap beach holiday",
+    "Something luxurious in the mountains for a family with kids",
+    "A romantic city break, budget-friendly please",
+    "winter sports and hiking, mid-range",
+    "We are a couple looking for nightlife and culture",
+    "",
+]
+
+
+def per_synonym_scan(text):
+    """The scan extract_entities did before the matcher: every synonym of every value, in mapping order."""
+    lowered = text.lower()
+    found = {}
+    for category, synonym_mapping, normalize in ENTITY_CATEGORIES:
+        values = [normalize(value) for value, synonyms in synonym_mapping.items()
+                  if any(synonym.lower() in lowered for synonym in synonyms)]
+        found[category] = list(dict.fromkeys(values))
+    return found
+
+
+def matcher_scan(text):
+    """The matcher as extract_entities reads it: payloads sorted by (category, rank)."""
+    found = {category: {} for category, _, _ in ENTITY_CATEGORIES}
+    for category, _, value, _ in sorted(ENTITY_MATCHER.find(text.lower())):
+        found[category][value] = None
+    return {category: list(values) for category, values in found.items()}
+
+
+def synonym_messages(count=200, seed=7):
+    synonyms = [synonym for _, synonym_mapping, _ in ENTITY_CATEGORIES
+                for values in synonym_mapping.values() for synonym in values]
+    rng = random.Random(seed)
+    return [" and ".join(rng.sample(synonyms, rng.randint(1, 4))).upper() for _ in range(count)]
+
+
+@pytest.mark.parametrize('text', MESSAGES + synonym_messages())
+def test_matcher_equals_per_synonym_scan(text):
+    assert matcher_scan(text) == per_synonym_scan(text)
+
+
+def test_find_matches_plain_substrings():
+    keywords = ['he', 'she', 'his', 'hers', 'a', 'ab', 'bab', 'abab']
+    matcher = KeywordMatcher((keyword, keyword) for keyword in keywords)
+    rng = random.Random(3)
+    for _ in range(500):
+        text = ''.join(rng.choice('abehirs') for _ in range(rng.randint(0, 20)))
+        assert matcher.find(text) == {keyword for keyword in keywords if keyword in text}
+
+
+def test_same_keyword_keeps_every_payload():
+    matcher = KeywordMatcher([('beach', 1), ('beach', 2), ('', 3)])
+    assert matcher.find('a beach town') == {1, 2}
+    assert matcher.find('') == set()
@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import PoiTable
+from search_index import BM25_B, BM25_K1, PREFIX_WEIGHT, SearchIndex, tokenize
+
+LOCATIONS = pd.DataFrame({
+    'LocationID': [1, 2, 3],
+    'LocationName': ['Prague', 'Edinburgh', 'Casablanca'],
+    'Country': ['Czech Republic', 'Scotland', 'Morocco'],
+    'Type': ['city', 'city', 'city'],
+    'Travel Style': ['Historical', 'Historical', 'Cultural'],
+    'Description': ['Castle above the river and an old town.', 'A castle on a volcanic rock.', 'Port city with a large mosque.'],
+    'Keywords/Main Attractions': ['castle, bridge', 'castle, festival', 'mosque, medina, castles'],
+})
+POIS = pd.DataFrame({
+    'ParentLocationID': [1, 1, 2, 2, 3],
+    'name': ['Prague Castle', 'Charles Bridge', 'Edinburgh Castle', 'National Museum', 'Hassan II Mosque'],
+    'type': ['Sight', 'Sight', 'Sight', 'Museum', 'Religious'],
+    'lat': [50.09, 50.086, 55.949, 55.947, 33.608],
+    'lng': [14.40, 14.411, -3.200, -3.189, -7.633],
+    'description': ['Castle complex with a cathedral.', 'Stone bridge over the river.', 'Fortress on Castle Rock.',
+                    'Museum of Scottish history.', 'Mosque by the ocean.'],
+})
+
+
+@pytest.fixture(scope='module')
+def index():
+    return SearchIndex.build(LOCATIONS, PoiTable.from_dataframe(POIS))
+
+
+def documents():
+    """Terms of every document, in document ID order (destinations, then POIs)."""
+    docs = []
+    for _, row in LOCATIONS.iterrows():
+        docs.append(tokenize(row['LocationName']) * 2 + [term for column in ('Country', 'Type', 'Travel Style', 'Description',
+                                                                             'Keywords/Main Attractions') for term in tokenize(row[column])])
+    for _, row in POIS.sort_values('ParentLocationID', kind='stable').iterrows():
+        docs.append(tokenize(row['name']) * 2 + tokenize(row['type']) + tokenize(row['description']))
+    return docs
+
+
+def reference_bm25(words):
+    """BM25 of every document for exact query words, straight from the formula."""
+    docs = documents()
+    average = sum(len(doc) for doc in docs) / len(docs)
+    scores = {}
+    for doc_id, doc in enumerate(docs):
+        score = 0.0
+        for word in words:
+            df = sum(word in other for other in docs)
+            tf = doc.count(word)
+            if tf:
+                idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / average))
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+@pytest.mark.parametrize('query', ['castle', 'castle river', 'mosque', 'bridge museum'])
+def test_scores_match_bm25(index, query):
+    docs, scores, total = index.search(query, 100, prefix=False)
+    expected = reference_bm25(tokenize(query))
+    assert total == len(expected)
+    assert dict(zip(docs.tolist(), scores.tolist())) == pytest.approx(expected, rel=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_prefix_matches_completions(index):
+    docs, _, _ = index.search('cast', 100, prefix=False)
+    assert len(docs) == 0
+    docs, scores, _ = index.search('cast', 100)
+    expected = {doc: (reference_bm25(['castle']).get(doc, 0) + reference_bm25(['castles']).get(doc, 0)) * PREFIX_WEIGHT
+                for doc in set(reference_bm25(['castle', 'castles']))}
+    assert dict(zip(docs.tolist(), scores.tolist())) == pytest.approx(expected, rel=1e-5)
+    # A single completion is weighted the same way
+    docs, scores, _ = index.search('casab', 100)
+    assert dict(zip(docs.tolist(), scores.tolist())) == pytest.approx({doc: score * PREFIX_WEIGHT for doc, score in reference_bm25(['casablanca']).items()}, rel=1e-5)
+
+
+def test_prefix_only_for_last_word(index):
+    first, _, _ = index.search('cas mosque', 100)
+    assert set(first.tolist()) == set(reference_bm25(['mosque']))
+    last, _, _ = index.search('mosque cas', 100)
+    assert set(last.tolist()) == set(reference_bm25(['mosque', 'castle', 'castles', 'casablanca']))
+
+
+def test_exact_word_ranks_above_completions(index):
+    # "castles" (Casablanca) completes "castle"; the exact word keeps its full score
+    docs, scores, _ = index.search('castle', 100)
+    exact = reference_bm25(['castle'])
+    expected = {**exact, 2: reference_bm25(['castles'])[2] * PREFIX_WEIGHT}
+    assert dict(zip(docs.tolist(), scores.tolist())) == pytest.approx(expected, rel=1e-5)
+    assert docs[-1] == 2
+
+
+def test_kind_filter(index):
+    docs, _, total = index.search('castle', 100, kinds=['destination'], prefix=False)
+    assert sorted(docs.tolist()) == [0, 1] and total == 2
+    docs, _, _ = index.search('castle', 100, kinds=['poi'])
+    assert sorted(docs.tolist()) == [3, 5]
+
+
+def test_poi_type_filter_excludes_destinations(index):
+    docs, _, total = index.search('castle museum', 100, poi_types=['museum'])
+    assert total == 1
+    assert index.poi_types[index.doc_poi_type[docs[0]]] == 'Museum'
+
+
+def test_country_filter_includes_pois_of_the_country(index):
+    docs, _, _ = index.search('castle', 100, countries=['scotland'])
+    assert sorted(docs.tolist()) == [1, 5]
+    docs, _, total = index.search('castle', 100, countries=['Atlantis'])
+    assert total == 0 and len(docs) == 0
+
+
+def test_paging(index):
+    everything, scores, total = index.search('castle river mosque', 100)
+    pages = [index.search('castle river mosque', 2, offset)[0] for offset in range(0, total, 2)]
+    assert np.concatenate(pages).tolist() == everything.tolist()
+    docs, _, total_again = index.search('castle river mosque', 2, offset=total)
+    assert len(docs) == 0 and total_again == total
+
+
+def test_empty_queries(index):
+    for query in ('', 'the and of', 'x'):
+        docs, _, total = index.search(query, 10)
+        assert total == 0 and len(docs) == 0